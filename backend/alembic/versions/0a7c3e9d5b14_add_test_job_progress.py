@@ -0,0 +1,29 @@
+"""add_test_job_progress
+
+Revision ID: 0a7c3e9d5b14
+Revises: f4c1d9b26e58
+Create Date: 2026-10-18 16:58:12.402517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7c3e9d5b14'
+down_revision: Union[str, Sequence[str], None] = 'f4c1d9b26e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_jobs', sa.Column('progress', postgresql.JSON(astext_type=Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_jobs', 'progress')
@@ -0,0 +1,35 @@
+"""add_test_report_archive_fields
+
+Revision ID: 1b8e4f0c6a27
+Revises: 0a7c3e9d5b14
+Create Date: 2026-10-18 17:34:08.915263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '1b8e4f0c6a27'
+down_revision: Union[str, Sequence[str], None] = '0a7c3e9d5b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_reports', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('test_reports', sa.Column('archive_path', sa.String(length=255), nullable=True))
+    op.add_column('test_reports', sa.Column('archive_summary', postgresql.JSON(astext_type=Text()), nullable=True))
+    op.create_index('ix_test_reports_archived_start_time', 'test_reports', ['archived_at', 'start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_reports_archived_start_time', table_name='test_reports')
+    op.drop_column('test_reports', 'archive_summary')
+    op.drop_column('test_reports', 'archive_path')
+    op.drop_column('test_reports', 'archived_at')
@@ -0,0 +1,44 @@
+"""add_content_blobs
+
+Revision ID: 2c9a5d7e1f38
+Revises: 1b8e4f0c6a27
+Create Date: 2026-10-18 18:52:41.307516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision: str = '2c9a5d7e1f38'
+down_revision: Union[str, Sequence[str], None] = '1b8e4f0c6a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('content_blobs',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('data', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('stored_size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('test_records', sa.Column('request_headers_hash', sa.String(length=64), nullable=True))
+    op.add_column('test_records', sa.Column('request_body_hash', sa.String(length=64), nullable=True))
+    op.add_column('test_records', sa.Column('response_headers_hash', sa.String(length=64), nullable=True))
+    op.add_column('test_records', sa.Column('response_body_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_records', 'response_body_hash')
+    op.drop_column('test_records', 'response_headers_hash')
+    op.drop_column('test_records', 'request_body_hash')
+    op.drop_column('test_records', 'request_headers_hash')
+    op.drop_table('content_blobs')
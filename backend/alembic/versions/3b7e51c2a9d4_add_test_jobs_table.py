@@ -0,0 +1,48 @@
+"""add_test_jobs_table
+
+Revision ID: 3b7e51c2a9d4
+Revises: c4009b8ba219
+Create Date: 2026-10-18 09:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e51c2a9d4'
+down_revision: Union[str, Sequence[str], None] = 'c4009b8ba219'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('test_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_type', sa.String(length=20), nullable=False),
+    sa.Column('suite_id', sa.Integer(), nullable=True),
+    sa.Column('payload', postgresql.JSON(astext_type=Text()), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('cancel_requested', sa.Boolean(), nullable=True),
+    sa.Column('report_id', sa.Integer(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['suite_id'], ['test_suites.id'], ),
+    sa.ForeignKeyConstraint(['report_id'], ['test_reports.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_test_jobs_id'), 'test_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_test_jobs_status'), 'test_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_test_jobs_status'), table_name='test_jobs')
+    op.drop_index(op.f('ix_test_jobs_id'), table_name='test_jobs')
+    op.drop_table('test_jobs')
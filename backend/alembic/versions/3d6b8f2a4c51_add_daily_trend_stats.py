@@ -0,0 +1,64 @@
+"""add_daily_trend_stats
+
+Revision ID: 3d6b8f2a4c51
+Revises: 2c9a5d7e1f38
+Create Date: 2026-10-18 19:41:16.582940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '3d6b8f2a4c51'
+down_revision: Union[str, Sequence[str], None] = '2c9a5d7e1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('case_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('test_case_id', sa.Integer(), nullable=False),
+    sa.Column('suite_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('pass_count', sa.Integer(), nullable=False),
+    sa.Column('fail_count', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('latency', postgresql.JSON(astext_type=Text()), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('test_case_id', 'suite_id', 'day', name='uq_case_daily_stats_case_suite_day')
+    )
+    op.create_index(op.f('ix_case_daily_stats_id'), 'case_daily_stats', ['id'], unique=False)
+    op.create_table('suite_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('suite_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('runs', sa.Integer(), nullable=False),
+    sa.Column('passed_runs', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('pass_count', sa.Integer(), nullable=False),
+    sa.Column('fail_count', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.Column('latency', postgresql.JSON(astext_type=Text()), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('suite_id', 'day', name='uq_suite_daily_stats_suite_day')
+    )
+    op.create_index(op.f('ix_suite_daily_stats_id'), 'suite_daily_stats', ['id'], unique=False)
+    op.add_column('test_reports', sa.Column('rolled_up_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_reports', 'rolled_up_at')
+    op.drop_index(op.f('ix_suite_daily_stats_id'), table_name='suite_daily_stats')
+    op.drop_table('suite_daily_stats')
+    op.drop_index(op.f('ix_case_daily_stats_id'), table_name='case_daily_stats')
+    op.drop_table('case_daily_stats')
@@ -0,0 +1,29 @@
+"""add_test_report_regression_summary
+
+Revision ID: 4e1a7c9d3b62
+Revises: 3d6b8f2a4c51
+Create Date: 2026-10-18 20:27:53.194608
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '4e1a7c9d3b62'
+down_revision: Union[str, Sequence[str], None] = '3d6b8f2a4c51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_reports', sa.Column('regression_summary', postgresql.JSON(astext_type=Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_reports', 'regression_summary')
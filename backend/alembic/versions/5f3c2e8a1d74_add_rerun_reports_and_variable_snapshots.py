@@ -0,0 +1,37 @@
+"""add_rerun_reports_and_variable_snapshots
+
+Revision ID: 5f3c2e8a1d74
+Revises: 4e1a7c9d3b62
+Create Date: 2026-10-18 21:14:38.620417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3c2e8a1d74'
+down_revision: Union[str, Sequence[str], None] = '4e1a7c9d3b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_reports', sa.Column('parent_report_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('test_reports_parent_report_id_fk', 'test_reports', 'test_reports', ['parent_report_id'], ['id'])
+    op.create_index('ix_test_reports_parent_report_id', 'test_reports', ['parent_report_id'], unique=False)
+    op.add_column('test_records', sa.Column('variables', postgresql.JSON(astext_type=Text()), nullable=True))
+    op.add_column('test_records', sa.Column('variables_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_records', 'variables_hash')
+    op.drop_column('test_records', 'variables')
+    op.drop_index('ix_test_reports_parent_report_id', table_name='test_reports')
+    op.drop_constraint('test_reports_parent_report_id_fk', 'test_reports', type_='foreignkey')
+    op.drop_column('test_reports', 'parent_report_id')
@@ -0,0 +1,29 @@
+"""add_test_report_checkpoint
+
+Revision ID: 6a4d1b7e9c85
+Revises: 5f3c2e8a1d74
+Create Date: 2026-10-18 22:03:51.284116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '6a4d1b7e9c85'
+down_revision: Union[str, Sequence[str], None] = '5f3c2e8a1d74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_reports', sa.Column('checkpoint', postgresql.JSON(astext_type=Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_reports', 'checkpoint')
@@ -0,0 +1,42 @@
+"""respace_test_case_priorities
+
+Revision ID: 7b5e2d9f4a16
+Revises: 6a4d1b7e9c85
+Create Date: 2026-10-18 23:12:07.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7b5e2d9f4a16'
+down_revision: Union[str, Sequence[str], None] = '6a4d1b7e9c85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 crud.ordering.SORT_KEY_GAP 一致
+SORT_KEY_GAP = 1024
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 旧数据的优先级多为 0..n 或全部为 0，拖动时没有空隙；按当前列表顺序一次性重排为等间隔
+    connection = op.get_bind()
+    ordered_ids = [row[0] for row in connection.execute(sa.text(
+        "SELECT id FROM test_cases ORDER BY priority ASC, created_at DESC, id DESC"
+    ))]
+    statement = sa.text("UPDATE test_cases SET priority = :priority WHERE id = :id")
+    for start in range(0, len(ordered_ids), BATCH_SIZE):
+        connection.execute(statement, [
+            {"id": case_id, "priority": (start + index) * SORT_KEY_GAP}
+            for index, case_id in enumerate(ordered_ids[start:start + BATCH_SIZE])
+        ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 重排只改变优先级的数值，不改变顺序，无需还原
+    pass
@@ -0,0 +1,31 @@
+"""add_load_test_fields_to_test_reports
+
+Revision ID: 7e2f4a9c1d35
+Revises: 3b7e51c2a9d4
+Create Date: 2026-10-18 11:03:27.418290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2f4a9c1d35'
+down_revision: Union[str, Sequence[str], None] = '3b7e51c2a9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_reports', sa.Column('run_type', sa.String(length=20), nullable=True))
+    op.add_column('test_reports', sa.Column('load_summary', postgresql.JSON(astext_type=Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_reports', 'load_summary')
+    op.drop_column('test_reports', 'run_type')
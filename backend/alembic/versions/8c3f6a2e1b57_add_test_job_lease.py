@@ -0,0 +1,30 @@
+"""add_test_job_lease
+
+Revision ID: 8c3f6a2e1b57
+Revises: 7b5e2d9f4a16
+Create Date: 2026-10-18 23:41:09.518372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3f6a2e1b57'
+down_revision: Union[str, Sequence[str], None] = '7b5e2d9f4a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_jobs', sa.Column('owner_id', sa.String(length=100), nullable=True))
+    op.add_column('test_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_jobs', 'heartbeat_at')
+    op.drop_column('test_jobs', 'owner_id')
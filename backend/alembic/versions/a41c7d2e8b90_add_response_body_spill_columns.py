@@ -0,0 +1,30 @@
+"""add_response_body_spill_columns
+
+Revision ID: a41c7d2e8b90
+Revises: 7e2f4a9c1d35
+Create Date: 2026-10-18 13:26:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7d2e8b90'
+down_revision: Union[str, Sequence[str], None] = '7e2f4a9c1d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_records', sa.Column('response_body_path', sa.String(length=255), nullable=True))
+    op.add_column('test_records', sa.Column('response_body_size', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_records', 'response_body_size')
+    op.drop_column('test_records', 'response_body_path')
@@ -0,0 +1,29 @@
+"""add_timings_to_test_records
+
+Revision ID: b8d3f61e0c27
+Revises: a41c7d2e8b90
+Create Date: 2026-10-18 14:41:08.337952
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import Text
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3f61e0c27'
+down_revision: Union[str, Sequence[str], None] = 'a41c7d2e8b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_records', sa.Column('timings', postgresql.JSON(astext_type=Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_records', 'timings')
@@ -0,0 +1,49 @@
+"""add_test_module_closure_table
+
+Revision ID: c5e9a2f47b13
+Revises: b8d3f61e0c27
+Create Date: 2026-10-18 15:06:27.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e9a2f47b13'
+down_revision: Union[str, Sequence[str], None] = 'b8d3f61e0c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    closure = op.create_table('test_module_closure',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['test_modules.id'], ),
+    sa.ForeignKeyConstraint(['descendant_id'], ['test_modules.id'], ),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_test_module_closure_descendant', 'test_module_closure', ['descendant_id', 'depth'], unique=False)
+
+    # 根据现有的 parent_id 回填闭包表
+    parents = dict(op.get_bind().execute(sa.text("SELECT id, parent_id FROM test_modules")).fetchall())
+    rows = []
+    for module_id in parents:
+        ancestor_id, depth, seen = module_id, 0, set()
+        while ancestor_id is not None and ancestor_id in parents and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append({'ancestor_id': ancestor_id, 'descendant_id': module_id, 'depth': depth})
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    if rows:
+        op.bulk_insert(closure, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_module_closure_descendant', table_name='test_module_closure')
+    op.drop_table('test_module_closure')
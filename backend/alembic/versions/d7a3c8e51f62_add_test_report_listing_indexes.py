@@ -0,0 +1,32 @@
+"""add_test_report_listing_indexes
+
+Revision ID: d7a3c8e51f62
+Revises: c5e9a2f47b13
+Create Date: 2026-10-18 15:32:54.906127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3c8e51f62'
+down_revision: Union[str, Sequence[str], None] = 'c5e9a2f47b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_test_reports_start_time_id', 'test_reports', ['start_time', 'id'], unique=False)
+    op.create_index('ix_test_reports_suite_start_time', 'test_reports', ['suite_id', 'start_time', 'id'], unique=False)
+    op.create_index('ix_test_reports_status_start_time', 'test_reports', ['status', 'start_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_reports_status_start_time', table_name='test_reports')
+    op.drop_index('ix_test_reports_suite_start_time', table_name='test_reports')
+    op.drop_index('ix_test_reports_start_time_id', table_name='test_reports')
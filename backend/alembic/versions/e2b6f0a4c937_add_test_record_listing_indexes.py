@@ -0,0 +1,30 @@
+"""add_test_record_listing_indexes
+
+Revision ID: e2b6f0a4c937
+Revises: d7a3c8e51f62
+Create Date: 2026-10-18 15:58:12.270431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6f0a4c937'
+down_revision: Union[str, Sequence[str], None] = 'd7a3c8e51f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_test_records_report_id_id', 'test_records', ['report_id', 'id'], unique=False)
+    op.create_index('ix_test_records_report_status', 'test_records', ['report_id', 'status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_records_report_status', table_name='test_records')
+    op.drop_index('ix_test_records_report_id_id', table_name='test_records')
@@ -0,0 +1,35 @@
+"""add_test_case_listing_indexes
+
+Revision ID: f4c1d9b26e58
+Revises: e2b6f0a4c937
+Create Date: 2026-10-18 16:21:45.613882
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c1d9b26e58'
+down_revision: Union[str, Sequence[str], None] = 'e2b6f0a4c937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_test_cases_listing', 'test_cases',
+                    ['priority', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_test_cases_module_listing', 'test_cases',
+                    ['module_id', 'priority', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+    op.create_index('ix_test_cases_method_listing', 'test_cases',
+                    ['method', 'priority', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_cases_method_listing', table_name='test_cases')
+    op.drop_index('ix_test_cases_module_listing', table_name='test_cases')
+    op.drop_index('ix_test_cases_listing', table_name='test_cases')
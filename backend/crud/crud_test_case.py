@@ -1,7 +1,13 @@
+from sqlalchemy import func, select, text
 from sqlalchemy.orm import Session, joinedload
+from core.config import PAGE_MAX_SIZE
+from crud.ordering import REBALANCE_WINDOW, bulk_update_column, key_between, keys_between, spaced_keys
+from crud.pagination import decode_cursor, keyset_after, next_cursor
 from models import test_case as test_case_model
+from models.test_module import TestModuleClosure
 from schemas import test_case as test_case_schema
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from services import execution_plan, template
 
 def get_test_case(db: Session, test_case_id: int):
     """
@@ -26,6 +32,66 @@ def get_test_cases(db: Session, skip: int = 0, limit: int = 100) -> List[test_ca
              )
 
 
+def get_test_cases_page(db: Session, limit: int = 50, cursor: Optional[str] = None,
+                        module_id: Optional[int] = None, include_submodules: bool = True,
+                        method: Optional[str] = None, name_prefix: Optional[str] = None
+                        ) -> Tuple[List[test_case_model.TestCase], Optional[str]]:
+    """
+    用例列表的游标分页：按 (priority ASC, created_at DESC, id DESC) 排序，与 get_test_cases 一致
+    module_id 默认包含整棵模块子树；返回 (本页用例, 下一页游标)
+    游标格式不正确时抛出 ValueError
+    """
+    TestCase = test_case_model.TestCase
+    limit = max(1, min(limit, PAGE_MAX_SIZE))
+    query = _filter_test_cases(db.query(TestCase), module_id, include_submodules, method, name_prefix)
+    if cursor:
+        query = query.filter(keyset_after(
+            (TestCase.priority, TestCase.created_at, TestCase.id), decode_cursor(cursor, 3), (False, True, True)
+        ))
+    rows = (
+        query.options(joinedload(TestCase.module_obj))
+        .order_by(TestCase.priority.asc(), TestCase.created_at.desc(), TestCase.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    return rows[:limit], next_cursor(rows, limit, lambda case: (case.priority, case.created_at, case.id))
+
+def count_test_cases(db: Session, module_id: Optional[int] = None, include_submodules: bool = True,
+                     method: Optional[str] = None, name_prefix: Optional[str] = None) -> Tuple[int, bool]:
+    """
+    用例总数，返回 (数量, 是否为估算值)
+    无过滤条件时在 MySQL 上读取 information_schema 中的表行数估算值，避免全表 COUNT；
+    有过滤条件时在对应索引上精确计数
+    """
+    TestCase = test_case_model.TestCase
+    filtered = module_id is not None or bool(method) or bool(name_prefix)
+    if not filtered and db.get_bind().dialect.name == "mysql":
+        estimate = db.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+        ), {"table_name": TestCase.__tablename__}).scalar()
+        if estimate is not None:
+            return int(estimate), True
+    query = _filter_test_cases(db.query(func.count(TestCase.id)), module_id, include_submodules, method, name_prefix)
+    return query.scalar(), False
+
+def _filter_test_cases(query, module_id: Optional[int], include_submodules: bool,
+                       method: Optional[str], name_prefix: Optional[str]):
+    TestCase = test_case_model.TestCase
+    if module_id is not None:
+        if include_submodules:
+            query = query.filter(TestCase.module_id.in_(
+                select(TestModuleClosure.descendant_id).where(TestModuleClosure.ancestor_id == module_id)
+            ))
+        else:
+            query = query.filter(TestCase.module_id == module_id)
+    if method:
+        query = query.filter(TestCase.method == method.upper())
+    if name_prefix:
+        query = query.filter(TestCase.name.startswith(name_prefix, autoescape=True))
+    return query
+
+
 def create_test_case(db: Session, test_case: test_case_schema.TestCaseCreate) -> test_case_model.TestCase:
     """
     在数据库中创建一个新的测试用例
@@ -45,6 +111,8 @@ def create_test_case(db: Session, test_case: test_case_schema.TestCaseCreate) ->
     db.add(db_test_case)
     db.commit()
     db.refresh(db_test_case)
+    # 新用例会出现在引用其所属模块的执行计划中
+    execution_plan.invalidate_case(db_test_case.id, [db_test_case.module_id])
     return db_test_case
 
 def update_test_case(db: Session, test_case_id: int, test_case: test_case_schema.TestCaseUpdate) -> Optional[test_case_model.TestCase]:
@@ -53,27 +121,94 @@ def update_test_case(db: Session, test_case_id: int, test_case: test_case_schema
     """
     db_test_case = get_test_case(db, test_case_id)
     if db_test_case:
+        old_module_id = db_test_case.module_id
         update_data = test_case.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_test_case, key, value)
         db.commit()
         db.refresh(db_test_case)
+        template.invalidate_case(test_case_id)
+        execution_plan.invalidate_case(test_case_id, [old_module_id, db_test_case.module_id])
     return db_test_case
 
-def reorder_test_cases(db: Session, test_case_ids: List[int]) -> List[test_case_model.TestCase]:
-    """根据提供的ID列表重新排序测试用例"""
-    updated_test_cases = []
-    for index, test_case_id in enumerate(test_case_ids):
-        db_test_case = db.query(test_case_model.TestCase).filter(test_case_model.TestCase.id == test_case_id).first()
-        if db_test_case:
-            db_test_case.priority = index  # 使用索引作为新的优先级
-            updated_test_cases.append(db_test_case)
-    db.bulk_save_objects(updated_test_cases)
+def reorder_test_cases(db: Session, test_case_ids: List[int]) -> int:
+    """
+    根据提供的ID列表重新排序测试用例：一条 UPDATE ... CASE 语句写入等间隔的优先级
+    返回更新的行数；移动单个用例应使用 move_test_case
+    """
+    keys = dict(zip(test_case_ids, spaced_keys(len(test_case_ids))))
+    updated = bulk_update_column(db, test_case_model.TestCase, "priority", keys)
+    db.commit()
+    # 模块下用例的执行顺序随优先级变化，整体重排时直接清空执行计划缓存
+    execution_plan.clear_cache()
+    return updated
+
+def _rebalance_test_cases(db: Session, anchor_id: int):
+    """
+    以 anchor_id 为中心局部重排优先级：取它前后各 window 个用例，在窗口外两侧相邻用例的优先级之间重新等距分配，
+    相对顺序不变，只更新窗口内的行（一条 UPDATE ... CASE）；两侧之间放不下时窗口翻倍，最多扩大到整张表
+    """
+    TestCase = test_case_model.TestCase
+    columns = (TestCase.priority, TestCase.created_at, TestCase.id)
+    anchor = db.execute(select(*columns).where(TestCase.id == anchor_id)).one()
+    window = REBALANCE_WINDOW
+    while True:
+        # 列表顺序为 (priority ASC, created_at DESC, id DESC)，向前取时按相反顺序
+        before = db.execute(
+            select(*columns).where(keyset_after(columns, tuple(anchor), (True, False, False)))
+            .order_by(TestCase.priority.desc(), TestCase.created_at.asc(), TestCase.id.asc())
+            .limit(window + 1)
+        ).all()
+        after = db.execute(
+            select(*columns).where(keyset_after(columns, tuple(anchor), (False, True, True)))
+            .order_by(TestCase.priority.asc(), TestCase.created_at.desc(), TestCase.id.desc())
+            .limit(window + 1)
+        ).all()
+        lower = before[window].priority if len(before) > window else None
+        upper = after[window].priority if len(after) > window else None
+        ordered_ids = [row.id for row in reversed(before[:window])] + [anchor_id] + [row.id for row in after[:window]]
+        keys = keys_between(lower, upper, len(ordered_ids))
+        if keys is not None:
+            bulk_update_column(db, TestCase, "priority", dict(zip(ordered_ids, keys)))
+            return
+        window *= 2
+
+def move_test_case(db: Session, test_case_id: int, prev_id: Optional[int] = None,
+                   next_id: Optional[int] = None) -> Optional[test_case_model.TestCase]:
+    """
+    把用例移动到 prev_id 与 next_id 之间（列表中的相邻用例，可只给一侧）
+    优先级取两侧的中点，只更新被移动的一行；相邻优先级之间没有空隙时先在附近局部重排一次
+    相邻用例不存在或顺序不正确时抛出 ValueError
+    """
+    TestCase = test_case_model.TestCase
+    db_test_case = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+    if not db_test_case:
+        return None
+    neighbour_ids = [neighbour_id for neighbour_id in (prev_id, next_id) if neighbour_id is not None]
+    if test_case_id in neighbour_ids:
+        raise ValueError("A test case cannot be moved next to itself.")
+
+    def neighbour_keys():
+        keys = dict(db.query(TestCase.id, TestCase.priority).filter(TestCase.id.in_(neighbour_ids)).all())
+        missing = [neighbour_id for neighbour_id in neighbour_ids if neighbour_id not in keys]
+        if missing:
+            raise ValueError(f"Test case {missing[0]} not found.")
+        return keys.get(prev_id), keys.get(next_id)
+
+    new_key = key_between(*neighbour_keys())
+    if new_key is None:
+        _rebalance_test_cases(db, prev_id if prev_id is not None else next_id)
+        # 批量 UPDATE 不同步会话中的对象，避免与旧值相同时被 ORM 判定为未修改
+        db.expire(db_test_case, ["priority"])
+        new_key = key_between(*neighbour_keys())
+        if new_key is None:
+            db.rollback()
+            raise ValueError(f"Test case {prev_id} must come before test case {next_id}.")
+    db_test_case.priority = new_key
     db.commit()
-    # 刷新以获取更新后的对象状态
-    for tc in updated_test_cases:
-        db.refresh(tc)
-    return updated_test_cases
+    db.refresh(db_test_case)
+    execution_plan.invalidate_case(test_case_id, [db_test_case.module_id])
+    return db_test_case
 
 def update_test_case_priority(db: Session, test_case_id: int, priority: int) -> Optional[test_case_model.TestCase]:
     """
@@ -84,6 +219,7 @@ def update_test_case_priority(db: Session, test_case_id: int, priority: int) ->
         db_test_case.priority = priority
         db.commit()
         db.refresh(db_test_case)
+        execution_plan.invalidate_case(test_case_id, [db_test_case.module_id])
     return db_test_case
 
 def delete_test_case(db: Session, test_case_id: int) -> Optional[test_case_model.TestCase]:
@@ -94,6 +230,8 @@ def delete_test_case(db: Session, test_case_id: int) -> Optional[test_case_model
     if db_test_case:
         db.delete(db_test_case)
         db.commit()
+        template.invalidate_case(test_case_id)
+        execution_plan.invalidate_case(test_case_id)
     return db_test_case
 
 def delete_test_cases(db: Session, test_case_ids: List[int]) -> int:
@@ -104,6 +242,9 @@ def delete_test_cases(db: Session, test_case_ids: List[int]) -> int:
     # synchronize_session=False 用于提高性能，因为我们不打算立即使用这些对象
     result = db.query(test_case_model.TestCase).filter(test_case_model.TestCase.id.in_(test_case_ids)).delete(synchronize_session=False)
     db.commit()
+    for test_case_id in test_case_ids:
+        template.invalidate_case(test_case_id)
+        execution_plan.invalidate_case(test_case_id)
     return result
 
 
@@ -129,4 +270,5 @@ def copy_test_case(db: Session, test_case_id: int):
     db.add(new_test_case)
     db.commit()
     db.refresh(new_test_case)
+    execution_plan.invalidate_case(new_test_case.id, [new_test_case.module_id])
     return new_test_case
\ No newline at end of file
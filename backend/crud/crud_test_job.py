@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models.test_job import TestJob
+from models.test_report import TestReport
+from schemas.test_job import TestJobCreate
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def create_test_job(db: Session, job: TestJobCreate) -> TestJob:
+    db_job = TestJob(**job.model_dump(), status="queued")
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_test_job(db: Session, job_id: int) -> Optional[TestJob]:
+    return db.query(TestJob).filter(TestJob.id == job_id).first()
+
+def get_test_jobs(db: Session, statuses: Optional[List[str]] = None, skip: int = 0, limit: int = 100) -> List[TestJob]:
+    query = db.query(TestJob)
+    if statuses:
+        query = query.filter(TestJob.status.in_(statuses))
+    return query.order_by(TestJob.id.desc()).offset(skip).limit(limit).all()
+
+def get_active_job(db: Session, job_type: str) -> Optional[TestJob]:
+    """获取指定类型中排队或执行中的任务"""
+    return (
+        db.query(TestJob)
+        .filter(TestJob.job_type == job_type, TestJob.status.in_(ACTIVE_STATUSES))
+        .order_by(TestJob.id.asc())
+        .first()
+    )
+
+def claim_next_job(db: Session, owner_id: str) -> Optional[TestJob]:
+    """
+    领取最早排队的任务并标记为 running，记录领取进程与首次心跳（即租约）
+    使用 SELECT ... FOR UPDATE SKIP LOCKED，多个 worker（或多个进程）不会领取到同一个任务
+    """
+    db_job = (
+        db.query(TestJob)
+        .filter(TestJob.status == "queued")
+        .order_by(TestJob.id.asc())
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if db_job is None:
+        db.commit()
+        return None
+    db_job.status = "running"
+    db_job.started_at = datetime.now()
+    db_job.owner_id = owner_id
+    db_job.heartbeat_at = db_job.started_at
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def finish_test_job(db: Session, job_id: int, status: str, error_message: Optional[str] = None,
+                    owner_id: Optional[str] = None) -> Optional[TestJob]:
+    """
+    owner_id 不为空时只结束仍由该进程持有的任务：租约过期后任务已被其他进程重新领取，不能覆盖其状态
+    """
+    db_job = get_test_job(db, job_id)
+    if db_job and owner_id is not None and db_job.owner_id != owner_id:
+        return db_job
+    if db_job:
+        db_job.status = status
+        db_job.error_message = error_message
+        db_job.finished_at = datetime.now()
+        db.commit()
+        db.refresh(db_job)
+    return db_job
+
+def request_cancel(db: Session, job_id: int) -> Optional[TestJob]:
+    """
+    排队中的任务直接取消；运行中的任务只打上取消标记，由执行线程在用例之间停止
+    """
+    db_job = get_test_job(db, job_id)
+    if db_job is None:
+        return None
+    if db_job.status == "queued":
+        db_job.status = "cancelled"
+        db_job.finished_at = datetime.now()
+    elif db_job.status == "running":
+        db_job.cancel_requested = True
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_cancel_requested_ids(db: Session, job_ids: List[int]) -> List[int]:
+    if not job_ids:
+        return []
+    rows = db.query(TestJob.id).filter(TestJob.id.in_(job_ids), TestJob.cancel_requested == True).all()
+    return [row.id for row in rows]
+
+def renew_job_leases(db: Session, owner_id: str, job_ids: List[int]) -> List[int]:
+    """
+    心跳：续期本进程持有的执行中任务，返回续期成功的任务ID
+    未能续期的任务说明租约已过期并被其他进程重新排队，调用方应停止执行
+    """
+    if not job_ids:
+        return []
+    query = db.query(TestJob).filter(
+        TestJob.id.in_(job_ids), TestJob.status == "running", TestJob.owner_id == owner_id
+    )
+    held_ids = [row.id for row in query.with_entities(TestJob.id).all()]
+    if held_ids:
+        db.query(TestJob).filter(TestJob.id.in_(held_ids), TestJob.owner_id == owner_id).update(
+            {TestJob.heartbeat_at: datetime.now()}, synchronize_session=False
+        )
+    db.commit()
+    return held_ids
+
+def requeue_interrupted_jobs(db: Session, lease_timeout: float) -> int:
+    """
+    租约过期（持有进程超过 lease_timeout 秒没有心跳）的 running 任务重新放回队列
+    其他存活进程持有的任务会持续心跳，不受影响；多个进程同时调用时由 UPDATE 的条件保证只重新排队一次
+    """
+    expired_before = datetime.now() - timedelta(seconds=lease_timeout)
+    count = db.query(TestJob).filter(
+        TestJob.status == "running",
+        or_(TestJob.heartbeat_at.is_(None), TestJob.heartbeat_at < expired_before)
+    ).update(
+        {TestJob.status: "queued", TestJob.started_at: None, TestJob.owner_id: None, TestJob.heartbeat_at: None},
+        synchronize_session=False
+    )
+    db.commit()
+    return count
+
+def fail_orphaned_reports(db: Session, lease_timeout: float) -> int:
+    """
+    仍处于 queued / running 却没有排队中或执行中任务的报告（如任务已被标记为失败）
+    不会再有人更新，标记为 error 并清空断点
+    提交任务时报告先于任务创建，只处理创建时间早于一个租约周期的报告，避免误伤其他进程刚提交的任务
+    """
+    active_report_ids = db.query(TestJob.report_id).filter(
+        TestJob.status.in_(ACTIVE_STATUSES), TestJob.report_id.isnot(None)
+    )
+    created_before = datetime.now() - timedelta(seconds=lease_timeout)
+    count = db.query(TestReport).filter(
+        TestReport.status.in_(ACTIVE_STATUSES), TestReport.id.notin_(active_report_ids),
+        TestReport.start_time < created_before
+    ).update(
+        {TestReport.status: "error", TestReport.end_time: datetime.now(), TestReport.checkpoint: None},
+        synchronize_session=False
+    )
+    db.commit()
+    return count
+
+def update_job_progress(db: Session, job_id: int, progress: dict):
+    """
+    写入任务进度并提交，调用方在同一事务中尚未提交的写入会一并提交
+    """
+    db.query(TestJob).filter(TestJob.id == job_id).update(
+        {TestJob.progress: progress}, synchronize_session=False
+    )
+    db.commit()
@@ -1,6 +1,10 @@
-from sqlalchemy.orm import Session
-from models.test_module import TestModule
+from typing import List, Optional
+from sqlalchemy import and_, delete, insert, literal, select
+from sqlalchemy.orm import Session, aliased
+from models.test_case import TestCase
+from models.test_module import TestModule, TestModuleClosure
 from schemas.test_module import TestModuleCreate, TestModuleUpdate
+from services import execution_plan
 
 def get_test_module(db: Session, module_id: int):
     return db.query(TestModule).filter(TestModule.id == module_id).first()
@@ -8,11 +12,81 @@ def get_test_module(db: Session, module_id: int):
 def get_test_modules(db: Session, skip: int = 0, limit: int = 100):
     return db.query(TestModule).offset(skip).limit(limit).all()
 
-def create_test_module(db: Session, module: TestModuleCreate):
+def get_subtree_module_ids(db: Session, module_id: int) -> List[int]:
+    """
+    获取模块子树下的全部模块ID（含自身），按深度排序
+    """
+    return list(db.execute(
+        select(TestModuleClosure.descendant_id)
+        .where(TestModuleClosure.ancestor_id == module_id)
+        .order_by(TestModuleClosure.depth, TestModuleClosure.descendant_id)
+    ).scalars())
+
+def get_subtree_test_cases(db: Session, module_id: int) -> List[TestCase]:
+    """
+    获取模块子树下的全部用例，按优先级排序（与用例列表一致）
+    """
+    return (
+        db.query(TestCase)
+        .join(TestModuleClosure, TestModuleClosure.descendant_id == TestCase.module_id)
+        .filter(TestModuleClosure.ancestor_id == module_id)
+        .order_by(TestCase.priority.asc(), TestCase.created_at.desc(), TestCase.id.desc())
+        .all()
+    )
+
+def _attach_subtree(db: Session, module_id: int, parent_id: Optional[int]):
+    """
+    把以 module_id 为根的子树挂到 parent_id 下：子树内每个节点 × 新父节点的每个祖先（含自身）各插入一行
+    """
+    if parent_id is None:
+        return
+    ancestor = aliased(TestModuleClosure)
+    subtree = aliased(TestModuleClosure)
+    db.execute(insert(TestModuleClosure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select(ancestor.ancestor_id, subtree.descendant_id, ancestor.depth + subtree.depth + 1)
+        .select_from(ancestor)
+        .join(subtree, subtree.ancestor_id == module_id)
+        .where(ancestor.descendant_id == parent_id)
+    ))
+
+def _detach_subtree(db: Session, module_id: int):
+    """
+    删除子树内节点与子树外祖先之间的闭包行，子树内部的行保持不变
+    """
+    subtree_ids = select(TestModuleClosure.descendant_id).where(TestModuleClosure.ancestor_id == module_id)
+    outer_ancestor_ids = (
+        select(TestModuleClosure.ancestor_id)
+        .where(and_(TestModuleClosure.descendant_id == module_id, TestModuleClosure.depth > 0))
+    )
+    # MySQL 不允许在 DELETE 的子查询中直接引用目标表，先取出ID
+    subtree_ids = list(db.execute(subtree_ids).scalars())
+    outer_ancestor_ids = list(db.execute(outer_ancestor_ids).scalars())
+    if subtree_ids and outer_ancestor_ids:
+        db.execute(delete(TestModuleClosure).where(and_(
+            TestModuleClosure.descendant_id.in_(subtree_ids),
+            TestModuleClosure.ancestor_id.in_(outer_ancestor_ids)
+        )))
+
+def add_test_module(db: Session, module: TestModuleCreate) -> TestModule:
+    """
+    插入模块及其闭包行，只 flush 不提交，供需要与其他写入同一事务提交的调用方（如批量导入）使用
+    调用方负责提交，以及使引用父模块的执行计划失效
+    """
     db_module = TestModule(**module.model_dump())
     db.add(db_module)
+    db.flush()
+    db.execute(insert(TestModuleClosure).values(ancestor_id=db_module.id, descendant_id=db_module.id, depth=0))
+    _attach_subtree(db, db_module.id, db_module.parent_id)
+    return db_module
+
+def create_test_module(db: Session, module: TestModuleCreate):
+    db_module = add_test_module(db, module)
     db.commit()
     db.refresh(db_module)
+    # 父模块子树变化，引用其祖先模块的执行计划需要重新展开
+    if db_module.parent_id is not None:
+        execution_plan.invalidate_module(db_module.parent_id)
     return db_module
 
 def update_test_module(db: Session, module_id: int, module: TestModuleUpdate):
@@ -20,16 +94,36 @@ def update_test_module(db: Session, module_id: int, module: TestModuleUpdate):
     if not db_module:
         return None
     update_data = module.model_dump(exclude_unset=True)
+    old_parent_id = db_module.parent_id
+    new_parent_id = update_data.get("parent_id", old_parent_id)
+    if new_parent_id != old_parent_id and new_parent_id is not None:
+        # 新父模块不能是自身或自身的后代
+        is_descendant = db.execute(select(literal(1)).where(and_(
+            TestModuleClosure.ancestor_id == module_id,
+            TestModuleClosure.descendant_id == new_parent_id
+        ))).first()
+        if is_descendant:
+            raise ValueError(f"Module {new_parent_id} is inside the subtree of module {module_id}.")
     for key, value in update_data.items():
         setattr(db_module, key, value)
     db.add(db_module)
+    if new_parent_id != old_parent_id:
+        db.flush()
+        _detach_subtree(db, module_id)
+        _attach_subtree(db, module_id, new_parent_id)
     db.commit()
     db.refresh(db_module)
+    execution_plan.invalidate_module(module_id)
+    if new_parent_id is not None and new_parent_id != old_parent_id:
+        execution_plan.invalidate_module(new_parent_id)
     return db_module
 
 def delete_test_module(db: Session, module_id: int):
     db_module = get_test_module(db, module_id)
     if db_module:
+        db.execute(delete(TestModuleClosure).where(TestModuleClosure.descendant_id == module_id))
+        db.execute(delete(TestModuleClosure).where(TestModuleClosure.ancestor_id == module_id))
         db.delete(db_module)
         db.commit()
-    return db_module
\ No newline at end of file
+        execution_plan.invalidate_module(module_id)
+    return db_module
@@ -1,7 +1,13 @@
-from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, load_only, undefer_group
+from core.config import PAGE_MAX_SIZE
+from crud.ordering import BULK_UPDATE_CHUNK
+from crud.pagination import decode_cursor, keyset_after, next_cursor
 from models import test_report as report_model
 from schemas import test_report as report_schema
-from typing import List, Optional
+from services import blob_store, response_store
+from typing import List, Optional, Tuple
 
 def create_test_report(db: Session, report: report_schema.TestReportCreate) -> report_model.TestReport:
     db_report = report_model.TestReport(**report.model_dump())
@@ -11,15 +17,54 @@ def create_test_report(db: Session, report: report_schema.TestReportCreate) -> r
     return db_report
 
 def get_test_report(db: Session, test_report_id: int):
-    return db.query(report_model.TestReport).filter(report_model.TestReport.id == test_report_id).options(
-        joinedload(report_model.TestReport.records)
-    ).first()
+    """获取报告详情（不加载执行记录，执行记录使用 get_test_records_page 分页读取）"""
+    return db.query(report_model.TestReport).filter(report_model.TestReport.id == test_report_id).first()
 
 def get_test_reports(db: Session, skip: int = 0, limit: int = 100):
     return db.query(report_model.TestReport).order_by(report_model.TestReport.start_time.desc()).offset(skip).limit(limit).all()
 
+def get_test_report_summaries(db: Session, limit: int = 50, cursor: Optional[str] = None,
+                              suite_id: Optional[int] = None, status: Optional[str] = None,
+                              start_from: Optional[datetime] = None, start_to: Optional[datetime] = None
+                              ) -> Tuple[List[report_model.TestReport], Optional[str]]:
+    """
+    报告列表（只含汇总字段，不触及 test_records，也不加载 load_summary）
+    按 (start_time, id) 倒序做游标分页，返回 (本页报告, 下一页游标)
+    游标格式不正确时抛出 ValueError
+    """
+    Report = report_model.TestReport
+    limit = max(1, min(limit, PAGE_MAX_SIZE))
+    query = db.query(Report).options(load_only(
+        Report.id, Report.suite_id, Report.suite_name, Report.start_time, Report.end_time, Report.duration,
+        Report.total_cases, Report.pass_count, Report.fail_count, Report.error_count, Report.status, Report.run_type, Report.parent_report_id,
+        Report.archived_at
+    ))
+    # 每个过滤条件都有以 (过滤列, start_time, id) 开头的索引支撑
+    if suite_id is not None:
+        query = query.filter(Report.suite_id == suite_id)
+    if status:
+        query = query.filter(Report.status == status)
+    if start_from is not None:
+        query = query.filter(Report.start_time >= start_from)
+    if start_to is not None:
+        query = query.filter(Report.start_time < start_to)
+    if cursor:
+        query = query.filter(keyset_after((Report.start_time, Report.id), decode_cursor(cursor, 2), (True, True)))
+    rows = query.order_by(Report.start_time.desc(), Report.id.desc()).limit(limit + 1).all()
+    return rows[:limit], next_cursor(rows, limit, lambda report: (report.start_time, report.id))
+
+def get_rerun_reports(db: Session, report_id: int) -> List[report_model.TestReport]:
+    """报告的重跑子报告（按开始时间倒序，只含汇总字段）"""
+    Report = report_model.TestReport
+    return db.query(Report).options(load_only(
+        Report.id, Report.suite_id, Report.suite_name, Report.start_time, Report.end_time, Report.duration,
+        Report.total_cases, Report.pass_count, Report.fail_count, Report.error_count, Report.status, Report.run_type,
+        Report.parent_report_id, Report.archived_at
+    )).filter(Report.parent_report_id == report_id).order_by(Report.start_time.desc(), Report.id.desc()).all()
+
 def update_test_report(db: Session, report_id: int, report: report_schema.TestReportUpdate) -> Optional[report_model.TestReport]:
-    db_report = get_test_report(db, report_id)
+    # 只更新报告本身的字段，不需要加载全部执行记录
+    db_report = get_test_report_summary(db, report_id)
     if db_report:
         update_data = report.model_dump(exclude_unset=True)
         for key, value in update_data.items():
@@ -30,8 +75,124 @@ def update_test_report(db: Session, report_id: int, report: report_schema.TestRe
     return db_report
 
 def create_test_record(db: Session, record: report_schema.TestRecordCreate) -> report_model.TestRecord:
-    db_record = report_model.TestRecord(**record.model_dump())
+    row = blob_store.intern_rows(db, [record.model_dump()])[0]
+    db_record = report_model.TestRecord(**row)
     db.add(db_record)
     db.commit()
     db.refresh(db_record)
-    return db_record
\ No newline at end of file
+    return blob_store.resolve_record(db, db_record)
+
+def bulk_create_test_records(db: Session, records: List[report_schema.TestRecordCreate]) -> int:
+    """
+    批量写入执行记录：一次多行 INSERT + 一次提交，不回查生成的记录
+    请求/响应头与请求/响应体写入 content_blobs（相同内容只存一份），记录中只保存哈希
+    """
+    if not records:
+        return 0
+    rows = blob_store.intern_rows(db, [record.model_dump() for record in records])
+    db.execute(insert(report_model.TestRecord), rows)
+    db.commit()
+    return len(records)
+
+def get_test_record(db: Session, test_record_id: int):
+    """获取单条执行记录的全部字段（一次查询加载 detail 延迟加载组，内容哈希还原为请求/响应内容）"""
+    db_record = db.query(report_model.TestRecord).options(undefer_group("detail")).filter(
+        report_model.TestRecord.id == test_record_id
+    ).first()
+    if db_record is not None:
+        blob_store.resolve_record(db, db_record)
+    return db_record
+
+def get_failed_test_records(db: Session, report_id: int) -> List[dict]:
+    """
+    报告中失败（fail/error）的执行记录，按执行顺序返回 {id, test_case_id, case_name, variables}
+    variables 为用例当时看到的变量快照（从 content_blobs 还原），早于快照功能的记录为 None
+    """
+    Record = report_model.TestRecord
+    rows = db.execute(
+        select(Record.id, Record.test_case_id, Record.case_name, Record.variables, Record.variables_hash)
+        .where(Record.report_id == report_id, Record.status.in_(("fail", "error")))
+        .order_by(Record.id)
+    ).mappings().all()
+    return blob_store.resolve_rows(db, [dict(row) for row in rows])
+
+def get_test_records_page(db: Session, report_id: int, limit: int = 50, cursor: Optional[str] = None,
+                          status: Optional[str] = None, case_name: Optional[str] = None,
+                          status_code: Optional[int] = None, min_duration: Optional[float] = None,
+                          max_duration: Optional[float] = None
+                          ) -> Tuple[List[report_model.TestRecord], Optional[str]]:
+    """
+    按执行顺序（id）分页读取报告的执行记录，只加载列表需要的字段
+    返回 (本页记录, 下一页游标)；游标格式不正确时抛出 ValueError
+    """
+    Record = report_model.TestRecord
+    limit = max(1, min(limit, PAGE_MAX_SIZE))
+    query = db.query(Record).filter(Record.report_id == report_id)
+    if status:
+        query = query.filter(Record.status == status)
+    if case_name:
+        query = query.filter(Record.case_name.contains(case_name, autoescape=True))
+    if status_code is not None:
+        query = query.filter(Record.status_code == status_code)
+    if min_duration is not None:
+        query = query.filter(Record.duration >= min_duration)
+    if max_duration is not None:
+        query = query.filter(Record.duration <= max_duration)
+    if cursor:
+        query = query.filter(keyset_after((Record.id,), decode_cursor(cursor, 1), (False,)))
+    rows = query.order_by(Record.id.asc()).limit(limit + 1).all()
+    return rows[:limit], next_cursor(rows, limit, lambda record: (record.id,))
+
+def delete_test_records(db: Session, report_id: int) -> int:
+    """删除报告下的全部执行记录，以及这些记录落盘的完整响应体"""
+    spill_paths = [path for (path,) in db.query(report_model.TestRecord.response_body_path).filter(
+        report_model.TestRecord.report_id == report_id,
+        report_model.TestRecord.response_body_path.isnot(None)
+    )]
+    response_store.delete_spilled(spill_paths)
+    blob_store.release_report(db, report_id)
+    result = db.query(report_model.TestRecord).filter(report_model.TestRecord.report_id == report_id).delete(synchronize_session=False)
+    db.commit()
+    return result
+
+def get_recorded_results(db: Session, report_id: int, limit: int) -> List[dict]:
+    """报告中前 limit 条执行记录的 {id, test_case_id, case_name, status, duration}，按执行顺序（id）返回"""
+    Record = report_model.TestRecord
+    rows = db.execute(
+        select(Record.id, Record.test_case_id, Record.case_name, Record.status, Record.duration)
+        .where(Record.report_id == report_id)
+        .order_by(Record.id)
+        .limit(limit)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+def trim_test_records(db: Session, report_id: int, keep: int) -> int:
+    """
+    只保留报告按执行顺序的前 keep 条执行记录，删除其余记录及其落盘的响应体并提交，返回删除的条数
+    用于断点续跑：断点之后才落库的记录会被重新执行
+    """
+    Record = report_model.TestRecord
+    query = select(Record.id, Record.response_body_path).where(Record.report_id == report_id).order_by(Record.id)
+    rows = db.execute(query.offset(keep)).all()
+    if not rows:
+        return 0
+    record_ids = [record_id for record_id, _ in rows]
+    response_store.delete_spilled([path for _, path in rows if path])
+    blob_store.release_records(db, record_ids)
+    for start in range(0, len(record_ids), BULK_UPDATE_CHUNK):
+        db.query(Record).filter(Record.id.in_(record_ids[start:start + BULK_UPDATE_CHUNK])).delete(synchronize_session=False)
+    db.commit()
+    return len(record_ids)
+
+def save_report_checkpoint(db: Session, report_id: int, checkpoint: Optional[dict]):
+    """
+    写入报告的执行断点并提交（None 表示清空），不加载报告对象
+    """
+    db.query(report_model.TestReport).filter(report_model.TestReport.id == report_id).update(
+        {report_model.TestReport.checkpoint: checkpoint}, synchronize_session=False
+    )
+    db.commit()
+
+def get_test_report_summary(db: Session, test_report_id: int):
+    """获取报告本身（不加载执行记录）"""
+    return db.query(report_model.TestReport).filter(report_model.TestReport.id == test_report_id).first()
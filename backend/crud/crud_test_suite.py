@@ -1,7 +1,9 @@
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Tuple, Union, Dict, Any
 from sqlalchemy.orm import Session, joinedload
 from models.test_suite import TestSuite, TestSuiteItem
 from schemas.test_suite import TestSuiteCreate, TestSuiteUpdate, TestSuiteItemCreate
+from crud.ordering import bulk_update_column, key_between, spaced_keys
+from services import execution_plan
 
 def get_test_suite(db: Session, test_suite_id: int):
     return db.query(TestSuite).options(
@@ -59,6 +61,79 @@ def create_test_suite(db: Session, test_suite: TestSuiteCreate):
     db.refresh(db_test_suite)
     return db_test_suite
 
+def _item_key(item) -> Tuple[str, Optional[int], Optional[int], Optional[int]]:
+    if isinstance(item, dict):
+        return (item.get("item_type"), item.get("test_case_id"), item.get("module_id"), item.get("child_suite_id"))
+    item_type = getattr(item.item_type, "value", item.item_type)
+    return (item_type, item.test_case_id, item.module_id, item.child_suite_id)
+
+def _sync_items(db: Session, db_test_suite: TestSuite, items_data: List[Union[TestSuiteItemCreate, Dict[str, Any]]]):
+    """
+    把套件条目同步为 items_data：引用相同对象的条目保留原行（只在 sort_order 变化时批量更新），
+    不再出现的条目删除，多出的条目插入；调整顺序不会再删除并重建全部条目
+    """
+    existing: Dict[Tuple, List[TestSuiteItem]] = {}
+    for db_item in db_test_suite.items:
+        existing.setdefault(_item_key(db_item), []).append(db_item)
+
+    new_orders: Dict[int, int] = {}
+    for item_in in items_data:
+        sort_order = item_in.get("sort_order", 0) if isinstance(item_in, dict) else item_in.sort_order
+        matches = existing.get(_item_key(item_in))
+        if matches:
+            db_item = matches.pop(0)
+            if db_item.sort_order != sort_order:
+                new_orders[db_item.id] = sort_order
+        else:
+            _create_item(db, db_test_suite.id, item_in)
+
+    # 从集合中移除，cascade="all, delete-orphan" 会删除对应的行
+    for remaining in existing.values():
+        for db_item in remaining:
+            db_test_suite.items.remove(db_item)
+    if new_orders:
+        bulk_update_column(db, TestSuiteItem, "sort_order", new_orders)
+
+def move_suite_item(db: Session, test_suite_id: int, item_id: int, prev_id: Optional[int] = None,
+                    next_id: Optional[int] = None) -> Optional[TestSuiteItem]:
+    """
+    把套件条目移动到同一套件内的 prev_id 与 next_id 之间，只更新被移动的一行；
+    相邻 sort_order 之间没有空隙时先把该套件的条目整体重排一次
+    相邻条目不存在或顺序不正确时抛出 ValueError
+    """
+    db_item = db.query(TestSuiteItem).filter(TestSuiteItem.id == item_id, TestSuiteItem.suite_id == test_suite_id).first()
+    if not db_item:
+        return None
+    neighbour_ids = [neighbour_id for neighbour_id in (prev_id, next_id) if neighbour_id is not None]
+    if item_id in neighbour_ids:
+        raise ValueError("An item cannot be moved next to itself.")
+
+    def neighbour_keys():
+        keys = dict(db.query(TestSuiteItem.id, TestSuiteItem.sort_order).filter(
+            TestSuiteItem.suite_id == test_suite_id, TestSuiteItem.id.in_(neighbour_ids)
+        ).all())
+        missing = [neighbour_id for neighbour_id in neighbour_ids if neighbour_id not in keys]
+        if missing:
+            raise ValueError(f"Item {missing[0]} not found in suite {test_suite_id}.")
+        return keys.get(prev_id), keys.get(next_id)
+
+    new_key = key_between(*neighbour_keys())
+    if new_key is None:
+        ordered_ids = [row_id for (row_id,) in db.query(TestSuiteItem.id).filter(
+            TestSuiteItem.suite_id == test_suite_id
+        ).order_by(TestSuiteItem.sort_order, TestSuiteItem.id)]
+        bulk_update_column(db, TestSuiteItem, "sort_order", dict(zip(ordered_ids, spaced_keys(len(ordered_ids)))))
+        db.expire(db_item, ["sort_order"])
+        new_key = key_between(*neighbour_keys())
+        if new_key is None:
+            db.rollback()
+            raise ValueError(f"Item {prev_id} must come before item {next_id}.")
+    db_item.sort_order = new_key
+    db.commit()
+    db.refresh(db_item)
+    execution_plan.invalidate_suite(test_suite_id)
+    return db_item
+
 def update_test_suite(db: Session, test_suite_id: int, test_suite: TestSuiteUpdate):
     db_test_suite = get_test_suite(db, test_suite_id)
     if not db_test_suite:
@@ -66,36 +141,9 @@ def update_test_suite(db: Session, test_suite_id: int, test_suite: TestSuiteUpda
         
     update_data = test_suite.dict(exclude_unset=True)
     
-    # 处理 items 更新
+    # 处理 items 更新：与现有条目按引用对象逐一比对，只插入新增、删除移除、更新排序变化的条目
     if "items" in update_data:
-        items_data = update_data.pop("items")
-        
-        # 使用 ORM 方式清空旧 items，这样 Session 状态会自动同步
-        # 因为在 models 中配置了 cascade="all, delete-orphan"，
-        # 从 items 集合中移除对象会自动触发删除操作
-        db_test_suite.items = []
-        
-        # 添加新的 items
-        for item_in in items_data:
-            # 构造新的 TestSuiteItem 对象
-            if isinstance(item_in, dict):
-                new_item = TestSuiteItem(
-                    item_type=item_in.get("item_type"),
-                    test_case_id=item_in.get("test_case_id"),
-                    module_id=item_in.get("module_id"),
-                    child_suite_id=item_in.get("child_suite_id"),
-                    sort_order=item_in.get("sort_order", 0)
-                )
-            else:
-                new_item = TestSuiteItem(
-                    item_type=item_in.item_type,
-                    test_case_id=item_in.test_case_id,
-                    module_id=item_in.module_id,
-                    child_suite_id=item_in.child_suite_id,
-                    sort_order=item_in.sort_order
-                )
-            # 添加到集合中，Session 会自动处理
-            db_test_suite.items.append(new_item)
+        _sync_items(db, db_test_suite, update_data.pop("items"))
 
     # 更新其他字段
     for key, value in update_data.items():
@@ -104,6 +152,8 @@ def update_test_suite(db: Session, test_suite_id: int, test_suite: TestSuiteUpda
     db.add(db_test_suite)
     db.commit()
     db.refresh(db_test_suite)
+    # 包含该套件的所有执行计划（包括以它为子套件的父套件）一并失效
+    execution_plan.invalidate_suite(test_suite_id)
     return db_test_suite
 
 def delete_test_suite(db: Session, test_suite_id: int):
@@ -115,4 +165,5 @@ def delete_test_suite(db: Session, test_suite_id: int):
         # 删除套件本身（SQLAlchemy 的 cascade 会自动处理属于此套件的 items）
         db.delete(db_test_suite)
         db.commit()
+        execution_plan.invalidate_suite(test_suite_id)
     return db_test_suite
\ No newline at end of file
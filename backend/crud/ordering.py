@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+# 排序键之间的默认间隔：新位置取相邻两个键的中点，移动一个条目只更新一行；
+# 间隔用尽（相邻键相差不足 2）时才重排
+SORT_KEY_GAP = 1024
+# 局部重排时被移动位置两侧各取的条目数，区间内放不下时逐次翻倍
+REBALANCE_WINDOW = 32
+# 单条 UPDATE ... CASE 语句最多包含的行数，避免语句过长
+BULK_UPDATE_CHUNK = 1000
+
+
+def key_between(lower: Optional[int], upper: Optional[int]) -> Optional[int]:
+    """
+    返回严格位于 lower 与 upper 之间的排序键，None 表示该侧没有相邻条目
+    没有可用的整数（需要重排）时返回 None
+    """
+    if lower is None and upper is None:
+        return 0
+    if lower is None:
+        return upper - SORT_KEY_GAP
+    if upper is None:
+        return lower + SORT_KEY_GAP
+    if upper - lower < 2:
+        return None
+    return (lower + upper) // 2
+
+
+def spaced_keys(count: int) -> List[int]:
+    """重排时使用的等间隔排序键"""
+    return [index * SORT_KEY_GAP for index in range(count)]
+
+
+def keys_between(lower: Optional[int], upper: Optional[int], count: int) -> Optional[List[int]]:
+    """
+    局部重排时使用：count 个严格位于 lower 与 upper 之间、两两相差至少 2 的递增排序键
+    None 表示该侧没有条目；区间内放不下时返回 None（需要扩大重排范围）
+    """
+    if lower is None and upper is None:
+        return spaced_keys(count)
+    if lower is None:
+        return [upper - SORT_KEY_GAP * (count - index) for index in range(count)]
+    if upper is None:
+        return [lower + SORT_KEY_GAP * (index + 1) for index in range(count)]
+    step = min((upper - lower) // (count + 1), SORT_KEY_GAP)
+    if step < 2:
+        return None
+    return [lower + step * (index + 1) for index in range(count)]
+
+
+def bulk_update_column(db: Session, model: Any, column: str, values: Dict[int, Any]) -> int:
+    """
+    用 UPDATE ... SET column = CASE id WHEN ... END WHERE id IN (...) 批量写入，
+    每 BULK_UPDATE_CHUNK 行一条语句，不提交事务，返回更新的行数
+    """
+    updated = 0
+    ids: Sequence[int] = list(values)
+    for start in range(0, len(ids), BULK_UPDATE_CHUNK):
+        chunk = ids[start:start + BULK_UPDATE_CHUNK]
+        result = db.execute(
+            update(model)
+            .where(model.id.in_(chunk))
+            .values({column: case({item_id: values[item_id] for item_id in chunk}, value=model.id)})
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    return updated
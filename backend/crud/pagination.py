@@ -0,0 +1,46 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    把排序键编码为不透明的游标字符串（URL 安全的 base64 JSON），datetime 以 ISO 格式保存
+    """
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """解析 encode_cursor 生成的游标，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: Sequence[bool]):
+    """
+    生成“位于游标之后”的过滤条件：(c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    descending 指定每一列是否倒序；展开成 OR 形式而不是行值比较，以便混合升降序且兼容各数据库
+    """
+    clauses = []
+    for index, (column, value, desc) in enumerate(zip(columns, values, descending)):
+        equal_prefix = [columns[i] == values[i] for i in range(index)]
+        clauses.append(and_(*equal_prefix, column < value if desc else column > value))
+    return or_(*clauses)
+
+
+def next_cursor(rows: List[Any], limit: int, key) -> Optional[str]:
+    """rows 多取了一条用于判断是否还有下一页；有下一页时返回最后一条（第 limit 条）的游标"""
+    if len(rows) <= limit:
+        return None
+    return encode_cursor(key(rows[limit - 1]))
@@ -1,24 +1,51 @@
-from fastapi import FastAPI, Depends, HTTPException
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
+from core.config import (BACKUP_MAX_UPLOAD_BYTES, IMPORT_MAX_UPLOAD_BYTES, IMPORT_UPLOAD_DIR, LOAD_TEST_MAX_CONCURRENCY,
+                         LOAD_TEST_MAX_DURATION, REGRESSION_ALPHA, REGRESSION_MIN_DELTA_MS, REGRESSION_MIN_SLOWDOWN,
+                         RETENTION_ENABLED)
 from core.database import SessionLocal, engine, Base
 from models import test_case as test_case_model
 from models import test_module as test_module_model
 from crud import crud_test_case, crud_test_module
 from schemas import test_case as test_case_schema
 from schemas import test_module as test_module_schema
-from services.test_runner import TestRunner
-from typing import List
+from services import (blob_store, case_import, data_transfer, execution_plan, http_pool, jsonpath_cache,
+                      regression, response_store, retention, template, trend_rollup)
+from services.job_queue import job_queue
+from services import run_events
+from typing import List, Optional
 from pydantic import BaseModel
 from schemas import test_suite as test_suite_schema
 from crud import crud_test_suite
 from crud import crud_test_report
 from schemas import test_report as test_report_schema
+from crud import crud_test_job
+from schemas import test_job as test_job_schema
+from schemas import trend as trend_schema
+from schemas import regression as regression_schema
 
 test_case_model.Base.metadata.create_all(bind=engine)
 test_module_model.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动后台任务队列与保留任务调度，关闭时等待工作线程退出
+    job_queue.start()
+    if RETENTION_ENABLED:
+        retention.retention_scheduler.start(job_queue)
+    yield
+    retention.retention_scheduler.stop()
+    job_queue.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS 中间件配置
 origins = [
@@ -53,6 +80,25 @@ def read_test_cases(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
     test_cases = crud_test_case.get_test_cases(db, skip=skip, limit=limit)
     return test_cases
 
+@app.get("/testcases/page", response_model=test_case_schema.TestCasePage)
+def read_test_cases_page(limit: int = 50, cursor: Optional[str] = None, module_id: Optional[int] = None,
+                         include_submodules: bool = True, method: Optional[str] = None,
+                         name_prefix: Optional[str] = None, with_total: bool = False,
+                         db: Session = Depends(get_db)):
+    """
+    用例列表的游标分页，可按模块（默认含子模块）、请求方法、名称前缀过滤
+    with_total=true 时附带总数：无过滤条件时为估算值
+    """
+    filters = dict(module_id=module_id, include_submodules=include_submodules, method=method, name_prefix=name_prefix)
+    try:
+        items, next_cursor = crud_test_case.get_test_cases_page(db, limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page = {"items": items, "next_cursor": next_cursor}
+    if with_total:
+        page["total"], page["total_estimated"] = crud_test_case.count_test_cases(db, **filters)
+    return page
+
 @app.get("/testcases/{test_case_id}", response_model=test_case_schema.TestCase)
 def read_test_case(test_case_id: int, db: Session = Depends(get_db)):
     """
@@ -102,23 +148,88 @@ def copy_test_case(test_case_id: int, db: Session = Depends(get_db)):
 @app.post("/testsuites/execute")
 def execute_test_suite(suite: test_case_schema.TestSuiteExecute, db: Session = Depends(get_db)):
     """
-    API接口：执行一个测试套件
+    API接口：按用例ID列表提交一次执行任务，立即返回任务与报告ID
     """
-    runner = TestRunner(db=db)
-    results = runner.run_test_suite(test_case_ids=suite.test_case_ids)
+    db_job = job_queue.submit_cases(db, suite.test_case_ids)
     return {
-        "message": "Test suite execution completed.",
-        "results": results,
-        "final_variables": runner.variables
+        "message": "Test suite execution queued.",
+        "job_id": db_job.id,
+        "report_id": db_job.report_id,
+        "status": db_job.status
     }
 
 class TestCaseReorder(BaseModel):
     test_case_ids: List[int]
 
+class ItemMove(BaseModel):
+    # 移动后位于其前、后的相邻条目ID，移动到开头或末尾时只需给出一侧
+    prev_id: Optional[int] = None
+    next_id: Optional[int] = None
+
 @app.post("/testcases/reorder")
 def reorder_test_cases(test_case_reorder: TestCaseReorder, db: Session = Depends(get_db)):
-    updated_test_cases = crud_test_case.reorder_test_cases(db=db, test_case_ids=test_case_reorder.test_case_ids)
-    return {"message": "Test cases reordered successfully", "updated_count": len(updated_test_cases)}
+    """
+    按完整的ID列表重排用例（一条批量 UPDATE）；拖动单个用例请使用 /testcases/{id}/move
+    """
+    updated_count = crud_test_case.reorder_test_cases(db=db, test_case_ids=test_case_reorder.test_case_ids)
+    return {"message": "Test cases reordered successfully", "updated_count": updated_count}
+
+@app.post("/testcases/{test_case_id}/move", response_model=test_case_schema.TestCase)
+def move_test_case(test_case_id: int, move: ItemMove, db: Session = Depends(get_db)):
+    """
+    把用例移动到两个相邻用例之间，只更新被移动的用例
+    """
+    try:
+        db_test_case = crud_test_case.move_test_case(db, test_case_id, prev_id=move.prev_id, next_id=move.next_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_test_case is None:
+        raise HTTPException(status_code=404, detail="Test case not found")
+    return db_test_case
+
+async def _save_upload(request: Request, ext: str, max_bytes: int) -> str:
+    """
+    把请求体边接收边写入 IMPORT_UPLOAD_DIR，返回文件路径；超出大小或为空时删除文件并返回错误
+    """
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}")
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes} bytes.")
+                f.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty import file.")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+@app.post("/testcases/import", response_model=test_job_schema.TestJob)
+async def import_test_cases(request: Request, format: str = "auto", file_name: Optional[str] = None,
+                            module_id: Optional[int] = None, base_url: Optional[str] = None,
+                            db: Session = Depends(get_db)):
+    """
+    导入 OpenAPI / HAR / Postman 文件为用例，请求体为文件原始内容
+    上传内容边接收边写入磁盘，解析与写入在后台任务中分批进行，进度通过 /jobs/{job_id} 查询
+    """
+    if format != "auto" and format not in case_import.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be 'auto' or one of {', '.join(case_import.FORMATS)}.")
+    if module_id is not None and crud_test_module.get_test_module(db, module_id) is None:
+        raise HTTPException(status_code=404, detail="Module not found")
+
+    path = await _save_upload(request, os.path.splitext(file_name or "")[1].lower() or ".json", IMPORT_MAX_UPLOAD_BYTES)
+    if format == "auto":
+        try:
+            format = case_import.detect_format(path, file_name)
+        except ValueError as e:
+            os.remove(path)
+            raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(job_queue.submit_import, db, path, format,
+                                   module_id=module_id, base_url=base_url, file_name=file_name)
 
 # --- Test Modules API ---
 
@@ -137,9 +248,21 @@ def read_module(module_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Module not found")
     return db_module
 
+@app.get("/modules/{module_id}/testcases", response_model=List[test_case_schema.TestCase])
+def read_module_subtree_cases(module_id: int, db: Session = Depends(get_db)):
+    """
+    获取模块子树（含所有子模块）下的全部用例，按优先级排序
+    """
+    if crud_test_module.get_test_module(db, module_id=module_id) is None:
+        raise HTTPException(status_code=404, detail="Module not found")
+    return crud_test_module.get_subtree_test_cases(db, module_id=module_id)
+
 @app.put("/modules/{module_id}", response_model=test_module_schema.TestModule)
 def update_module(module_id: int, module: test_module_schema.TestModuleUpdate, db: Session = Depends(get_db)):
-    db_module = crud_test_module.update_test_module(db=db, module_id=module_id, module=module)
+    try:
+        db_module = crud_test_module.update_test_module(db=db, module_id=module_id, module=module)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if db_module is None:
         raise HTTPException(status_code=404, detail="Module not found")
     return db_module
@@ -152,6 +275,19 @@ def delete_module(module_id: int, db: Session = Depends(get_db)):
     return db_module
 
 
+@app.get("/runner/stats")
+def read_runner_stats():
+    """
+    获取执行引擎的运行时统计（JSONPath 编译缓存、模板缓存、执行计划缓存命中率、连接池与 DNS 缓存等）
+    """
+    return {
+        "jsonpath_cache": jsonpath_cache.cache_stats(),
+        "template_cache": template.cache_stats(),
+        "plan_cache": execution_plan.cache_stats(),
+        "http_pool": http_pool.stats()
+    }
+
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
@@ -182,6 +318,19 @@ def update_test_suite(test_suite_id: int, test_suite: test_suite_schema.TestSuit
         raise HTTPException(status_code=404, detail="Test suite not found")
     return db_test_suite
 
+@app.post("/suites/{test_suite_id}/items/{item_id}/move")
+def move_test_suite_item(test_suite_id: int, item_id: int, move: ItemMove, db: Session = Depends(get_db)):
+    """
+    把套件条目移动到同一套件的两个相邻条目之间，只更新被移动的条目
+    """
+    try:
+        db_item = crud_test_suite.move_suite_item(db, test_suite_id, item_id, prev_id=move.prev_id, next_id=move.next_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Test suite item not found")
+    return {"id": db_item.id, "sort_order": db_item.sort_order}
+
 @app.delete("/suites/{test_suite_id}", response_model=test_suite_schema.TestSuite)
 def delete_test_suite(test_suite_id: int, db: Session = Depends(get_db)):
     db_test_suite = crud_test_suite.delete_test_suite(db, test_suite_id=test_suite_id)
@@ -190,35 +339,347 @@ def delete_test_suite(test_suite_id: int, db: Session = Depends(get_db)):
     return db_test_suite
 
 @app.post("/suites/run/{test_suite_id}")
-def run_test_suite_endpoint(test_suite_id: int, db: Session = Depends(get_db)):
-    runner = TestRunner(db=db)
-    results, report_id = runner.run_full_suite(suite_id=test_suite_id)
-    
-    # 检查是否因为找不到套件而返回错误
-    if len(results) == 1 and results[0].get("name") == "Unknown Suite":
-        raise HTTPException(status_code=404, detail=results[0].get("response"))
+def run_test_suite_endpoint(test_suite_id: int, mode: str = "async", workers: Optional[int] = None,
+                            db: Session = Depends(get_db)):
+    """
+    提交套件执行任务，立即返回任务与报告ID，执行进度通过 /jobs/{job_id} 或报告查询
+    mode=process 时按顶层条目分片、多进程执行（分片之间不共享变量），workers 指定进程数
+    """
+    if mode not in ("async", "process"):
+        raise HTTPException(status_code=400, detail="mode must be 'async' or 'process'.")
+    db_test_suite = crud_test_suite.get_test_suite(db, test_suite_id=test_suite_id)
+    if db_test_suite is None:
+        raise HTTPException(status_code=404, detail=f"Test suite with id {test_suite_id} not found.")
 
+    db_job = job_queue.submit_suite(db, db_test_suite, mode=mode, workers=workers)
     return {
-        "message": "Test suite execution completed.",
-        "results": results,
-        "final_variables": runner.variables,
-        "report_id": report_id
+        "message": "Test suite execution queued.",
+        "job_id": db_job.id,
+        "report_id": db_job.report_id,
+        "status": db_job.status
     }
 
-@app.get("/reports/list", response_model=List[test_report_schema.TestReport])
-def read_test_reports(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@app.post("/load-tests/")
+def create_load_test(load: test_job_schema.LoadTestCreate, db: Session = Depends(get_db)):
     """
-    获取测试报告列表
+    提交压测任务：对用例列表或套件以固定并发 / 目标 RPS 持续执行 duration 秒
+    结果（吞吐量、p50/p90/p99/max 延迟、错误统计）汇总在报告的 load_summary 中
     """
-    test_reports = crud_test_report.get_test_reports(db, skip=skip, limit=limit)
-    return test_reports
+    if bool(load.test_case_ids) == (load.suite_id is not None):
+        raise HTTPException(status_code=400, detail="Provide either test_case_ids or suite_id.")
+    if not 0 < load.duration <= LOAD_TEST_MAX_DURATION:
+        raise HTTPException(status_code=400, detail=f"duration must be in (0, {LOAD_TEST_MAX_DURATION}].")
+    if not 1 <= load.concurrency <= LOAD_TEST_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be in [1, {LOAD_TEST_MAX_CONCURRENCY}].")
+    if load.target_rps is not None and load.target_rps <= 0:
+        raise HTTPException(status_code=400, detail="target_rps must be positive.")
+
+    if load.suite_id is not None:
+        db_test_suite = crud_test_suite.get_test_suite(db, test_suite_id=load.suite_id)
+        if db_test_suite is None:
+            raise HTTPException(status_code=404, detail=f"Test suite with id {load.suite_id} not found.")
+        suite_name = f"压测: {db_test_suite.name}"
+    else:
+        suite_name = f"压测 ({len(load.test_case_ids)} 个用例)"
+
+    db_job = job_queue.submit_load(db, load, suite_name)
+    return {
+        "message": "Load test queued.",
+        "job_id": db_job.id,
+        "report_id": db_job.report_id,
+        "status": db_job.status
+    }
+
+# ------------------------------------------------------------------------------
+# Export / Import API
+# ------------------------------------------------------------------------------
 
-@app.get("/reports/{report_id}", response_model=test_report_schema.TestReport)
+@app.get("/export/{kind}")
+def export_data(kind: str, compress: bool = False, suite_id: Optional[int] = None,
+                start_from: Optional[datetime] = None, start_to: Optional[datetime] = None):
+    """
+    以 NDJSON 流式导出数据，kind: testcases（模块与用例）、suites（套件与条目）、reports（报告与记录）、all
+    报告可按套件和开始时间过滤；compress=true 时输出 gzip
+    """
+    if kind not in data_transfer.EXPORT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(data_transfer.EXPORT_KINDS)}.")
+    filters = {}
+    if kind in ("reports", "all"):
+        filters = dict(suite_id=suite_id, start_from=start_from, start_to=start_to)
+    file_name = f"{kind}-{datetime.now():%Y%m%d%H%M%S}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        data_transfer.export_stream(kind, compress=compress, **filters),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+@app.post("/import/ndjson", response_model=test_job_schema.TestJob)
+async def import_ndjson(request: Request, same_database: bool = False, db: Session = Depends(get_db)):
+    """
+    导入 /export 导出的 NDJSON（可为 gzip），请求体为文件原始内容；在后台任务中分批写入，进度通过 /jobs/{job_id} 查询
+    文件之外的引用默认置空；same_database=true 表示文件导出自本库，按ID关联本库中已有的用例、模块和套件
+    """
+    path = await _save_upload(request, ".ndjson", BACKUP_MAX_UPLOAD_BYTES)
+    return await run_in_threadpool(job_queue.submit_ndjson_import, db, path, same_database)
+
+@app.post("/retention/run", response_model=test_job_schema.TestJob)
+def run_retention(max_reports: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    立即提交一轮保留任务：归档超出保留期（RETENTION_KEEP_DAYS 天且不在套件最近 RETENTION_KEEP_RUNS 次内）的报告
+    """
+    return job_queue.submit_retention(db, max_reports=max_reports)
+
+@app.get("/retention/partitioning")
+def read_records_partitioning(db: Session = Depends(get_db)):
+    return {"strategy": retention.records_partitioning(db)}
+
+@app.post("/retention/partitioning")
+def partition_records(strategy: str, db: Session = Depends(get_db)):
+    """
+    把 test_records 改为分区表（仅 MySQL，一次性操作，会重建整张表）：
+    report 按报告ID范围分区，month 按开始时间每月分区；之后保留任务会自动补充新分区并删除已清空的旧分区
+    """
+    try:
+        partitions = retention.partition_records_table(db, strategy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"strategy": strategy, "partitions": partitions}
+
+@app.get("/trends/testcases/{test_case_id}", response_model=trend_schema.CaseTrend)
+def read_test_case_trend(test_case_id: int, days: Optional[int] = None, suite_id: Optional[int] = None,
+                         db: Session = Depends(get_db)):
+    """
+    用例最近 days 天（默认 TREND_DEFAULT_DAYS）每天的通过率与延迟分位数，附带上一个同长度窗口的汇总用于环比
+    只读取每日统计表，耗时与历史执行记录的数量无关
+    """
+    try:
+        return trend_rollup.case_trend(db, test_case_id, days=days, suite_id=suite_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/trends/suites/{suite_id}", response_model=trend_schema.SuiteTrend)
+def read_test_suite_trend(suite_id: int, days: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    套件最近 days 天每天的执行次数、通过率与延迟分位数
+    """
+    try:
+        return trend_rollup.suite_trend(db, suite_id, days=days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/storage/stats")
+def read_storage_stats(db: Session = Depends(get_db)):
+    """
+    执行记录内容去重存储的统计：内容条数、原始/压缩后字节数、引用次数与读取缓存命中情况
+    """
+    return blob_store.stats(db)
+
+# ------------------------------------------------------------------------------
+# Jobs API
+# ------------------------------------------------------------------------------
+
+@app.get("/jobs/", response_model=List[test_job_schema.TestJob])
+def read_jobs(status: Optional[str] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    """
+    获取任务列表，status 支持逗号分隔多个值；默认返回排队中和执行中的任务
+    """
+    statuses = status.split(",") if status else list(crud_test_job.ACTIVE_STATUSES)
+    return crud_test_job.get_test_jobs(db, statuses=statuses, skip=skip, limit=limit)
+
+@app.get("/jobs/{job_id}", response_model=test_job_schema.TestJob)
+def read_job(job_id: int, db: Session = Depends(get_db)):
+    db_job = crud_test_job.get_test_job(db, job_id=job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@app.post("/jobs/{job_id}/cancel", response_model=test_job_schema.TestJob)
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    取消任务：排队中的任务立即取消，执行中的任务在当前用例结束后停止
+    """
+    db_job = job_queue.cancel(db, job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@app.get("/reports/list", response_model=test_report_schema.TestReportPage)
+def read_test_reports(limit: int = 50, cursor: Optional[str] = None, suite_id: Optional[int] = None,
+                      status: Optional[str] = None, start_from: Optional[datetime] = None,
+                      start_to: Optional[datetime] = None, db: Session = Depends(get_db)):
+    """
+    获取测试报告列表（只含汇总字段），按开始时间倒序的游标分页
+    翻页时把上一页返回的 next_cursor 作为 cursor 传入
+    """
+    try:
+        items, next_cursor = crud_test_report.get_test_report_summaries(
+            db, limit=limit, cursor=cursor, suite_id=suite_id, status=status,
+            start_from=start_from, start_to=start_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/reports/{report_id}", response_model=test_report_schema.TestReportDetail)
 def read_test_report(report_id: int, db: Session = Depends(get_db)):
     """
-    获取特定测试报告的详细信息
+    获取特定测试报告的详细信息（不含执行记录，执行记录通过 /reports/{report_id}/records 分页获取）
     """
     db_report = crud_test_report.get_test_report(db, test_report_id=report_id)
     if db_report is None:
         raise HTTPException(status_code=404, detail="Test report not found")
-    return db_report
\ No newline at end of file
+    return db_report
+
+@app.get("/reports/{report_id}/compare", response_model=regression_schema.ReportComparison)
+def compare_test_report(report_id: int, baseline_report_id: Optional[int] = None, baseline_runs: Optional[int] = None,
+                        alpha: float = REGRESSION_ALPHA, min_slowdown: float = REGRESSION_MIN_SLOWDOWN,
+                        min_delta_ms: float = REGRESSION_MIN_DELTA_MS, db: Session = Depends(get_db)):
+    """
+    按用例比较报告与基线的耗时分布（单侧 Mann-Whitney U 检验），标记超过阈值的性能回归
+    基线为 baseline_report_id 指定的报告，未指定时取同一套件之前最近 baseline_runs 次执行
+    """
+    try:
+        return regression.compare_reports(db, report_id, baseline_report_id=baseline_report_id,
+                                          baseline_runs=baseline_runs, alpha=alpha,
+                                          min_slowdown=min_slowdown, min_delta_ms=min_delta_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/reports/{report_id}/rerun-failed", response_model=test_job_schema.TestJob)
+def rerun_failed_records(report_id: int, db: Session = Depends(get_db)):
+    """
+    只重跑报告中失败/错误的用例：每个用例以原执行时的变量快照独立执行，结果写入新的子报告（parent_report_id 指向原报告）
+    """
+    db_report = crud_test_report.get_test_report_summary(db, report_id)
+    if db_report is None:
+        raise HTTPException(status_code=404, detail="Test report not found")
+    try:
+        return job_queue.submit_rerun(db, db_report)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/reports/{report_id}/reruns", response_model=List[test_report_schema.TestReportSummary])
+def read_rerun_reports(report_id: int, db: Session = Depends(get_db)):
+    """
+    报告的重跑子报告列表
+    """
+    return crud_test_report.get_rerun_reports(db, report_id)
+
+@app.post("/reports/{report_id}/archive", response_model=test_report_schema.TestReportDetail)
+def archive_test_report(report_id: int, db: Session = Depends(get_db)):
+    """
+    立即归档报告的执行记录（不受保留期限制），报告上保留摘要
+    """
+    db_report = crud_test_report.get_test_report(db, test_report_id=report_id)
+    if db_report is None:
+        raise HTTPException(status_code=404, detail="Test report not found")
+    if db_report.archived_at is None and retention.archive_report(db, report_id) is None:
+        raise HTTPException(status_code=400, detail="Test report is still running.")
+    db.refresh(db_report)
+    return db_report
+
+@app.post("/reports/{report_id}/restore")
+def restore_test_report(report_id: int, db: Session = Depends(get_db)):
+    """
+    把已归档报告的执行记录恢复到 test_records
+    """
+    try:
+        restored = retention.restore_report(db, report_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Test report not found")
+    return {"message": "Test report restored successfully", "restored_count": restored}
+
+@app.get("/reports/{report_id}/records", response_model=test_report_schema.TestRecordPage)
+def read_test_records(report_id: int, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None,
+                      case_name: Optional[str] = None, status_code: Optional[int] = None,
+                      min_duration: Optional[float] = None, max_duration: Optional[float] = None,
+                      db: Session = Depends(get_db)):
+    """
+    按执行顺序分页获取报告的执行记录（精简字段），请求/响应详情通过 /reports/records/{record_id} 按需获取
+    """
+    try:
+        items, next_cursor = crud_test_report.get_test_records_page(
+            db, report_id, limit=limit, cursor=cursor, status=status, case_name=case_name,
+            status_code=status_code, min_duration=min_duration, max_duration=max_duration
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/reports/records/{record_id}", response_model=test_report_schema.TestRecord)
+def read_test_record(record_id: int, db: Session = Depends(get_db)):
+    """
+    获取单条执行记录的完整信息（请求/响应头与内联响应体、断言结果、分阶段耗时）
+    """
+    db_record = crud_test_report.get_test_record(db, test_record_id=record_id)
+    if db_record is None:
+        raise HTTPException(status_code=404, detail="Test record not found")
+    return db_record
+
+@app.get("/reports/records/{record_id}/body")
+def read_test_record_body(record_id: int, db: Session = Depends(get_db)):
+    """
+    获取执行记录的完整响应体：被截断的响应体从落盘的 gzip 文件中流式返回
+    """
+    db_record = crud_test_report.get_test_record(db, test_record_id=record_id)
+    if db_record is None:
+        raise HTTPException(status_code=404, detail="Test record not found")
+    if not db_record.response_body_path:
+        return PlainTextResponse(db_record.response_body or "")
+    if not response_store.spilled_exists(db_record.response_body_path):
+        raise HTTPException(status_code=410, detail="Response body file no longer exists")
+    return StreamingResponse(response_store.iter_spilled(db_record.response_body_path),
+                             media_type="text/plain; charset=utf-8")
+
+def _load_report_status(report_id: int) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        db_report = crud_test_report.get_test_report_summary(db, report_id)
+        return db_report.status if db_report else None
+    finally:
+        db.close()
+
+@app.get("/reports/{report_id}/events")
+async def stream_test_report_events(report_id: int, request: Request, last_seq: int = 0):
+    """
+    以 Server-Sent Events 推送报告的执行进度
+    断线重连时浏览器会带上 Last-Event-ID，从该序号之后继续推送
+    """
+    if await run_in_threadpool(_load_report_status, report_id) is None:
+        raise HTTPException(status_code=404, detail="Test report not found")
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        last_seq = int(last_event_id)
+
+    async def event_source():
+        async for event in run_events.subscribe(report_id, last_seq, status_loader=_load_report_status):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.dumps(event, ensure_ascii=False, default=str)
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.websocket("/ws/reports/{report_id}/events")
+async def websocket_test_report_events(websocket: WebSocket, report_id: int, last_seq: int = 0):
+    """
+    以 WebSocket 推送报告的执行进度，消息格式与 SSE 的 data 字段一致
+    """
+    await websocket.accept()
+    try:
+        async for event in run_events.subscribe(report_id, last_seq, status_loader=_load_report_status):
+            if event is None:
+                await websocket.send_json({"type": "heartbeat"})
+                continue
+            await websocket.send_text(json.dumps(event, ensure_ascii=False, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -1,4 +1,7 @@
 from .test_case import TestCase
-from .test_module import TestModule
+from .test_module import TestModule, TestModuleClosure
 from .test_suite import TestSuite, TestSuiteItem
-from .test_report import TestReport, TestRecord
\ No newline at end of file
+from .test_report import TestReport, TestRecord
+from .test_job import TestJob
+from .content_blob import ContentBlob
+from .trend_rollup import CaseDailyStat, SuiteDailyStat
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.dialects.mysql import MEDIUMBLOB
+from sqlalchemy.sql import func
+from core.database import Base
+
+class ContentBlob(Base):
+    """
+    内容寻址的去重存储：执行记录的请求/响应头与请求/响应体按 SHA-256 存一份（zlib 压缩），
+    test_records 中只保存哈希；ref_count 为引用该内容的记录数，降为 0 的内容由保留任务清理
+    """
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True) # 原始内容的 SHA-256（十六进制）
+    data = Column(LargeBinary().with_variant(MEDIUMBLOB(), "mysql"), nullable=False) # zlib 压缩后的内容
+    size = Column(Integer, nullable=False) # 原始字节数
+    stored_size = Column(Integer, nullable=False) # 压缩后字节数
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import JSON # Import JSON type
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -26,4 +26,11 @@ class TestCase(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
-    priority = Column(Integer, index=True, default=0) # 确保 priority 字段保留
\ No newline at end of file
+    priority = Column(Integer, index=True, default=0) # 确保 priority 字段保留
+
+
+# 用例列表按 (priority ASC, created_at DESC, id DESC) 排序做游标分页；
+# 按模块、请求方法过滤时使用以过滤列为前缀的同序索引，名称前缀过滤使用 name 上的单列索引
+Index("ix_test_cases_listing", TestCase.priority, TestCase.created_at.desc(), TestCase.id.desc())
+Index("ix_test_cases_module_listing", TestCase.module_id, TestCase.priority, TestCase.created_at.desc(), TestCase.id.desc())
+Index("ix_test_cases_method_listing", TestCase.method, TestCase.priority, TestCase.created_at.desc(), TestCase.id.desc())
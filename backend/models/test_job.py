@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from core.database import Base
+
+class TestJob(Base):
+    __tablename__ = "test_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(20), nullable=False) # suite: 执行套件, cases: 按用例ID列表执行, rerun: 重跑报告中的失败用例, load: 压测, import: 导入用例, ndjson_import: 导入 NDJSON 数据, retention: 归档过期记录
+    suite_id = Column(Integer, ForeignKey("test_suites.id"), nullable=True)
+    payload = Column(JSON, nullable=True) # 任务参数，如 {"test_case_ids": [...]}
+    progress = Column(JSON, nullable=True) # 任务进度，如导入任务的 {"processed": 1000, "created": 950, ...}
+    status = Column(String(20), index=True, default="queued") # queued, running, completed, failed, cancelled
+    cancel_requested = Column(Boolean, default=False)
+    report_id = Column(Integer, ForeignKey("test_reports.id"), nullable=True)
+    error_message = Column(Text)
+    owner_id = Column(String(100)) # 领取任务的进程标识（主机名-进程号-随机串）
+    heartbeat_at = Column(DateTime(timezone=True)) # 持有进程最近一次心跳时间，超过租约时间未更新视为进程已退出
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    report = relationship("TestReport")
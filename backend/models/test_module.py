@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -14,4 +14,20 @@ class TestModule(Base):
     parent = relationship("TestModule", remote_side=[id], backref="children")
     
     # 关联用例，cascade="all, delete" 表示删除模块时级联处理（可选，视需求而定，这里暂不级联删除用例，避免误删）
-    test_cases = relationship("TestCase", back_populates="module_obj")
\ No newline at end of file
+    test_cases = relationship("TestCase", back_populates="module_obj")
+
+class TestModuleClosure(Base):
+    """
+    模块树的闭包表：每个模块与其每个祖先（含自身，depth=0）各有一行
+    “某模块子树下的全部模块/用例”只需按 ancestor_id 做一次索引查询，由 crud_test_module 维护
+    """
+    __tablename__ = "test_module_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("test_modules.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("test_modules.id"), primary_key=True)
+    depth = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # 按后代反查祖先链（移动子树、判断环）时使用
+        Index("ix_test_module_closure_descendant", "descendant_id", "depth"),
+    )
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from core.database import Base
 
 class TestReport(Base):
@@ -18,9 +18,33 @@ class TestReport(Base):
     fail_count = Column(Integer, default=0)
     error_count = Column(Integer, default=0)
     status = Column(String(20)) # running, completed, error
+    run_type = Column(String(20), default="functional") # functional: 功能执行, load: 压测, rerun: 重跑失败用例
+    parent_report_id = Column(Integer, ForeignKey("test_reports.id"), nullable=True) # 重跑报告对应的原报告
+    load_summary = Column(JSON) # 压测汇总：吞吐量、延迟分布（直方图）、错误统计
+    # 归档：超出保留期的执行记录压缩写入 archive_path（gzip NDJSON，相对于 ARCHIVE_DIR）后从 test_records 删除，
+    # archive_summary 保留状态分布、耗时分位数和失败用例等摘要；archive_path 已设置而 archived_at 为空表示归档进行中
+    archived_at = Column(DateTime(timezone=True))
+    archive_path = Column(String(255))
+    archive_summary = Column(JSON)
+    # 报告的执行结果已合并进 case_daily_stats / suite_daily_stats 的时间，防止重复计入趋势
+    rolled_up_at = Column(DateTime(timezone=True))
+    # 与同一套件最近执行的耗时比较结果（回归/改善计数与回归用例），报告结束时写入
+    regression_summary = Column(JSON)
+    # 执行中的断点：{fingerprint, position, variables, records, unrecorded}，每批执行记录落库后更新，报告结束时清空
+    # 进程中断后任务重新执行时据此从最后完成的用例继续
+    checkpoint = Column(JSON)
 
     records = relationship("TestRecord", back_populates="report", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 报告列表按 (start_time, id) 倒序游标分页，套件/状态过滤使用带前缀列的索引
+        Index("ix_test_reports_start_time_id", "start_time", "id"),
+        Index("ix_test_reports_suite_start_time", "suite_id", "start_time", "id"),
+        Index("ix_test_reports_status_start_time", "status", "start_time", "id"),
+        Index("ix_test_reports_archived_start_time", "archived_at", "start_time"),
+        Index("ix_test_reports_parent_report_id", "parent_report_id"),
+    )
+
 class TestRecord(Base):
     __tablename__ = "test_records"
 
@@ -35,14 +59,36 @@ class TestRecord(Base):
     url = Column(String(500))
     method = Column(String(10))
     status_code = Column(Integer)
-    request_headers = Column(JSON)
-    request_body = Column(JSON)
-    response_headers = Column(JSON)
-    response_body = Column(Text) # 响应体可能很大，用Text
+    # 请求/响应详情、断言与耗时属于 "detail" 延迟加载组：列表查询不读取，访问时（或 undefer_group）才加载
+    request_headers = deferred(Column(JSON), group="detail")
+    request_body = deferred(Column(JSON), group="detail")
+    response_headers = deferred(Column(JSON), group="detail")
+    response_body = deferred(Column(Text), group="detail") # 响应体可能很大，用Text；超过内联上限时只保存截断后的前缀
+    # 请求/响应头与请求/响应体默认存放在 content_blobs 中，以下为内容哈希，上面四列只在旧数据中有值；
+    # 读取记录详情时由 blob_store 透明地还原
+    request_headers_hash = deferred(Column(String(64)), group="detail")
+    request_body_hash = deferred(Column(String(64)), group="detail")
+    response_headers_hash = deferred(Column(String(64)), group="detail")
+    response_body_hash = deferred(Column(String(64)), group="detail")
+    # 用例开始执行时看到的变量快照（同样存放在 content_blobs 中），重跑失败用例时用它还原上下文
+    variables = deferred(Column(JSON), group="detail")
+    variables_hash = deferred(Column(String(64)), group="detail")
+    response_body_path = Column(String(255)) # 完整响应体的落盘路径（gzip，相对于 RESPONSE_SPILL_DIR）
+    response_body_size = Column(Integer) # 响应体原始字节数
     error_message = Column(Text)
     
     # 断言结果详情，存储为JSON列表
     # e.g. [{check: "status_code", expect: 200, actual: 200, result: true}]
-    assertion_results = Column(JSON) 
+    assertion_results = deferred(Column(JSON), group="detail")
+
+    # 分阶段耗时（毫秒）：queue/connect/tls/send/ttfb/download 为网络侧，
+    # render/parse/extraction/assertions/persist 为执行引擎侧，total 为总耗时
+    timings = deferred(Column(JSON), group="detail")
+
+    report = relationship("TestReport", back_populates="records")
 
-    report = relationship("TestReport", back_populates="records")
\ No newline at end of file
+    __table_args__ = (
+        # 报告详情按 id 游标分页读取记录，状态过滤使用带前缀列的索引
+        Index("ix_test_records_report_id_id", "report_id", "id"),
+        Index("ix_test_records_report_status", "report_id", "status", "id"),
+    )
\ No newline at end of file
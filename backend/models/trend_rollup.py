@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, Date, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.sql import func
+from core.database import Base
+
+class CaseDailyStat(Base):
+    """
+    用例按（套件, 天）汇总的执行统计，报告结束时增量合并；趋势查询只读这张表，不扫描 test_records
+    latency 为 LatencyHistogram.to_dict() 的结果，可直接合并得到任意时间段的分位数
+    """
+    __tablename__ = "case_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    test_case_id = Column(Integer, nullable=False)
+    suite_id = Column(Integer, nullable=False, default=0) # 0 表示不属于套件的执行（按用例ID列表执行）
+    day = Column(Date, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+    fail_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    latency = Column(JSON)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("test_case_id", "suite_id", "day", name="uq_case_daily_stats_case_suite_day"),
+    )
+
+class SuiteDailyStat(Base):
+    """
+    套件按天汇总的执行统计：报告次数、成功的报告次数以及全部用例结果的计数与延迟分布
+    """
+    __tablename__ = "suite_daily_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    suite_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    runs = Column(Integer, nullable=False, default=0)
+    passed_runs = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+    fail_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    latency = Column(JSON)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("suite_id", "day", name="uq_suite_daily_stats_suite_day"),
+    )
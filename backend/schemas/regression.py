@@ -0,0 +1,21 @@
+from typing import Any, List, Optional, Dict
+from pydantic import BaseModel
+
+class CaseComparison(BaseModel):
+    test_case_id: int
+    case_name: Optional[str] = None
+    baseline: Dict[str, Any] # 毫秒：count/mean/p50/p90/max
+    candidate: Dict[str, Any]
+    p50_change: Optional[float] = None # 中位数变化比例，0.25 表示变慢 25%
+    p_value: Optional[float] = None
+    method: Optional[str] = None # mann_whitney: U 检验；percentile: 样本太少时与基线分布的尾部比较
+    newly_failing: bool = False
+    verdict: str # regression, improvement, unchanged, insufficient_data, new
+
+class ReportComparison(BaseModel):
+    report_id: int
+    baseline_report_ids: List[int]
+    thresholds: Dict[str, Any]
+    counts: Dict[str, int]
+    newly_failing: int
+    cases: List[CaseComparison]
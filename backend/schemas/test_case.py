@@ -34,6 +34,36 @@ class TestCase(TestCaseBase):
         from_attributes = True
 
 
+class ModuleRef(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+
+class TestCaseListItem(TestCaseBase):
+    """用例列表项：所属模块只返回 id 与名称，不展开子模块"""
+    id: int
+    created_at: Any
+    updated_at: Optional[Any] = None
+    priority: Optional[int] = 0
+
+    module_obj: Optional[ModuleRef] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TestCasePage(BaseModel):
+    items: List[TestCaseListItem] = []
+    # 下一页游标，为空表示没有更多数据
+    next_cursor: Optional[str] = None
+    # 仅在 with_total=true 时返回；无过滤条件时为表统计信息中的估算值（total_estimated 为 true）
+    total: Optional[int] = None
+    total_estimated: bool = False
+
+
 class TestSuiteExecute(BaseModel):
     test_case_ids: List[int]
 
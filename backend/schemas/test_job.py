@@ -0,0 +1,35 @@
+from typing import List, Optional, Any, Dict
+from datetime import datetime
+from pydantic import BaseModel
+
+class TestJobBase(BaseModel):
+    job_type: str
+    suite_id: Optional[int] = None
+    payload: Optional[Dict[str, Any]] = None
+
+class TestJobCreate(TestJobBase):
+    report_id: Optional[int] = None
+
+class TestJob(TestJobBase):
+    id: int
+    status: str
+    cancel_requested: Optional[bool] = False
+    report_id: Optional[int] = None
+    progress: Optional[Dict[str, Any]] = None
+    error_message: Optional[str] = None
+    owner_id: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class LoadTestCreate(BaseModel):
+    """压测任务参数：test_case_ids 与 suite_id 二选一"""
+    test_case_ids: Optional[List[int]] = None
+    suite_id: Optional[int] = None
+    duration: float = 30.0
+    concurrency: int = 10
+    target_rps: Optional[float] = None
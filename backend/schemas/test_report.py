@@ -15,8 +15,12 @@ class TestRecordBase(BaseModel):
     request_body: Optional[Dict[str, Any]] = None
     response_headers: Optional[Dict[str, Any]] = None
     response_body: Optional[str] = None
+    response_body_path: Optional[str] = None
+    response_body_size: Optional[int] = None
     error_message: Optional[str] = None
     assertion_results: Optional[List[Dict[str, Any]]] = None
+    timings: Optional[Dict[str, float]] = None
+    variables: Optional[Dict[str, Any]] = None # 用例开始执行时的变量快照
 
 class TestRecordCreate(TestRecordBase):
     report_id: int
@@ -42,6 +46,12 @@ class TestReportBase(BaseModel):
     fail_count: Optional[int] = 0
     error_count: Optional[int] = 0
     status: Optional[str] = None
+    run_type: Optional[str] = "functional"
+    parent_report_id: Optional[int] = None
+    load_summary: Optional[Dict[str, Any]] = None
+    archived_at: Optional[datetime] = None
+    archive_summary: Optional[Dict[str, Any]] = None
+    regression_summary: Optional[Dict[str, Any]] = None
 
 class TestReportCreate(TestReportBase):
     pass
@@ -54,4 +64,59 @@ class TestReport(TestReportBase):
     records: List[TestRecord] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TestReportSummary(BaseModel):
+    """报告列表项：只包含汇总字段"""
+    id: int
+    suite_id: Optional[int] = None
+    suite_name: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    duration: Optional[float] = None
+    total_cases: Optional[int] = 0
+    pass_count: Optional[int] = 0
+    fail_count: Optional[int] = 0
+    error_count: Optional[int] = 0
+    status: Optional[str] = None
+    run_type: Optional[str] = "functional"
+    parent_report_id: Optional[int] = None
+    archived_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TestReportPage(BaseModel):
+    items: List[TestReportSummary] = []
+    # 下一页游标，为空表示没有更多数据
+    next_cursor: Optional[str] = None
+
+class TestReportDetail(TestReportBase):
+    """报告详情：不含执行记录，执行记录通过分页接口单独获取"""
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class TestRecordSlim(BaseModel):
+    """执行记录列表项：不含请求/响应详情、断言与耗时"""
+    id: int
+    report_id: int
+    test_case_id: Optional[int] = None
+    case_name: Optional[str] = None
+    start_time: Optional[datetime] = None
+    duration: Optional[float] = None
+    status: Optional[str] = None
+    url: Optional[str] = None
+    method: Optional[str] = None
+    status_code: Optional[int] = None
+    response_body_size: Optional[int] = None
+    error_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class TestRecordPage(BaseModel):
+    items: List[TestRecordSlim] = []
+    # 下一页游标，为空表示没有更多数据
+    next_cursor: Optional[str] = None
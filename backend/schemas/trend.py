@@ -0,0 +1,31 @@
+from typing import Any, List, Optional, Dict
+from datetime import date
+from pydantic import BaseModel
+
+class TrendSummary(BaseModel):
+    total: int = 0
+    pass_count: int = 0
+    fail_count: int = 0
+    error_count: int = 0
+    pass_rate: Optional[float] = None
+    latency: Dict[str, Any] = {} # 毫秒：count/min/mean/p50/p90/p99/max
+
+class TrendPoint(TrendSummary):
+    day: date
+    runs: Optional[int] = None # 仅套件趋势：当天执行次数
+    passed_runs: Optional[int] = None
+
+class CaseTrend(BaseModel):
+    test_case_id: int
+    suite_id: Optional[int] = None
+    days: int
+    points: List[TrendPoint]
+    overall: TrendSummary # 整个窗口的汇总
+    previous: TrendSummary # 上一个同长度窗口的汇总，用于环比
+
+class SuiteTrend(BaseModel):
+    suite_id: int
+    days: int
+    points: List[TrendPoint]
+    overall: TrendSummary
+    previous: TrendSummary
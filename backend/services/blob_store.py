@@ -0,0 +1,223 @@
+import hashlib
+import json
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from core.config import BLOB_CACHE_SIZE, BLOB_COMPRESS_LEVEL
+from crud.ordering import BULK_UPDATE_CHUNK
+from models.content_blob import ContentBlob
+from models.test_report import TestRecord
+from services.cache import LRUCache
+
+# 存入 content_blobs 的记录字段 -> 内容类型；记录中对应的哈希列为 <字段名>_hash
+BLOB_FIELDS: Dict[str, str] = {
+    "request_headers": "json",
+    "request_body": "json",
+    "response_headers": "json",
+    "response_body": "text",
+    "variables": "json",
+}
+HASH_COLUMNS: Dict[str, str] = {field: f"{field}_hash" for field in BLOB_FIELDS}
+
+# 解压后的内容按哈希缓存；内容不可变，缓存无需失效
+_cache = LRUCache(max_size=BLOB_CACHE_SIZE)
+
+
+def _encode(field: str, value: Any) -> bytes:
+    if BLOB_FIELDS[field] == "text":
+        return value.encode("utf-8")
+    # 键排序后序列化，键顺序不同的相同内容得到相同的哈希
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(field: str, raw: bytes) -> Any:
+    text = raw.decode("utf-8")
+    return text if BLOB_FIELDS[field] == "text" else json.loads(text)
+
+
+# ------------------------------------------------------------------
+# 写入
+# ------------------------------------------------------------------
+
+def intern_rows(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    把待插入的执行记录（字典）中的大字段换成内容哈希，并写入/引用 content_blobs，不提交事务
+    - 本批内容先按哈希合并，已存在的内容只增加引用计数（一条 UPDATE ... CASE），不再传输内容本身
+    - 新内容用多行 INSERT 写入；MySQL 上为 INSERT ... ON DUPLICATE KEY UPDATE ref_count = ref_count + 新引用数，
+      并发写入同一新内容也是原子的；其他数据库主键冲突时退回逐条“存在则加引用”
+    - 查询之后、加引用之前被 collect_garbage 删除的内容（UPDATE 命中的行数少于查到的行数）按新内容重新写入
+    返回原列表（已原地修改）
+    """
+    counts: Counter = Counter()
+    payloads: Dict[str, bytes] = {}
+    for row in rows:
+        for field, hash_column in HASH_COLUMNS.items():
+            value = row.get(field)
+            if value is None:
+                row[hash_column] = None
+                continue
+            raw = _encode(field, value)
+            digest = hashlib.sha256(raw).hexdigest()
+            row[field] = None
+            row[hash_column] = digest
+            counts[digest] += 1
+            payloads.setdefault(digest, raw)
+    if not counts:
+        return rows
+
+    hashes = list(counts)
+    existing = _existing_hashes(db, hashes)
+    if _add_references(db, {digest: counts[digest] for digest in existing}) < len(existing):
+        # 加过引用的行 ref_count 已大于 0，不会再被回收，此时仍存在的即加引用成功的内容
+        existing = _existing_hashes(db, list(existing))
+
+    new_blobs = []
+    for digest in hashes:
+        if digest in existing:
+            continue
+        raw = payloads[digest]
+        data = zlib.compress(raw, BLOB_COMPRESS_LEVEL)
+        new_blobs.append({"hash": digest, "data": data, "size": len(raw), "stored_size": len(data),
+                          "ref_count": counts[digest]})
+    if new_blobs and db.get_bind().dialect.name == "mysql":
+        upsert = mysql_insert(ContentBlob)
+        db.execute(upsert.on_duplicate_key_update(ref_count=ContentBlob.ref_count + upsert.inserted.ref_count),
+                   new_blobs)
+    elif new_blobs:
+        try:
+            with db.begin_nested():
+                db.execute(insert(ContentBlob), new_blobs)
+        except Exception:
+            # 其他执行线程/进程刚好写入了相同内容（主键冲突），改为逐条处理
+            for blob in new_blobs:
+                if _add_references(db, {blob["hash"]: blob["ref_count"]}) == 0:
+                    db.execute(insert(ContentBlob), [blob])
+    return rows
+
+
+def _existing_hashes(db: Session, hashes: List[str]) -> set:
+    existing = set()
+    for start in range(0, len(hashes), BULK_UPDATE_CHUNK):
+        existing.update(db.execute(
+            select(ContentBlob.hash).where(ContentBlob.hash.in_(hashes[start:start + BULK_UPDATE_CHUNK]))
+        ).scalars())
+    return existing
+
+
+def _add_references(db: Session, counts: Dict[str, int]) -> int:
+    """按哈希增加引用计数（counts 为负数时减少），返回更新的行数"""
+    updated = 0
+    hashes = list(counts)
+    for start in range(0, len(hashes), BULK_UPDATE_CHUNK):
+        chunk = hashes[start:start + BULK_UPDATE_CHUNK]
+        updated += db.execute(
+            update(ContentBlob)
+            .where(ContentBlob.hash.in_(chunk))
+            .values(ref_count=ContentBlob.ref_count + case({digest: counts[digest] for digest in chunk},
+                                                           value=ContentBlob.hash))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return updated
+
+
+def release_hashes(db: Session, hashes: Iterable[Optional[str]]):
+    """
+    执行记录被删除时调用：每个哈希出现一次减少一次引用，不提交事务
+    引用降为 0 的内容不立即删除，由 collect_garbage 统一清理，避免与并发写入竞争
+    """
+    counts = Counter(digest for digest in hashes if digest)
+    if counts:
+        _add_references(db, {digest: -count for digest, count in counts.items()})
+
+
+def release_report(db: Session, report_id: int):
+    """释放报告下全部执行记录引用的内容，应在删除这些记录之前、同一事务中调用"""
+    for hash_column in HASH_COLUMNS.values():
+        column = getattr(TestRecord, hash_column)
+        counts = dict(db.execute(
+            select(column, func.count())
+            .where(TestRecord.report_id == report_id, column.isnot(None))
+            .group_by(column)
+        ).all())
+        if counts:
+            _add_references(db, {digest: -count for digest, count in counts.items()})
+
+
+def release_records(db: Session, record_ids: List[int]):
+    """释放指定执行记录引用的内容，应在删除这些记录之前、同一事务中调用"""
+    columns = [getattr(TestRecord, hash_column) for hash_column in HASH_COLUMNS.values()]
+    hashes: List[Optional[str]] = []
+    for start in range(0, len(record_ids), BULK_UPDATE_CHUNK):
+        for row in db.execute(select(*columns).where(TestRecord.id.in_(record_ids[start:start + BULK_UPDATE_CHUNK]))):
+            hashes.extend(row)
+    release_hashes(db, hashes)
+
+
+def collect_garbage(db: Session) -> int:
+    """删除不再被任何记录引用的内容，返回删除的条数"""
+    result = db.execute(delete(ContentBlob).where(ContentBlob.ref_count <= 0))
+    db.commit()
+    return result.rowcount
+
+
+# ------------------------------------------------------------------
+# 读取
+# ------------------------------------------------------------------
+
+def load(db: Session, hashes: Iterable[Optional[str]]) -> Dict[str, bytes]:
+    """按哈希读取原始内容（已解压），缓存未命中的部分一次查询"""
+    result: Dict[str, bytes] = {}
+    missing = []
+    for digest in set(digest for digest in hashes if digest):
+        cached = _cache.get(digest)
+        if cached is not None:
+            result[digest] = cached
+        else:
+            missing.append(digest)
+    for start in range(0, len(missing), BULK_UPDATE_CHUNK):
+        for digest, data in db.execute(
+            select(ContentBlob.hash, ContentBlob.data)
+            .where(ContentBlob.hash.in_(missing[start:start + BULK_UPDATE_CHUNK]))
+        ):
+            raw = zlib.decompress(data)
+            _cache.set(digest, raw)
+            result[digest] = raw
+    return result
+
+
+def resolve_rows(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    把执行记录字典中的内容哈希还原为字段值并移除哈希列（导出、归档时使用，输出不依赖 content_blobs）
+    """
+    blobs = load(db, (row.get(hash_column) for row in rows for hash_column in HASH_COLUMNS.values()))
+    for row in rows:
+        for field, hash_column in HASH_COLUMNS.items():
+            digest = row.pop(hash_column, None)
+            if digest and digest in blobs:
+                row[field] = _decode(field, blobs[digest])
+    return rows
+
+
+def resolve_record(db: Session, record: TestRecord) -> TestRecord:
+    """为 ORM 执行记录填充内容字段；以已提交值写入，不会被当作修改再次落库"""
+    digests = {field: getattr(record, hash_column) for field, hash_column in HASH_COLUMNS.items()}
+    blobs = load(db, digests.values())
+    for field, digest in digests.items():
+        if digest and digest in blobs:
+            set_committed_value(record, field, _decode(field, blobs[digest]))
+    return record
+
+
+def stats(db: Session) -> Dict[str, Any]:
+    count, size, stored_size, references = db.execute(
+        select(func.count(), func.sum(ContentBlob.size), func.sum(ContentBlob.stored_size),
+               func.sum(ContentBlob.ref_count))
+    ).one()
+    return {"blobs": count, "bytes": size or 0, "stored_bytes": stored_size or 0, "references": references or 0,
+            "cache": _cache.stats()}
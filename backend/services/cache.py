@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class LRUCache:
+    """
+    线程安全的有界 LRU 缓存，附带命中/未命中计数
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        命中则返回缓存值，否则调用 factory 生成并写入缓存
+        factory 抛出的异常不会被缓存
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        # 在锁外构建，避免慢速编译阻塞其他线程
+        value = factory()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """直接写入缓存（调用方批量加载未命中的条目时使用）"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_matching(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def invalidate_values(self, predicate: Callable[[Any], bool]):
+        """按缓存值判断是否失效（值中记录了依赖关系时使用）"""
+        with self._lock:
+            for key in [key for key, value in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
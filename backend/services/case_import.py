@@ -0,0 +1,533 @@
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from core.config import IMPORT_CHUNK_SIZE
+from crud import crud_test_job, crud_test_module
+from crud.ordering import SORT_KEY_GAP
+from models.test_case import TestCase
+from models.test_module import TestModule
+from schemas.test_module import TestModuleCreate
+from services import execution_plan
+
+# 流式解析依赖 ijson（pip install ijson），未安装时退回 json.load 整体加载
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# YAML 格式的 OpenAPI 文档依赖 PyYAML，YAML 无法流式解析，总是整体加载
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+FORMATS = ("openapi", "har", "postman")
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+# 由 HTTP 客户端自行生成或与录制会话绑定的请求头，导入时丢弃
+_SKIPPED_HEADERS = {"host", "content-length", "connection", "accept-encoding", "cookie"}
+# 浏览器导出的 HAR 中的静态资源请求不导入
+_STATIC_RESOURCE_TYPES = {"image", "stylesheet", "script", "font", "media", "manifest"}
+# 用例字段的长度限制，与 test_cases 表一致
+_NAME_MAX_LENGTH = 100
+_DESCRIPTION_MAX_LENGTH = 255
+_URL_MAX_LENGTH = 255
+_METHOD_MAX_LENGTH = 10
+
+
+@dataclass(slots=True)
+class ImportedCase:
+    """
+    解析器产出的一条用例，module_path 为相对于导入目标模块的模块路径
+    """
+    module_path: Tuple[str, ...]
+    name: str
+    method: str
+    url: str
+    description: Optional[str] = None
+    headers: Optional[Dict[str, Any]] = None
+    body: Optional[Dict[str, Any]] = None
+    assertions: Optional[List[Dict[str, Any]]] = None
+
+
+@dataclass(slots=True)
+class ImportStats:
+    processed: int = 0
+    created: int = 0
+    skipped_duplicates: int = 0
+    skipped_invalid: int = 0
+    modules_created: int = 0
+    cancelled: bool = False
+
+
+# ------------------------------------------------------------------
+# 文档读取
+# ------------------------------------------------------------------
+
+class DocumentSource:
+    """
+    按 ijson 前缀语法（如 "log.entries.item"）读取文档的一部分
+    JSON 文件在安装了 ijson 时逐个元素流式读取，内存占用与文件大小无关；
+    YAML 文件或未安装 ijson 时整体加载一次后在内存中按同样的前缀查找
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.streaming = IJSON_AVAILABLE and not self._is_yaml()
+        self._document = None
+
+    def _is_yaml(self) -> bool:
+        return os.path.splitext(self.path)[1].lower() in (".yaml", ".yml")
+
+    def _load(self) -> Any:
+        if self._document is None:
+            with open(self.path, "rb") as f:
+                if self._is_yaml():
+                    if not YAML_AVAILABLE:
+                        raise ValueError("PyYAML is required to import YAML documents.")
+                    self._document = yaml.safe_load(f)
+                else:
+                    self._document = json.load(f)
+        return self._document
+
+    def items(self, prefix: str) -> Iterator[Any]:
+        if self.streaming:
+            with open(self.path, "rb") as f:
+                yield from ijson.items(f, prefix, use_float=True)
+        else:
+            yield from _walk(self._load(), prefix.split(".") if prefix else [])
+
+    def kvitems(self, prefix: str) -> Iterator[Tuple[str, Any]]:
+        if self.streaming:
+            with open(self.path, "rb") as f:
+                yield from ijson.kvitems(f, prefix, use_float=True)
+        else:
+            for node in _walk(self._load(), prefix.split(".") if prefix else []):
+                if isinstance(node, dict):
+                    yield from node.items()
+
+    def value(self, prefix: str, default: Any = None) -> Any:
+        return next(iter(self.items(prefix)), default)
+
+
+def _walk(node: Any, parts: List[str]) -> Iterator[Any]:
+    """与 ijson 前缀语义一致：字典按键查找，"item" 作用于数组时表示其中的每个元素"""
+    if not parts:
+        yield node
+        return
+    part, rest = parts[0], parts[1:]
+    if isinstance(node, dict):
+        if part in node:
+            yield from _walk(node[part], rest)
+    elif isinstance(node, list) and part == "item":
+        for element in node:
+            yield from _walk(element, rest)
+
+
+def detect_format(path: str, file_name: Optional[str] = None) -> str:
+    """
+    根据扩展名和文件开头的内容判断导入格式，只读取前 64KB
+    """
+    ext = os.path.splitext(file_name or path)[1].lower()
+    if ext == ".har":
+        return "har"
+    if ext in (".yaml", ".yml"):
+        return "openapi"
+    with open(path, "rb") as f:
+        head = f.read(64 * 1024).decode("utf-8", errors="ignore")
+    if "schema.getpostman.com" in head or '"_postman_id"' in head:
+        return "postman"
+    if re.search(r'"(openapi|swagger)"\s*:', head):
+        return "openapi"
+    if re.search(r'"log"\s*:', head):
+        return "har"
+    raise ValueError("Unable to detect the import format, please specify it explicitly.")
+
+
+# ------------------------------------------------------------------
+# 解析器：把各格式的请求映射为 ImportedCase
+# ------------------------------------------------------------------
+
+def _status_assertion(status: Any) -> Optional[List[Dict[str, Any]]]:
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return None
+    return [{"check": "status_code", "comparator": "equals", "expect": status}]
+
+
+def _json_body(text: Any) -> Optional[Dict[str, Any]]:
+    """用例请求体只支持 JSON 对象，其他内容丢弃"""
+    if isinstance(text, dict):
+        return text
+    if not isinstance(text, str) or not text.strip():
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _rebase(url: str, base_url: Optional[str]) -> str:
+    """指定了 base_url 时，把原地址的协议和主机（或开头的 {{变量}}）替换为 base_url"""
+    if not base_url:
+        return url
+    match = re.match(r"^(?:[a-zA-Z][\w+.-]*://[^/?#]*|\{\{[^}]+\}\})", url)
+    rest = url[match.end():] if match else url
+    return base_url.rstrip("/") + ("/" + rest.lstrip("/") if rest else "")
+
+
+def _with_body_headers(headers: Dict[str, Any], body: Optional[Dict[str, Any]], content_type: str) -> Optional[Dict[str, Any]]:
+    # 执行引擎按 Content-Type 决定以 JSON 还是表单发送请求体
+    if body is not None and not any(key.lower() == "content-type" for key in headers):
+        headers["Content-Type"] = content_type
+    return headers or None
+
+
+def _schema_example(schema: Any, depth: int = 0) -> Any:
+    """
+    根据 JSON Schema 生成示例值，优先使用 example/default
+    流式解析时无法回查 components，$ref 引用的结构不展开
+    """
+    if not isinstance(schema, dict) or "$ref" in schema or depth > 5:
+        return None
+    if "example" in schema:
+        return schema["example"]
+    if "default" in schema:
+        return schema["default"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    schema_type = schema.get("type")
+    if schema_type == "object" or "properties" in schema:
+        return {name: _schema_example(prop, depth + 1) for name, prop in (schema.get("properties") or {}).items()}
+    if schema_type == "array":
+        item = _schema_example(schema.get("items"), depth + 1)
+        return [item] if item is not None else []
+    return {"string": "", "integer": 0, "number": 0, "boolean": False}.get(schema_type)
+
+
+def _openapi_body(operation: Dict[str, Any], parameters: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], str]:
+    request_body = operation.get("requestBody")
+    if isinstance(request_body, dict):
+        content = request_body.get("content") or {}
+        for media_type, media in content.items():
+            if not isinstance(media, dict):
+                continue
+            example = media.get("example")
+            if example is None and isinstance(media.get("examples"), dict):
+                first = next(iter(media["examples"].values()), None)
+                example = first.get("value") if isinstance(first, dict) else None
+            if example is None:
+                example = _schema_example(media.get("schema"))
+            if isinstance(example, dict):
+                return example, media_type
+        return None, "application/json"
+    # Swagger 2.0：请求体是 in=body 的参数
+    for param in parameters:
+        if param.get("in") == "body":
+            example = _schema_example(param.get("schema"))
+            return (example if isinstance(example, dict) else None), "application/json"
+    form = {param["name"]: param.get("default", "") for param in parameters
+            if param.get("in") == "formData" and param.get("name")}
+    return form or None, "application/x-www-form-urlencoded"
+
+
+def _openapi_case(base_url: str, path: str, method: str, operation: Dict[str, Any],
+                  parameters: List[Dict[str, Any]]) -> ImportedCase:
+    # $ref 引用的公共参数在流式解析时无法解析，直接忽略
+    parameters = [param for param in parameters if isinstance(param, dict) and "$ref" not in param]
+    # 路径参数 {id} 转为模板变量 {{id}}，执行时从变量池替换
+    url = base_url + re.sub(r"\{([^{}]+)\}", r"{{\1}}", path)
+    query = [f"{param['name']}={param.get('example', '{{' + param['name'] + '}}')}"
+             for param in parameters if param.get("in") == "query" and param.get("required") and param.get("name")]
+    if query:
+        url += "?" + "&".join(query)
+    headers = {param["name"]: str(param.get("example", "{{" + param["name"] + "}}"))
+               for param in parameters if param.get("in") == "header" and param.get("name")}
+    body, content_type = _openapi_body(operation, parameters)
+
+    responses = operation.get("responses") or {}
+    success = sorted(str(code) for code in responses if str(code).startswith("2"))
+    tags = operation.get("tags") or []
+    return ImportedCase(
+        module_path=(str(tags[0]),) if tags else (),
+        name=operation.get("summary") or operation.get("operationId") or f"{method.upper()} {path}",
+        method=method.upper(),
+        url=url,
+        description=operation.get("description"),
+        headers=_with_body_headers(headers, body, content_type),
+        body=body,
+        assertions=_status_assertion(success[0]) if success else None,
+    )
+
+
+def parse_openapi(source: DocumentSource, base_url: Optional[str] = None) -> Iterator[ImportedCase]:
+    """
+    OpenAPI 3.x / Swagger 2.0：每个 path + method 生成一个用例，按第一个 tag 归入模块，
+    期望状态码取第一个 2xx 响应。paths 逐个流式读取，不会把整份文档载入内存
+    """
+    if not base_url:
+        servers = source.value("servers")
+        if servers and isinstance(servers[0], dict):
+            base_url = servers[0].get("url")
+        else:
+            host = source.value("host")
+            base_path = source.value("basePath") or ""
+            schemes = source.value("schemes") or ["http"]
+            base_url = f"{schemes[0]}://{host}{base_path}" if host else base_path
+    base_url = (base_url or "").rstrip("/")
+
+    for path, operations in source.kvitems("paths"):
+        if not isinstance(operations, dict):
+            continue
+        shared_parameters = operations.get("parameters") or []
+        for method, operation in operations.items():
+            if method.lower() not in HTTP_METHODS or not isinstance(operation, dict):
+                continue
+            parameters = shared_parameters + (operation.get("parameters") or [])
+            yield _openapi_case(base_url, path, method, operation, parameters)
+
+
+def parse_har(source: DocumentSource, base_url: Optional[str] = None) -> Iterator[ImportedCase]:
+    """
+    HAR：每个请求生成一个用例，按主机归入模块，期望状态码取录制到的响应状态码
+    """
+    for entry in source.items("log.entries.item"):
+        if not isinstance(entry, dict) or entry.get("_resourceType") in _STATIC_RESOURCE_TYPES:
+            continue
+        request = entry.get("request") or {}
+        method, url = request.get("method"), request.get("url")
+        if not method or not url:
+            continue
+        parts = urlsplit(url)
+        headers = {header["name"]: header.get("value", "") for header in request.get("headers") or []
+                   if header.get("name") and not header["name"].startswith(":")
+                   and header["name"].lower() not in _SKIPPED_HEADERS}
+        post_data = request.get("postData") or {}
+        mime_type = post_data.get("mimeType") or "application/json"
+        if post_data.get("params"):
+            body = {param["name"]: param.get("value", "") for param in post_data["params"] if param.get("name")}
+        else:
+            body = _json_body(post_data.get("text"))
+        yield ImportedCase(
+            module_path=(parts.netloc,) if parts.netloc else (),
+            name=f"{method.upper()} {parts.path or '/'}",
+            method=method.upper(),
+            url=_rebase(url, base_url),
+            headers=_with_body_headers(headers, body, mime_type.split(";")[0]),
+            body=body,
+            assertions=_status_assertion((entry.get("response") or {}).get("status")),
+        )
+
+
+def _postman_url(url: Any) -> Optional[str]:
+    if isinstance(url, str):
+        return url
+    if not isinstance(url, dict):
+        return None
+    if url.get("raw"):
+        return url["raw"]
+    host = url.get("host") or ""
+    host = ".".join(host) if isinstance(host, list) else host
+    path = url.get("path") or ""
+    path = "/".join(str(part) for part in path) if isinstance(path, list) else path
+    protocol = f"{url['protocol']}://" if url.get("protocol") else ""
+    return f"{protocol}{host}/{path.lstrip('/')}"
+
+
+def _postman_cases(item: Dict[str, Any], module_path: Tuple[str, ...], base_url: Optional[str]) -> Iterator[ImportedCase]:
+    if isinstance(item.get("item"), list):
+        folder_path = module_path + (item.get("name") or "Folder",)
+        for child in item["item"]:
+            if isinstance(child, dict):
+                yield from _postman_cases(child, folder_path, base_url)
+        return
+    request = item.get("request")
+    if isinstance(request, str):
+        request = {"url": request, "method": "GET"}
+    if not isinstance(request, dict):
+        return
+    url = _postman_url(request.get("url"))
+    if not url:
+        return
+    method = (request.get("method") or "GET").upper()
+    headers = {header["key"]: header.get("value", "") for header in request.get("header") or []
+               if isinstance(header, dict) and header.get("key") and not header.get("disabled")
+               and header["key"].lower() not in _SKIPPED_HEADERS}
+    body_spec = request.get("body") or {}
+    mode = body_spec.get("mode")
+    body, content_type = None, "application/json"
+    if mode == "raw":
+        body = _json_body(body_spec.get("raw"))
+    elif mode in ("urlencoded", "formdata"):
+        body = {field["key"]: field.get("value", "") for field in body_spec.get(mode) or []
+                if isinstance(field, dict) and field.get("key") and not field.get("disabled")
+                and field.get("type", "text") == "text"} or None
+        content_type = "application/x-www-form-urlencoded"
+    # 期望状态码取保存的第一个响应示例
+    examples = item.get("response") or []
+    status = examples[0].get("code") if examples and isinstance(examples[0], dict) else None
+    yield ImportedCase(
+        module_path=module_path,
+        name=item.get("name") or f"{method} {url}",
+        method=method,
+        url=_rebase(url, base_url),
+        description=request.get("description") if isinstance(request.get("description"), str) else None,
+        headers=_with_body_headers(headers, body, content_type),
+        body=body,
+        assertions=_status_assertion(status),
+    )
+
+
+def parse_postman(source: DocumentSource, base_url: Optional[str] = None) -> Iterator[ImportedCase]:
+    """
+    Postman Collection v2.0/v2.1：集合名作为根模块，文件夹层级映射为子模块，
+    {{变量}} 与平台的模板语法一致，原样保留。顶层条目逐个流式读取
+    """
+    collection = source.value("info.name") or "Postman"
+    for item in source.items("item.item"):
+        if isinstance(item, dict):
+            yield from _postman_cases(item, (str(collection),), base_url)
+
+
+PARSERS: Dict[str, Callable[[DocumentSource, Optional[str]], Iterator[ImportedCase]]] = {
+    "openapi": parse_openapi,
+    "har": parse_har,
+    "postman": parse_postman,
+}
+
+
+# ------------------------------------------------------------------
+# 写入
+# ------------------------------------------------------------------
+
+def _truncate(value: Optional[str], length: int) -> Optional[str]:
+    return value[:length] if value else value
+
+
+def import_cases(db: Session, cases: Iterable[ImportedCase], parent_module_id: Optional[int] = None,
+                 chunk_size: int = IMPORT_CHUNK_SIZE,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    把解析出的用例分批写入 test_cases：每批一条多行 INSERT、一个事务
+    - 按 method + url 去重：已存在的用例和文件内重复的请求都会跳过，中断后重新导入只会补齐缺少的部分
+    - module_path 在 parent_module_id 下逐级查找同名模块，不存在时创建（与所在批次的用例同一事务提交）
+    - 新用例的 priority 接在现有用例之后，保持导入顺序
+    on_progress 在每批插入后、提交前调用，可在同一事务中写入进度；为空时直接提交
+    """
+    stats = ImportStats()
+    existing: Set[Tuple[str, str]] = {
+        ((method or "").upper(), url) for method, url in db.execute(select(TestCase.method, TestCase.url))
+    }
+    modules: Dict[Tuple[Optional[int], str], int] = {
+        (parent_id, name): module_id
+        for module_id, name, parent_id in db.execute(select(TestModule.id, TestModule.name, TestModule.parent_id))
+    }
+    path_ids: Dict[Tuple[str, ...], Optional[int]] = {(): parent_module_id}
+    touched_modules: Set[int] = set()
+    max_priority = db.execute(select(func.max(TestCase.priority))).scalar()
+    next_priority = (max_priority if max_priority is not None else -SORT_KEY_GAP) + SORT_KEY_GAP
+
+    def resolve_module(path: Tuple[str, ...]) -> Optional[int]:
+        if path not in path_ids:
+            parent_id = resolve_module(path[:-1])
+            name = _truncate(path[-1], _NAME_MAX_LENGTH) or "default"
+            module_id = modules.get((parent_id, name))
+            if module_id is None:
+                # 只 flush，与本批用例在 flush() 中一起提交；导入被取消或失败时不会留下空模块
+                module_id = crud_test_module.add_test_module(
+                    db, TestModuleCreate(name=name, parent_id=parent_id)
+                ).id
+                modules[(parent_id, name)] = module_id
+                stats.modules_created += 1
+                if parent_id is not None:
+                    touched_modules.add(parent_id)
+            path_ids[path] = module_id
+        return path_ids[path]
+
+    def flush(rows: List[Dict[str, Any]]):
+        if rows:
+            db.execute(insert(TestCase), rows)
+        if on_progress is not None:
+            on_progress(asdict(stats))
+        else:
+            db.commit()
+
+    rows: List[Dict[str, Any]] = []
+    for case in cases:
+        stats.processed += 1
+        method = (case.method or "").upper()
+        if not case.url or len(case.url) > _URL_MAX_LENGTH or not method or len(method) > _METHOD_MAX_LENGTH:
+            stats.skipped_invalid += 1
+            continue
+        key = (method, case.url)
+        if key in existing:
+            stats.skipped_duplicates += 1
+            continue
+        existing.add(key)
+        module_id = resolve_module(tuple(case.module_path))
+        if module_id is not None:
+            touched_modules.add(module_id)
+        rows.append({
+            "name": _truncate(case.name, _NAME_MAX_LENGTH) or f"{method} {case.url}"[:_NAME_MAX_LENGTH],
+            "description": _truncate(case.description, _DESCRIPTION_MAX_LENGTH),
+            "url": case.url,
+            "method": method,
+            "headers": case.headers,
+            "body": case.body,
+            "assertions": case.assertions,
+            "module_id": module_id,
+            "priority": next_priority,
+        })
+        next_priority += SORT_KEY_GAP
+        stats.created += 1
+        if len(rows) >= chunk_size:
+            flush(rows)
+            rows = []
+            if cancel_event is not None and cancel_event.is_set():
+                stats.cancelled = True
+                break
+    if not stats.cancelled:
+        flush(rows)
+
+    for module_id in touched_modules:
+        execution_plan.invalidate_module(module_id)
+    return asdict(stats)
+
+
+def run_import_job(db: Session, db_job, cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    执行导入任务，payload: {path, format, base_url, module_id}
+    进度写入 test_jobs.progress，上传的临时文件在结束后删除
+    """
+    payload = db_job.payload or {}
+    path = payload["path"]
+    try:
+        parser = PARSERS.get(payload.get("format"))
+        if parser is None:
+            raise ValueError(f"Unsupported import format: {payload.get('format')}")
+        cases = parser(DocumentSource(path), payload.get("base_url"))
+        stats = import_cases(
+            db, cases,
+            parent_module_id=payload.get("module_id"),
+            on_progress=lambda progress: crud_test_job.update_job_progress(db, db_job.id, progress),
+            cancel_event=cancel_event,
+        )
+        crud_test_job.update_job_progress(db, db_job.id, stats)
+        print(f"📥 导入任务 #{db_job.id} 完成: 新增 {stats['created']}，重复 {stats['skipped_duplicates']}，"
+              f"无效 {stats['skipped_invalid']}，新建模块 {stats['modules_created']}")
+        return stats
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
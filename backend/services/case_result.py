@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from services.response_store import CapturedBody
+
+
+@dataclass(slots=True)
+class CaseResult:
+    """
+    单个用例的执行结果
+
+    使用 slots 数据类代替字典以减小单个对象的体积；结果写入缓冲区后调用 release()
+    丢弃请求/响应等大字段，使整个套件执行期间常驻内存的结果与用例数量成正比而与响应大小无关
+    """
+    id: Optional[int] = None
+    name: Optional[str] = None
+    status: Optional[str] = None
+    status_code: Optional[int] = None
+    # 未执行或执行异常时的说明信息
+    response: Optional[str] = None
+    assertions: Optional[Dict[str, Any]] = None
+    url: Optional[str] = None
+    method: Optional[str] = None
+    start_time: Optional[datetime] = None
+    duration: Optional[float] = None
+    request_headers: Optional[Dict[str, Any]] = None
+    request_body: Any = None
+    response_headers: Optional[Dict[str, Any]] = None
+    response_body: Optional[CapturedBody] = None
+    error_message: Optional[str] = None
+    # 分阶段耗时（毫秒），见 services.request_timing
+    timings: Optional[Dict[str, float]] = None
+    # 用例开始执行时的变量快照，随执行记录保存，供重跑失败用例时还原
+    variables: Optional[Dict[str, Any]] = None
+    # 本用例提取到的变量，按执行顺序累加即得到断点续跑所需的变量状态
+    extracted: Optional[Dict[str, Any]] = None
+
+    @property
+    def assertion_details(self):
+        return (self.assertions or {}).get("details", [])
+
+    def release(self) -> "CaseResult":
+        """结果已持久化后释放大字段，只保留汇总与进度展示所需的信息"""
+        self.assertions = None
+        self.request_headers = None
+        self.request_body = None
+        self.response_headers = None
+        self.response_body = None
+        self.variables = None
+        self.extracted = None
+        return self
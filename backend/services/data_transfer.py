@@ -0,0 +1,355 @@
+import enum
+import gzip
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import DateTime, func, insert, select
+from sqlalchemy.orm import Session
+
+from core.config import EXPORT_BUFFER_BYTES, EXPORT_YIELD_PER, IMPORT_CHUNK_SIZE
+from core.database import SessionLocal
+from crud import crud_test_job, crud_test_module
+from models.test_case import TestCase
+from models.test_module import TestModule, TestModuleClosure
+from models.test_report import TestRecord, TestReport
+from models.test_suite import TestSuite, TestSuiteItem
+from schemas.test_module import TestModuleCreate
+from services import blob_store, execution_plan
+
+# 每一行 NDJSON 的 type -> 对应的表；导出与导入都按此顺序，被引用的对象总在引用方之前
+MODELS: Dict[str, Any] = {
+    "module": TestModule,
+    "case": TestCase,
+    "suite": TestSuite,
+    "suite_item": TestSuiteItem,
+    "report": TestReport,
+    "record": TestRecord,
+}
+
+# 导入时需要把旧ID映射为新ID的外键：列名 -> 被引用对象的 type
+REFERENCES: Dict[str, Dict[str, str]] = {
+    "module": {"parent_id": "module"},
+    "case": {"module_id": "module"},
+    "suite": {"parent_id": "suite"},
+    "suite_item": {"suite_id": "suite", "test_case_id": "case", "module_id": "module", "child_suite_id": "suite"},
+    "report": {"suite_id": "suite", "parent_report_id": "report"},
+    "record": {"report_id": "report", "test_case_id": "case"},
+}
+
+# 不可为空的外键，解析不到时整行跳过
+REQUIRED_REFERENCES: Dict[str, Set[str]] = {
+    "suite_item": {"suite_id"},
+    "record": {"report_id"},
+}
+
+# 导出种类 -> 依次输出的 type
+EXPORT_KINDS: Dict[str, Tuple[str, ...]] = {
+    "testcases": ("module", "case"),
+    "suites": ("suite", "suite_item"),
+    "reports": ("report", "record"),
+    "all": tuple(MODELS),
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# ------------------------------------------------------------------
+# 导出
+# ------------------------------------------------------------------
+
+def _export_query(row_type: str, suite_id: Optional[int] = None, start_from: Optional[datetime] = None,
+                  start_to: Optional[datetime] = None):
+    model = MODELS[row_type]
+    table = model.__table__
+    query = select(*table.columns)
+    if row_type == "module":
+        # 父模块先于子模块输出，导入时可以逐个挂到已创建的父模块下
+        depth = (
+            select(func.count())
+            .where(TestModuleClosure.descendant_id == TestModule.id)
+            .correlate(TestModule)
+            .scalar_subquery()
+        )
+        return query.order_by(depth, table.c.id)
+    if row_type in ("report", "record"):
+        reports = select(TestReport.id)
+        if suite_id is not None:
+            reports = reports.where(TestReport.suite_id == suite_id)
+        if start_from is not None:
+            reports = reports.where(TestReport.start_time >= start_from)
+        if start_to is not None:
+            reports = reports.where(TestReport.start_time < start_to)
+        if row_type == "report":
+            query = query.where(table.c.id.in_(reports))
+        else:
+            query = query.where(table.c.report_id.in_(reports)).order_by(table.c.report_id, table.c.id)
+            return query
+    return query.order_by(table.c.id)
+
+
+def to_line(row_type: str, mapping: Any) -> str:
+    """把一行查询结果序列化为一行 NDJSON"""
+    data = {"type": row_type}
+    data.update(mapping)
+    return json.dumps(data, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def export_lines(db: Session, kind: str, **filters) -> Iterator[str]:
+    """
+    逐行生成 NDJSON，每行为 {"type": ..., 表的全部列}
+    查询使用 yield_per（服务端游标）分批读取，不构造 ORM 对象，内存占用与导出的行数无关；
+    各类型依次单独查询，同一连接上不会同时存在两个未读完的结果集；
+    执行记录的请求/响应内容按批从 content_blobs 还原（单独的会话），导出文件不依赖内容表
+    """
+    for row_type in EXPORT_KINDS[kind]:
+        result = db.execute(_export_query(row_type, **filters).execution_options(yield_per=EXPORT_YIELD_PER))
+        if row_type != "record":
+            for row in result:
+                yield to_line(row_type, row._mapping)
+            continue
+        blob_db = SessionLocal()
+        try:
+            for partition in result.partitions():
+                for row in blob_store.resolve_rows(blob_db, [dict(row._mapping) for row in partition]):
+                    yield to_line(row_type, row)
+        finally:
+            blob_db.close()
+
+
+def export_stream(kind: str, compress: bool = False, **filters) -> Iterator[bytes]:
+    """
+    StreamingResponse 使用的字节流：行累积到 EXPORT_BUFFER_BYTES 后输出一块，可选 gzip 压缩
+    在生成器内部单独打开会话，响应发送完毕（或客户端断开）时关闭
+    """
+    db = SessionLocal()
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    try:
+        buffer: List[str] = []
+        size = 0
+        for line in export_lines(db, kind, **filters):
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_BUFFER_BYTES:
+                data = "".join(buffer).encode("utf-8")
+                data = compressor.compress(data) if compressor else data
+                if data:
+                    yield data
+                buffer, size = [], 0
+        data = "".join(buffer).encode("utf-8")
+        if compressor:
+            data = compressor.compress(data) + compressor.flush()
+        if data:
+            yield data
+    finally:
+        db.close()
+
+
+# ------------------------------------------------------------------
+# 导入
+# ------------------------------------------------------------------
+
+def read_lines(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取 NDJSON 文件，按文件头自动识别 gzip"""
+    with open(path, "rb") as f:
+        is_gzip = f.read(2) == b"\x1f\x8b"
+    opener = gzip.open if is_gzip else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON on line {line_no}: {e}")
+
+
+def _datetime_columns(model: Any) -> Set[str]:
+    return {column.name for column in model.__table__.columns if isinstance(column.type, DateTime)}
+
+
+_DATETIME_COLUMNS = {row_type: _datetime_columns(model) for row_type, model in MODELS.items()}
+_COLUMNS = {row_type: {column.name for column in model.__table__.columns} for row_type, model in MODELS.items()}
+
+
+def from_line(row_type: str, line: Dict[str, Any]) -> Dict[str, Any]:
+    """to_line 的逆操作：只保留表中存在的列，时间列还原为 datetime"""
+    row = {key: value for key, value in line.items() if key in _COLUMNS[row_type]}
+    for column in _DATETIME_COLUMNS[row_type]:
+        if isinstance(row.get(column), str):
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+
+def import_lines(db: Session, lines: Iterable[Dict[str, Any]], chunk_size: int = IMPORT_CHUNK_SIZE,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None, same_database: bool = False) -> Dict[str, Any]:
+    """
+    导入 export_lines 输出的数据，逐行读取、按类型分批写入，每批一个事务
+    - 所有对象都以新ID写入：同一文件中导出的对象之间的引用改写为新ID；
+      引用文件之外的对象时置空并计入 unresolved（必填引用解析不到时跳过该行）——其他环境的ID在本库中
+      可能恰好指向无关的对象。same_database 为 True（文件导出自本库）时，本库中存在的同ID目标保留引用
+    - 套件条目和执行记录没有被其他行引用，用多行 INSERT 写入；其余类型需要拿到新ID，逐行插入
+    on_progress 在每批写入后、提交前调用，为空时直接提交
+    """
+    id_maps: Dict[str, Dict[int, int]] = {row_type: {} for row_type in MODELS}
+    stats: Dict[str, Any] = {"processed": 0, "created": {row_type: 0 for row_type in MODELS},
+                             "skipped": 0, "unresolved": 0, "cancelled": False}
+    pending: List[Dict[str, Any]] = []
+    pending_type: Optional[str] = None
+
+    def resolve_references(row_type: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # 文件内没有的引用：只有确认导出自本库时才批量确认一次是否存在于本库
+        external: Dict[str, Set[int]] = {}
+        for row in rows:
+            for column, target in REFERENCES[row_type].items():
+                old_id = row.get(column)
+                if old_id is not None and old_id not in id_maps[target]:
+                    external.setdefault(target, set()).add(old_id)
+        existing: Dict[str, Set[int]] = {}
+        if same_database:
+            for target, ids in external.items():
+                model = MODELS[target]
+                existing[target] = set(db.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+        resolved = []
+        unresolved: Dict[str, int] = {}
+        for row in rows:
+            keep = True
+            for column, target in REFERENCES[row_type].items():
+                old_id = row.get(column)
+                if old_id is None:
+                    continue
+                new_id = id_maps[target].get(old_id)
+                if new_id is None and old_id in existing.get(target, ()):
+                    new_id = old_id
+                row[column] = new_id
+                if new_id is None:
+                    unresolved[column] = unresolved.get(column, 0) + 1
+                    if column in REQUIRED_REFERENCES.get(row_type, ()):
+                        keep = False
+            if keep:
+                resolved.append(row)
+            else:
+                stats["skipped"] += 1
+        if unresolved:
+            stats["unresolved"] += sum(unresolved.values())
+            detail = "，".join(f"{column} {count} 个" for column, count in unresolved.items())
+            print(f"⚠️ 导入 {row_type}: 引用的对象不在导入文件中，已置空或跳过（{detail}）")
+        return resolved
+
+    def flush():
+        nonlocal pending
+        if not pending:
+            return
+        row_type, rows = pending_type, pending
+        pending = []
+        model = MODELS[row_type]
+        if row_type in REFERENCES[row_type].values():
+            # 模块、套件、报告（重跑报告指向原报告）引用同类型的父对象，父对象可能就在同一批中，逐行解析引用并写入
+            created = 0
+            for row in rows:
+                old_id = row.pop("id", None)
+                resolved = resolve_references(row_type, [row])
+                if not resolved:
+                    continue
+                if row_type == "module":
+                    # 模块需要同时维护闭包表；按深度导出，父模块已先创建
+                    new_id = crud_test_module.create_test_module(db, TestModuleCreate(
+                        name=row["name"], description=row.get("description"), parent_id=row.get("parent_id")
+                    )).id
+                else:
+                    obj = model(**row)
+                    db.add(obj)
+                    db.flush()
+                    new_id = obj.id
+                    db.expunge(obj)
+                if old_id is not None:
+                    id_maps[row_type][old_id] = new_id
+                created += 1
+        else:
+            rows = resolve_references(row_type, rows)
+            old_ids = [row.pop("id", None) for row in rows]
+            if row_type in ("suite_item", "record"):
+                if rows:
+                    if row_type == "record":
+                        rows = blob_store.intern_rows(db, rows)
+                    db.execute(insert(model), rows)
+            else:
+                objects = [model(**row) for row in rows]
+                db.add_all(objects)
+                db.flush()
+                for old_id, obj in zip(old_ids, objects):
+                    if old_id is not None:
+                        id_maps[row_type][old_id] = obj.id
+                    # 写入后不再需要这些对象，及时移出会话，避免 identity map 随导入量增长
+                    db.expunge(obj)
+            created = len(rows)
+        stats["created"][row_type] += created
+        if on_progress is not None:
+            on_progress(stats)
+        else:
+            db.commit()
+
+    for line in lines:
+        stats["processed"] += 1
+        row_type = line.pop("type", None)
+        if row_type not in MODELS:
+            stats["skipped"] += 1
+            continue
+        row = from_line(row_type, line)
+        if row_type == "report":
+            # 趋势统计只在本库中累计，导入的报告由保留任务重新合并
+            row.pop("rolled_up_at", None)
+            # 执行断点只对本库中的任务有意义
+            row.pop("checkpoint", None)
+        if row_type != pending_type or len(pending) >= chunk_size:
+            flush()
+            if cancel_event is not None and cancel_event.is_set():
+                stats["cancelled"] = True
+                break
+            pending_type = row_type
+        pending.append(row)
+    if not stats["cancelled"]:
+        flush()
+
+    if stats["created"]["case"] or stats["created"]["suite_item"] or stats["created"]["module"]:
+        execution_plan.clear_cache()
+    return stats
+
+
+def run_import_job(db: Session, db_job, cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    执行 NDJSON 导入任务，payload: {path, same_database}；进度写入 test_jobs.progress，上传的临时文件在结束后删除
+    NDJSON 导入不去重，且新旧ID映射只在内存中，进程中断后重新排队的任务无法安全续传，直接标记失败
+    """
+    job_id = db_job.id
+    path = (db_job.payload or {})["path"]
+    try:
+        if db_job.progress is not None:
+            raise ValueError("NDJSON import was interrupted and cannot be resumed, please import the file again.")
+        stats = import_lines(
+            db, read_lines(path),
+            on_progress=lambda progress: crud_test_job.update_job_progress(db, job_id, progress),
+            cancel_event=cancel_event,
+            same_database=bool((db_job.payload or {}).get("same_database")),
+        )
+        crud_test_job.update_job_progress(db, job_id, stats)
+        print(f"📥 NDJSON 导入任务 #{job_id} 完成: {stats['created']}，跳过 {stats['skipped']}")
+        return stats
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Set
+
+from services.template import get_case_templates
+
+
+def case_reads(test_case: Any) -> Set[str]:
+    """用例在 url / headers / body 中读取的变量（取自缓存的渲染计划）"""
+    return set(get_case_templates(test_case).variables)
+
+
+def case_writes(test_case: Any) -> Set[str]:
+    """用例通过 extract_rules 写入的变量"""
+    return set((test_case.extract_rules or {}).keys())
+
+
+def build_dependency_graph(test_cases: List[Any]) -> List[Set[int]]:
+    """
+    根据变量读写关系构建用例依赖图（按列表顺序即 sort_order 推导）
+    返回: deps，deps[i] 为第 i 个用例开始前必须已完成的用例下标集合
+
+    依赖规则（保证并发执行的结果与顺序执行一致）：
+    - 读后写：用例读取变量 v，依赖在它之前最后一个写入 v 的用例
+    - 写后写：用例写入变量 v，依赖在它之前最后一个写入 v 的用例
+    - 写后读：用例写入变量 v，依赖上一次写入之后所有读取过 v 的用例，
+      避免后面的提取结果覆盖前面用例尚未使用的值
+    """
+    deps: List[Set[int]] = []
+    last_writer: Dict[str, int] = {}
+    readers_since_write: Dict[str, List[int]] = {}
+
+    for index, test_case in enumerate(test_cases):
+        if test_case is None:
+            deps.append(set())
+            continue
+
+        reads = case_reads(test_case)
+        writes = case_writes(test_case)
+        case_deps: Set[int] = set()
+
+        for var_name in reads:
+            if var_name in last_writer:
+                case_deps.add(last_writer[var_name])
+        for var_name in writes:
+            if var_name in last_writer:
+                case_deps.add(last_writer[var_name])
+            case_deps.update(readers_since_write.get(var_name, ()))
+        case_deps.discard(index)
+        deps.append(case_deps)
+
+        for var_name in reads:
+            readers_since_write.setdefault(var_name, []).append(index)
+        for var_name in writes:
+            last_writer[var_name] = index
+            readers_since_write[var_name] = []
+
+    return deps
@@ -0,0 +1,236 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import literal, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import PLAN_CACHE_SIZE, PLAN_CACHE_TTL
+from models.test_case import TestCase
+from models.test_module import TestModuleClosure
+from models.test_suite import TestSuite, TestSuiteItem
+from services.cache import LRUCache
+
+
+@dataclass(frozen=True, slots=True)
+class PlanCase:
+    """
+    执行计划中的用例快照：只保留执行引擎需要的字段，与数据库会话解耦，可在线程/请求之间共享
+    """
+    id: int
+    name: str
+    url: str
+    method: str
+    headers: Any
+    body: Any
+    extract_rules: Any
+    assertions: Any
+    module_id: Optional[int]
+    updated_at: Optional[datetime]
+
+
+@dataclass(frozen=True, slots=True)
+class PlanStep:
+    """
+    执行计划中的一步：正常情况下 case 不为空；条目缺失或存在循环引用时 case 为空，
+    error_* 描述需要直接记为 error 的结果。top_item_id 为该步骤所属的根套件顶层条目
+    """
+    top_item_id: int
+    item_id: int
+    case: Optional[PlanCase] = None
+    error_id: Optional[int] = None
+    error_name: Optional[str] = None
+    error_message: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ExecutionPlan:
+    """
+    套件树展开后的线性执行计划，连同其依赖的套件/模块/用例ID一起缓存，
+    任一依赖被修改时整份计划失效
+    """
+    suite_id: int
+    suite_name: str
+    steps: Tuple[PlanStep, ...]
+    # 根套件顶层条目 (item_id, item_type)，按 sort_order 排列，用于多进程分片
+    top_items: Tuple[Tuple[int, str], ...]
+    suite_ids: FrozenSet[int]
+    module_ids: FrozenSet[int]
+    case_ids: FrozenSet[int]
+    built_at: float
+
+    def cases(self) -> List[PlanCase]:
+        return [step.case for step in self.steps if step.case is not None]
+
+    def steps_for(self, top_item_ids: Iterable[int]) -> List[PlanStep]:
+        wanted = set(top_item_ids)
+        return [step for step in self.steps if step.top_item_id in wanted]
+
+
+_cache = LRUCache(max_size=PLAN_CACHE_SIZE)
+
+
+def _item_type(value: Any) -> str:
+    return getattr(value, "value", value)
+
+
+def compile_plan(db: Session, suite_id: int) -> Optional[ExecutionPlan]:
+    """
+    用固定次数的批量查询展开套件树，套件不存在时返回 None
+    1. 递归 CTE 找出根套件可达的全部子套件（UNION 去重，遇到循环引用也会终止）
+    2. 一次取出这些套件的全部条目与套件名
+    3. 通过模块闭包表一次取出引用模块的整棵子树
+    4. 一次取出条目引用的全部用例（直接引用的用例 + 引用模块子树下的用例）
+    之后在内存中按 sort_order 深度优先展开，子套件形成环时记为 error 而不是无限递归
+    """
+    tree = select(literal(suite_id).label("suite_id")).cte("suite_tree", recursive=True)
+    tree = tree.union(
+        select(TestSuiteItem.child_suite_id)
+        .join(tree, TestSuiteItem.suite_id == tree.c.suite_id)
+        .where(TestSuiteItem.child_suite_id.isnot(None))
+    )
+    reachable = select(tree.c.suite_id)
+
+    suite_names: Dict[int, str] = dict(db.execute(
+        select(TestSuite.id, TestSuite.name).where(TestSuite.id.in_(reachable))
+    ).all())
+    if suite_id not in suite_names:
+        return None
+
+    items_by_suite: Dict[int, List[Any]] = {}
+    for row in db.execute(
+        select(TestSuiteItem.id, TestSuiteItem.suite_id, TestSuiteItem.item_type, TestSuiteItem.test_case_id,
+               TestSuiteItem.module_id, TestSuiteItem.child_suite_id)
+        .where(TestSuiteItem.suite_id.in_(reachable))
+        .order_by(TestSuiteItem.suite_id, TestSuiteItem.sort_order, TestSuiteItem.id)
+    ):
+        items_by_suite.setdefault(row.suite_id, []).append(row)
+
+    case_ids = {row.test_case_id for rows in items_by_suite.values() for row in rows
+                if _item_type(row.item_type) == "test_case" and row.test_case_id is not None}
+    module_ids = {row.module_id for rows in items_by_suite.values() for row in rows
+                  if _item_type(row.item_type) == "test_module" and row.module_id is not None}
+
+    # 通过闭包表一次取出被引用模块的整棵子树；没有自身行（depth=0）的模块视为不存在
+    subtree_modules: Dict[int, List[int]] = {}
+    if module_ids:
+        for ancestor_id, descendant_id in db.execute(
+            select(TestModuleClosure.ancestor_id, TestModuleClosure.descendant_id)
+            .where(TestModuleClosure.ancestor_id.in_(module_ids))
+        ):
+            subtree_modules.setdefault(ancestor_id, []).append(descendant_id)
+    subtree_module_ids = {module_id for descendants in subtree_modules.values() for module_id in descendants}
+
+    # 模块下的用例与用例列表一致，按优先级排序
+    cases: Dict[int, PlanCase] = {}
+    if case_ids or subtree_module_ids:
+        for row in db.execute(
+            select(TestCase.id, TestCase.name, TestCase.url, TestCase.method, TestCase.headers, TestCase.body,
+                   TestCase.extract_rules, TestCase.assertions, TestCase.module_id, TestCase.updated_at)
+            .where(or_(TestCase.id.in_(case_ids), TestCase.module_id.in_(subtree_module_ids)))
+            .order_by(TestCase.priority.asc(), TestCase.created_at.desc(), TestCase.id.desc())
+        ):
+            case = PlanCase(**row._mapping)
+            cases[case.id] = case
+
+    module_cases: Dict[int, List[PlanCase]] = {}
+
+    def subtree_cases(module_id: int) -> List[PlanCase]:
+        # cases 按查询的排序插入，遍历即保持优先级顺序；同一模块被多处引用时只筛选一次
+        if module_id not in module_cases:
+            subtree = set(subtree_modules[module_id])
+            module_cases[module_id] = [case for case in cases.values() if case.module_id in subtree]
+        return module_cases[module_id]
+
+    steps: List[PlanStep] = []
+
+    def expand(current_suite_id: int, path: List[int], top_item_id: Optional[int]):
+        for row in items_by_suite.get(current_suite_id, []):
+            top = top_item_id if top_item_id is not None else row.id
+            item_type = _item_type(row.item_type)
+            if item_type == "test_case":
+                case = cases.get(row.test_case_id)
+                if case is not None:
+                    steps.append(PlanStep(top_item_id=top, item_id=row.id, case=case))
+                else:
+                    steps.append(PlanStep(top_item_id=top, item_id=row.id, error_id=row.test_case_id,
+                                          error_name="Missing Case",
+                                          error_message=f"Test case ID {row.test_case_id} not found"))
+            elif item_type == "test_module":
+                if row.module_id in subtree_modules:
+                    # 运行整棵模块子树，子树内的用例整体按优先级排序
+                    for case in subtree_cases(row.module_id):
+                        steps.append(PlanStep(top_item_id=top, item_id=row.id, case=case))
+                else:
+                    steps.append(PlanStep(top_item_id=top, item_id=row.id, error_id=row.module_id,
+                                          error_name="Missing Module",
+                                          error_message=f"Module ID {row.module_id} not found"))
+            elif item_type == "test_suite" and row.child_suite_id:
+                child_id = row.child_suite_id
+                if child_id not in suite_names:
+                    steps.append(PlanStep(top_item_id=top, item_id=row.id, error_id=child_id,
+                                          error_name="Unknown Suite",
+                                          error_message=f"Test suite with id {child_id} not found."))
+                elif child_id in path:
+                    # 同一套件可以在不同分支中重复出现（菱形引用），但不能出现在自己的祖先链上
+                    cycle = " -> ".join(suite_names[sid] for sid in path[path.index(child_id):] + [child_id])
+                    steps.append(PlanStep(top_item_id=top, item_id=row.id, error_id=child_id,
+                                          error_name="Cyclic Suite",
+                                          error_message=f"Cyclic suite reference: {cycle}"))
+                else:
+                    path.append(child_id)
+                    expand(child_id, path, top)
+                    path.pop()
+
+    expand(suite_id, [suite_id], None)
+
+    return ExecutionPlan(
+        suite_id=suite_id,
+        suite_name=suite_names[suite_id],
+        steps=tuple(steps),
+        top_items=tuple((row.id, _item_type(row.item_type)) for row in items_by_suite.get(suite_id, [])),
+        suite_ids=frozenset(suite_names),
+        module_ids=frozenset(subtree_module_ids | module_ids),
+        case_ids=frozenset(cases),
+        built_at=time.monotonic(),
+    )
+
+
+def get_plan(db: Session, suite_id: int) -> Optional[ExecutionPlan]:
+    """
+    获取套件的执行计划，命中缓存时不访问数据库；超过 PLAN_CACHE_TTL 的计划重新编译
+    套件不存在时返回 None（不缓存）
+    """
+    plan = _cache.get_or_create(suite_id, lambda: compile_plan(db, suite_id))
+    if plan is not None and time.monotonic() - plan.built_at <= PLAN_CACHE_TTL:
+        return plan
+    _cache.invalidate(suite_id)
+    if plan is None:
+        return None
+    return _cache.get_or_create(suite_id, lambda: compile_plan(db, suite_id))
+
+
+def invalidate_suite(suite_id: int):
+    """套件被修改或删除时调用：丢弃所有包含该套件的计划（包括以它为子套件的父套件）"""
+    _cache.invalidate_values(lambda plan: plan is None or suite_id in plan.suite_ids)
+
+
+def invalidate_case(test_case_id: int, module_ids: Iterable[Optional[int]] = ()):
+    """用例被创建、修改或删除时调用；module_ids 为用例修改前后所属的模块"""
+    module_ids = {module_id for module_id in module_ids if module_id is not None}
+    _cache.invalidate_values(lambda plan: plan is None or test_case_id in plan.case_ids
+                             or not module_ids.isdisjoint(plan.module_ids))
+
+
+def invalidate_module(module_id: int):
+    """模块被修改或删除时调用"""
+    _cache.invalidate_values(lambda plan: plan is None or module_id in plan.module_ids)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,433 @@
+import asyncio
+import ipaddress
+import socket
+import ssl
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterable, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+from urllib.request import getproxies, proxy_bypass_environment
+
+import httpcore
+import httpx
+
+from core.config import (
+    DNS_CACHE_TTL,
+    HTTP2_ENABLED,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_MAX_KEEPALIVE_PER_HOST,
+    HTTP_MAX_POOLED_HOSTS,
+    HTTP_PREWARM_CONNECTIONS,
+)
+
+# HTTP/2 依赖 h2 包（pip install httpx[http2]），未安装时自动退回 HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+Origin = Tuple[str, str, int]
+
+
+class DNSCache:
+    """
+    进程级的域名解析缓存，TTL 内同一主机只解析一次；连接失败时由调用方使缓存失效
+    """
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int, timeout: Optional[float] = None) -> str:
+        if _is_ip_address(host):
+            return host
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        loop = asyncio.get_running_loop()
+        infos = await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout)
+        address = infos[0][4][0]
+        with self._lock:
+            self._entries[host] = (address, now + self.ttl)
+        return address
+
+    def invalidate(self, host: str):
+        with self._lock:
+            self._entries.pop(host, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+dns_cache = DNSCache()
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    在 httpcore 默认网络后端外包一层，建立 TCP 连接前先查 DNS 缓存
+    TLS 的 SNI / 证书校验仍使用原始主机名，不受影响
+    """
+
+    def __init__(self, cache: DNSCache):
+        self._cache = cache
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options=None):
+        address = await self._cache.resolve(host, port, timeout)
+        try:
+            return await self._backend.connect_tcp(address, port, timeout=timeout,
+                                                   local_address=local_address, socket_options=socket_options)
+        except Exception:
+            # 解析结果可能已过时，下次重新解析
+            self._cache.invalidate(host)
+            raise
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+def _create_ssl_context() -> ssl.SSLContext:
+    # 与原先 verify=False 的行为一致：测试环境常见自签名证书
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+# httpcore 异常 -> 对应的 httpx 异常，调用方只需处理 httpx.RequestError
+_EXCEPTION_MAP = {
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+    httpcore.ProtocolError: httpx.ProtocolError,
+}
+
+
+@contextmanager
+def _map_httpcore_exceptions():
+    try:
+        yield
+    except httpx.HTTPError:
+        raise
+    except Exception as exc:
+        # 按继承顺序取最具体的映射（子类排在父类之前）
+        for source, target in _EXCEPTION_MAP.items():
+            if isinstance(exc, source):
+                raise target(str(exc)) from exc
+        raise
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    """
+    把 httpcore 的响应体流包装为 httpx 的字节流，读取过程中的异常同样转换为 httpx 异常
+    关闭时通知所属连接池该请求已结束
+    """
+
+    def __init__(self, stream, transport: "HostTransport"):
+        self._stream = stream
+        self._transport = transport
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _map_httpcore_exceptions():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self):
+        try:
+            if hasattr(self._stream, "aclose"):
+                await self._stream.aclose()
+        finally:
+            transport, self._transport = self._transport, None
+            if transport is not None:
+                transport.request_finished()
+
+
+def _proxy_pool_kwargs(proxy_url: str) -> Dict[str, Any]:
+    """代理地址中的用户名密码拆成 proxy_auth，其余部分作为 proxy_url"""
+    parts = urlsplit(proxy_url)
+    kwargs: Dict[str, Any] = {"proxy_url": proxy_url}
+    if parts.username is not None:
+        kwargs["proxy_auth"] = (unquote(parts.username), unquote(parts.password or ""))
+        netloc = parts.hostname + (f":{parts.port}" if parts.port else "")
+        kwargs["proxy_url"] = parts._replace(netloc=netloc).geturl()
+    return kwargs
+
+
+class HostTransport(httpx.AsyncBaseTransport):
+    """
+    单个目标主机的连接池，连接数与 keep-alive 参数可配置，可选 HTTP/2 多路复用
+    直接基于 httpcore 连接池实现（接入带 DNS 缓存的网络后端），不依赖 httpx 传输层的内部属性
+    proxy 不为空时经该代理连接（http/https 代理，socks5 代理需要安装 socksio）
+    """
+
+    def __init__(self, http2: bool, limits: httpx.Limits, proxy: Optional[str] = None):
+        kwargs = dict(
+            ssl_context=_create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=CachingNetworkBackend(dns_cache),
+        )
+        if proxy is None:
+            self._pool = httpcore.AsyncConnectionPool(**kwargs)
+        elif urlsplit(proxy).scheme.startswith("socks"):
+            self._pool = httpcore.AsyncSOCKSProxy(**_proxy_pool_kwargs(proxy), **kwargs)
+        else:
+            self._pool = httpcore.AsyncHTTPProxy(**_proxy_pool_kwargs(proxy), **kwargs)
+        self.proxy = proxy
+        # 尚未结束（响应体未关闭）的请求数；被淘汰的连接池等这些请求结束后再关闭
+        self._active = 0
+        self._close_when_idle = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(scheme=request.url.raw_scheme, host=request.url.raw_host,
+                             port=request.url.port, target=request.url.raw_path),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        self._active += 1
+        try:
+            with _map_httpcore_exceptions():
+                response = await self._pool.handle_async_request(core_request)
+        except BaseException:
+            self.request_finished()
+            raise
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream, self),
+            extensions=response.extensions,
+        )
+
+    def request_finished(self):
+        self._active -= 1
+        if self._close_when_idle and self._active == 0:
+            asyncio.get_running_loop().create_task(self.aclose())
+
+    def close_when_idle(self):
+        """从连接池集合中淘汰后调用：没有进行中的请求时立即关闭，否则等最后一个请求结束后关闭"""
+        if self._active == 0:
+            asyncio.get_running_loop().create_task(self.aclose())
+        else:
+            self._close_when_idle = True
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+
+class HostPoolRegistry:
+    """
+    按 (scheme, host, port) 管理的连接池集合，绑定在一个事件循环上，跨多次执行复用
+    超过 HTTP_MAX_POOLED_HOSTS 时淘汰最久未使用的主机连接池（其中的请求结束后再关闭）
+    与 httpx 默认的 trust_env 行为一致，目标主机按环境变量 HTTP(S)_PROXY / ALL_PROXY / NO_PROXY 选择代理
+    """
+
+    def __init__(self, max_hosts: int = HTTP_MAX_POOLED_HOSTS):
+        self.max_hosts = max_hosts
+        self.http2 = HTTP2_ENABLED and HTTP2_AVAILABLE
+        self.limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.thread_name = threading.current_thread().name
+        self.proxies = getproxies()
+        self._transports: "OrderedDict[Origin, HostTransport]" = OrderedDict()
+
+    def proxy_for(self, origin: Origin) -> Optional[str]:
+        """目标主机应使用的代理地址，不使用代理时返回 None"""
+        scheme, host, port = origin
+        proxy = self.proxies.get(scheme) or self.proxies.get("all")
+        if not proxy or proxy_bypass_environment(f"{host}:{port}", self.proxies):
+            return None
+        # 与 httpx 一致：没有协议的代理地址按 http:// 处理
+        return proxy if "://" in proxy else f"http://{proxy}"
+
+    def has_origin(self, origin: Origin) -> bool:
+        return origin in self._transports
+
+    def get_transport(self, origin: Origin) -> HostTransport:
+        transport = self._transports.get(origin)
+        if transport is not None:
+            self._transports.move_to_end(origin)
+            return transport
+        transport = HostTransport(http2=self.http2, limits=self.limits, proxy=self.proxy_for(origin))
+        self._transports[origin] = transport
+        while len(self._transports) > self.max_hosts:
+            _, evicted = self._transports.popitem(last=False)
+            evicted.close_when_idle()
+        return transport
+
+    async def aclose(self):
+        transports = list(self._transports.values())
+        self._transports.clear()
+        for transport in transports:
+            await transport.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "thread": self.thread_name,
+            "http2": self.http2,
+            "hosts": [f"{scheme}://{host}:{port}" for scheme, host, port in list(self._transports)],
+            "proxied_hosts": [f"{scheme}://{host}:{port}" for (scheme, host, port), transport
+                              in list(self._transports.items()) if transport.proxy],
+        }
+
+
+class RoutingTransport(httpx.AsyncBaseTransport):
+    """
+    交给每次执行的 AsyncClient 使用：按请求的目标主机转发到共享连接池
+    关闭客户端时不关闭连接池，连接留给后续执行复用
+    """
+
+    def __init__(self, registry: HostPoolRegistry):
+        self._registry = registry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._registry.get_transport(_request_origin(request.url)).handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+def _request_origin(url: httpx.URL) -> Origin:
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return url.scheme, url.host, port
+
+
+# 每个执行线程持有一个常驻事件循环和绑定其上的连接池
+_local = threading.local()
+_registries: "weakref.WeakSet[HostPoolRegistry]" = weakref.WeakSet()
+_registries_lock = threading.Lock()
+
+
+def run(coro: Coroutine) -> Any:
+    """
+    在当前线程的常驻事件循环中执行协程（替代 asyncio.run），
+    使连接池能在同一线程的多次执行之间保持
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+    return loop.run_until_complete(coro)
+
+
+def get_registry() -> HostPoolRegistry:
+    """获取当前线程的连接池集合，需在 run() 驱动的事件循环内调用"""
+    registry = getattr(_local, "registry", None)
+    if registry is None:
+        registry = HostPoolRegistry()
+        _local.registry = registry
+        with _registries_lock:
+            _registries.add(registry)
+    return registry
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    为一次执行创建客户端：连接池共享，Cookie 容器独立，执行之间互不影响
+    """
+    return httpx.AsyncClient(transport=RoutingTransport(get_registry()))
+
+
+async def prewarm(urls: Iterable[str]):
+    """
+    执行前并发预热目标主机：先解析并缓存 DNS；
+    开启 HTTP_PREWARM_CONNECTIONS 时，还会对尚未建立连接池的主机发送 HEAD 请求以提前完成 TCP / TLS 握手
+    （这是用例之外的请求，默认关闭；失败忽略）
+    """
+    registry = get_registry()
+    origins: Dict[Origin, str] = {}
+    for url in urls:
+        if not url or "{{" in url:
+            continue
+        try:
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                continue
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+        except ValueError:
+            continue
+        origins.setdefault((parts.scheme, parts.hostname, port), f"{parts.scheme}://{parts.netloc}/")
+
+    async def warm(origin: Origin, root_url: str):
+        try:
+            await dns_cache.resolve(origin[1], origin[2], timeout=5)
+            if HTTP_PREWARM_CONNECTIONS and not registry.has_origin(origin):
+                transport = registry.get_transport(origin)
+                response = await transport.handle_async_request(
+                    httpx.Request("HEAD", root_url, extensions={"timeout": {"connect": 5, "read": 5, "write": 5, "pool": 5}})
+                )
+                await response.aclose()
+        except Exception as e:
+            print(f"  ⚠️ 预热 {root_url} 失败: {e}")
+
+    if origins:
+        await asyncio.gather(*(warm(origin, root_url) for origin, root_url in origins.items()))
+
+
+def close_local():
+    """关闭当前线程的连接池与事件循环，由长期运行的执行线程退出前调用"""
+    loop = getattr(_local, "loop", None)
+    registry = getattr(_local, "registry", None)
+    if loop is None or loop.is_closed():
+        return
+    if registry is not None:
+        loop.run_until_complete(registry.aclose())
+        _local.registry = None
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+    _local.loop = None
+
+
+def stats() -> Dict[str, Any]:
+    with _registries_lock:
+        pools = [registry.stats() for registry in _registries]
+    return {
+        "http2_enabled": HTTP2_ENABLED,
+        "http2_available": HTTP2_AVAILABLE,
+        "dns_cache": dns_cache.stats(),
+        "pools": pools,
+    }
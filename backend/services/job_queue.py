@@ -0,0 +1,357 @@
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from core.config import (
+    JOB_WORKERS, JOB_POLL_INTERVAL, JOB_HEARTBEAT_INTERVAL, JOB_LEASE_TIMEOUT, RETENTION_MAX_REPORTS
+)
+from core.database import SessionLocal
+from crud import crud_test_job, crud_test_report
+from services import case_import, data_transfer, http_pool, retention
+from services.run_events import event_bus
+from schemas import test_job as job_schema, test_report as report_schema
+
+
+class JobQueue:
+    """
+    基于数据库的套件执行任务队列
+
+    任务持久化在 test_jobs 表中，HTTP 请求只负责入队并立即返回；
+    固定数量的后台线程从表中领取任务执行，进程重启后排队中的任务不会丢失
+    多个进程（--workers N、滚动重启）可以同时消费同一个队列：领取的任务带有进程标识和心跳租约，
+    只有租约过期（持有进程已退出）的任务才会被重新排队
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL,
+                 heartbeat_interval: float = JOB_HEARTBEAT_INTERVAL, lease_timeout: float = JOB_LEASE_TIMEOUT):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_timeout = lease_timeout
+        self.owner_id: Optional[str] = None
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        # 本进程内正在执行的任务 -> 取消信号
+        self._running: Dict[int, threading.Event] = {}
+        # 本进程内正在执行的任务 -> 租约丢失信号（任务已被其他进程接管）
+        self._lost: Dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop_event.clear()
+        # 进程标识在启动时生成，fork 出的子进程各自持有不同的标识
+        self.owner_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._recover()
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        monitor = threading.Thread(target=self._monitor_loop, name="job-monitor", daemon=True)
+        monitor.start()
+        self._threads.append(monitor)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        with self._lock:
+            for cancel_event in self._running.values():
+                cancel_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def submit_suite(self, db: Session, suite, mode: str = "async", workers: Optional[int] = None) -> job_schema.TestJob:
+        """
+        提交套件执行任务，报告会立即创建（状态 queued），以便调用方马上拿到 report_id
+        mode: async 在任务线程内并发执行；process 按顶层条目分片后用多进程执行
+        """
+        report = crud_test_report.create_test_report(db, report_schema.TestReportCreate(
+            suite_id=suite.id,
+            suite_name=suite.name,
+            status="queued"
+        ))
+        payload = {"mode": mode, "workers": workers} if mode == "process" else None
+        return self._submit(db, job_schema.TestJobCreate(
+            job_type="suite", suite_id=suite.id, payload=payload, report_id=report.id
+        ))
+
+    def submit_cases(self, db: Session, test_case_ids: List[int]) -> job_schema.TestJob:
+        """提交按用例ID列表执行的任务"""
+        report = crud_test_report.create_test_report(db, report_schema.TestReportCreate(
+            suite_name=f"批量执行 ({len(test_case_ids)} 个用例)",
+            status="queued"
+        ))
+        return self._submit(db, job_schema.TestJobCreate(
+            job_type="cases", payload={"test_case_ids": test_case_ids}, report_id=report.id
+        ))
+
+    def submit_rerun(self, db: Session, source_report) -> job_schema.TestJob:
+        """
+        提交“重跑失败用例”任务：新建一份 run_type 为 rerun、parent_report_id 指向原报告的子报告
+        原报告仍在执行、已归档或没有失败记录时抛出 ValueError
+        """
+        if source_report.status in ("queued", "running"):
+            raise ValueError("The report is still running.")
+        if source_report.archive_path is not None:
+            raise ValueError("The report is archived, restore it before rerunning failures.")
+        if not (source_report.fail_count or source_report.error_count):
+            raise ValueError("The report has no failed records to rerun.")
+        report = crud_test_report.create_test_report(db, report_schema.TestReportCreate(
+            suite_id=source_report.suite_id,
+            suite_name=f"{source_report.suite_name or ''} (重跑失败用例)",
+            status="queued",
+            run_type="rerun",
+            parent_report_id=source_report.id
+        ))
+        return self._submit(db, job_schema.TestJobCreate(
+            job_type="rerun", suite_id=source_report.suite_id,
+            payload={"source_report_id": source_report.id}, report_id=report.id
+        ))
+
+    def submit_load(self, db: Session, load: job_schema.LoadTestCreate, suite_name: str) -> job_schema.TestJob:
+        """提交压测任务，报告的 run_type 为 load，结果汇总在 load_summary 中"""
+        report = crud_test_report.create_test_report(db, report_schema.TestReportCreate(
+            suite_id=load.suite_id,
+            suite_name=suite_name,
+            status="queued",
+            run_type="load"
+        ))
+        return self._submit(db, job_schema.TestJobCreate(
+            job_type="load", suite_id=load.suite_id, payload=load.model_dump(), report_id=report.id
+        ))
+
+    def submit_import(self, db: Session, path: str, import_format: str, module_id: Optional[int] = None,
+                      base_url: Optional[str] = None, file_name: Optional[str] = None) -> job_schema.TestJob:
+        """提交用例导入任务，path 为已保存的上传文件，导入进度写入任务的 progress"""
+        return self._submit(db, job_schema.TestJobCreate(job_type="import", payload={
+            "path": path, "format": import_format, "module_id": module_id,
+            "base_url": base_url, "file_name": file_name
+        }))
+
+    def submit_ndjson_import(self, db: Session, path: str, same_database: bool = False) -> job_schema.TestJob:
+        """
+        提交 NDJSON 数据导入任务（/export 导出的备份或其他环境的数据）
+        same_database: 文件导出自本库，文件之外的引用按ID关联本库中的对象
+        """
+        return self._submit(db, job_schema.TestJobCreate(
+            job_type="ndjson_import", payload={"path": path, "same_database": same_database}
+        ))
+
+    def submit_retention(self, db: Session, max_reports: Optional[int] = None) -> job_schema.TestJob:
+        """提交一轮保留策略（归档过期报告的执行记录）；已有排队或执行中的保留任务时直接返回该任务"""
+        db_job = crud_test_job.get_active_job(db, "retention")
+        if db_job is not None:
+            return db_job
+        payload = {"max_reports": max_reports} if max_reports else None
+        return self._submit(db, job_schema.TestJobCreate(job_type="retention", payload=payload))
+
+    def cancel(self, db: Session, job_id: int):
+        db_job = crud_test_job.request_cancel(db, job_id)
+        if db_job is None:
+            return None
+        if db_job.status == "cancelled" and db_job.report_id:
+            crud_test_report.update_test_report(db, db_job.report_id, report_schema.TestReportUpdate(status="cancelled"))
+            event_bus.publish(db_job.report_id, "suite_finished", status="cancelled")
+        with self._lock:
+            cancel_event = self._running.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+        return db_job
+
+    def _submit(self, db: Session, job: job_schema.TestJobCreate):
+        db_job = crud_test_job.create_test_job(db, job)
+        self._wakeup.set()
+        return db_job
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            db = SessionLocal()
+            try:
+                db_job = crud_test_job.claim_next_job(db, self.owner_id)
+                if db_job is None:
+                    db.close()
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._execute(db, db_job)
+            except Exception as e:
+                print(f"❌ 任务队列异常: {e}")
+                traceback.print_exc()
+                self._stop_event.wait(self.poll_interval)
+            finally:
+                db.close()
+        # 线程退出前释放本线程持有的连接池
+        http_pool.close_local()
+
+    def _recover(self):
+        """
+        重新排队租约过期的任务（持有进程已退出），并把没有对应任务的报告标记为 error
+        启动时执行一次，之后每个租约周期执行一次，以便接管运行中退出的其他进程的任务
+        """
+        db = SessionLocal()
+        try:
+            requeued = crud_test_job.requeue_interrupted_jobs(db, self.lease_timeout)
+            if requeued:
+                print(f"♻️ 重新排队 {requeued} 个租约过期的任务")
+                self._wakeup.set()
+            orphaned = crud_test_job.fail_orphaned_reports(db, self.lease_timeout)
+            if orphaned:
+                print(f"⚠️ {orphaned} 个报告没有对应的任务，标记为 error")
+        except Exception as e:
+            print(f"❌ 回收中断任务失败: {e}")
+        finally:
+            db.close()
+
+    def _monitor_loop(self):
+        """
+        定期同步数据库中的取消标记，使其他进程发出的取消请求也能生效；
+        按心跳间隔续期本进程持有的任务租约，按租约周期回收其他进程遗留的任务
+        """
+        last_heartbeat = last_recovery = time.monotonic()
+        while not self._stop_event.wait(self.poll_interval):
+            with self._lock:
+                running_ids = list(self._running.keys())
+            now = time.monotonic()
+            if now - last_recovery >= self.lease_timeout:
+                last_recovery = now
+                self._recover()
+            if not running_ids:
+                continue
+            db = SessionLocal()
+            try:
+                cancel_ids = crud_test_job.get_cancel_requested_ids(db, running_ids)
+                if now - last_heartbeat >= self.heartbeat_interval:
+                    last_heartbeat = now
+                    held_ids = crud_test_job.renew_job_leases(db, self.owner_id, running_ids)
+                    lost_ids = [job_id for job_id in running_ids if job_id not in held_ids]
+                    for job_id in lost_ids:
+                        with self._lock:
+                            lost_event = self._lost.get(job_id)
+                        # 快照之后已经执行结束的任务不在 _lost 中
+                        if lost_event is not None and not lost_event.is_set():
+                            print(f"⚠️ 任务 #{job_id} 的租约已被其他进程接管，停止执行")
+                            lost_event.set()
+                    cancel_ids = set(cancel_ids) | set(lost_ids)
+                for job_id in cancel_ids:
+                    with self._lock:
+                        cancel_event = self._running.get(job_id)
+                    if cancel_event is not None:
+                        cancel_event.set()
+            except Exception as e:
+                print(f"❌ 同步任务状态失败: {e}")
+            finally:
+                db.close()
+
+    @staticmethod
+    def _resumable(db_job) -> bool:
+        """单进程内执行的套件、用例列表与重跑任务支持断点续跑；多进程分片与压测从头执行"""
+        if db_job.job_type == "suite":
+            return (db_job.payload or {}).get("mode") != "process"
+        return db_job.job_type in ("cases", "rerun")
+
+    def _execute(self, db: Session, db_job):
+        # 延迟导入，避免 services 之间的循环引用
+        from services.test_runner import TestRunner
+        from services.load_runner import LoadTestRunner
+
+        cancel_event = threading.Event()
+        if db_job.cancel_requested:
+            cancel_event.set()
+        lost_event = threading.Event()
+        with self._lock:
+            self._running[db_job.id] = cancel_event
+            self._lost[db_job.id] = lost_event
+
+        print(f"▶️ 开始执行任务 #{db_job.id} ({db_job.job_type})")
+        runner = None
+        try:
+            if db_job.job_type == "load":
+                runner = LoadTestRunner(db=db, cancel_event=cancel_event)
+            elif db_job.job_type in ("suite", "cases", "rerun"):
+                runner = TestRunner(db=db, cancel_event=cancel_event)
+            if runner is not None:
+                runner.lease_lost = lost_event
+            if db_job.report_id:
+                report = crud_test_report.get_test_report_summary(db, db_job.report_id)
+                if report is not None and report.checkpoint and self._resumable(db_job):
+                    # 被中断的执行从断点继续，由 TestRunner 核对并清理断点之后的残留记录
+                    runner.resume = True
+                    print(f"⏯️ 任务 #{db_job.id} 从断点继续执行（已完成 {report.checkpoint.get('position', 0)} 步）")
+                else:
+                    # 没有断点（或不支持续跑）的任务从头执行，先清掉上次残留的记录
+                    crud_test_report.delete_test_records(db, db_job.report_id)
+
+            payload = db_job.payload or {}
+            if db_job.job_type == "suite":
+                if payload.get("mode") == "process":
+                    results, report_id = runner.run_full_suite_sharded(
+                        db_job.suite_id, report_id=db_job.report_id, workers=payload.get("workers")
+                    )
+                else:
+                    results, report_id = runner.run_full_suite(db_job.suite_id, report_id=db_job.report_id)
+                if report_id is None:
+                    raise ValueError(results[0].response)
+            elif db_job.job_type == "cases":
+                runner.run_test_suite(payload.get("test_case_ids", []), report_id=db_job.report_id)
+            elif db_job.job_type == "rerun":
+                runner.rerun_failed(payload["source_report_id"], db_job.report_id)
+            elif db_job.job_type == "load":
+                runner.run_load(db_job.report_id, **payload)
+            elif db_job.job_type == "import":
+                # 导入任务不执行用例；被中断后重新执行时按 method + url 去重，只补齐未写入的部分
+                case_import.run_import_job(db, db_job, cancel_event=cancel_event)
+            elif db_job.job_type == "ndjson_import":
+                data_transfer.run_import_job(db, db_job, cancel_event=cancel_event)
+            elif db_job.job_type == "retention":
+                job_id = db_job.id
+                stats = retention.run_retention(
+                    db, max_reports=payload.get("max_reports") or RETENTION_MAX_REPORTS, cancel_event=cancel_event,
+                    on_progress=lambda progress: crud_test_job.update_job_progress(db, job_id, progress)
+                )
+                crud_test_job.update_job_progress(db, job_id, stats)
+            else:
+                raise ValueError(f"Unknown job type: {db_job.job_type}")
+
+            status = "cancelled" if cancel_event.is_set() else "completed"
+            crud_test_job.finish_test_job(db, db_job.id, status, owner_id=self.owner_id)
+        except Exception as e:
+            db.rollback()
+            print(f"❌ 任务 #{db_job.id} 执行失败: {e}")
+            crud_test_job.finish_test_job(db, db_job.id, "failed", error_message=str(e), owner_id=self.owner_id)
+            if db_job.report_id and not lost_event.is_set():
+                crud_test_report.update_test_report(db, db_job.report_id, report_schema.TestReportUpdate(
+                    status="error", end_time=datetime.now()
+                ))
+                event_bus.publish(db_job.report_id, "suite_finished", status="error", error_message=str(e))
+        finally:
+            if runner is not None:
+                runner.close()
+            with self._lock:
+                self._running.pop(db_job.id, None)
+                self._lost.pop(db_job.id, None)
+
+
+# 进程级单例，由 main.py 在应用启动/关闭时管理
+job_queue = JobQueue()
@@ -0,0 +1,57 @@
+from typing import Any, Dict, Iterable, List
+from jsonpath_ng import parse
+
+from core.config import JSONPATH_CACHE_SIZE
+from services.cache import LRUCache
+
+# 进程级的 JSONPath 编译结果缓存，提取与断言共用
+_cache = LRUCache(max_size=JSONPATH_CACHE_SIZE)
+
+
+def compile_path(json_path: str):
+    """
+    获取编译后的 JSONPath 表达式，相同路径只解析一次
+    解析失败时抛出异常，且不会写入缓存
+    """
+    return _cache.get_or_create(json_path, lambda: parse(json_path))
+
+
+def find_values(json_path: str, data: Any) -> List[Any]:
+    return [match.value for match in compile_path(json_path).find(data)]
+
+
+def collect_case_paths(test_case: Any) -> List[str]:
+    """收集用例中 extract_rules 与 json.xxx 断言使用到的全部 JSONPath"""
+    paths = list((test_case.extract_rules or {}).values())
+    for assertion in test_case.assertions or []:
+        check = assertion.get("check")
+        if check and check.startswith("json."):
+            paths.append(check[5:])
+    return paths
+
+
+def warm_up(test_cases: Iterable[Any]) -> int:
+    """
+    在执行前预编译套件中出现的所有 JSONPath，返回本次新编译的数量
+    非法路径会被跳过，执行时再按原逻辑报告错误
+    """
+    compiled = 0
+    for test_case in test_cases:
+        if test_case is None:
+            continue
+        for json_path in collect_case_paths(test_case):
+            misses = _cache.misses
+            try:
+                compile_path(json_path)
+            except Exception:
+                continue
+            compiled += _cache.misses - misses
+    return compiled
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,115 @@
+import math
+from typing import Any, Dict, Optional
+
+# 每个数量级（2 的幂区间）划分的子桶数，决定相对精度：256 个子桶约为 0.8% 以内的误差
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + ((value >> shift) - SUB_BUCKET_HALF)
+
+
+def _bucket_upper_bound(index: int) -> int:
+    """桶内可能出现的最大值（按 HDR 的惯例，分位数返回桶的上界）"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    top = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    HDR 风格的对数-线性延迟直方图，以微秒为单位记录
+
+    每个 2 的幂区间再等分为固定数量的子桶，内存占用与样本数无关，
+    相对误差有上界；桶计数稀疏存储，多个直方图可以直接合并
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def record(self, seconds: float):
+        """记录一个以秒为单位的耗时"""
+        self.record_micros(max(0, int(seconds * 1_000_000)))
+
+    def record_micros(self, value: int, count: int = 1):
+        index = _bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def percentile(self, percent: float) -> int:
+        """返回第 percent 百分位的耗时（微秒）"""
+        if self.count == 0:
+            return 0
+        target = max(1, math.ceil(self.count * percent / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(_bucket_upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """以毫秒为单位的统计摘要"""
+        def ms(value: Optional[float]) -> float:
+            return round((value or 0) / 1000.0, 3)
+
+        return {
+            "count": self.count,
+            "min": ms(self.min),
+            "mean": ms(self.total / self.count if self.count else 0),
+            "p50": ms(self.percentile(50)),
+            "p90": ms(self.percentile(90)),
+            "p99": ms(self.percentile(99)),
+            "max": ms(self.max),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为可存入 JSON 列的结构（桶计数以字符串为键）"""
+        return {
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "LatencyHistogram":
+        histogram = cls()
+        if not data:
+            return histogram
+        histogram.counts = {int(index): count for index, count in (data.get("counts") or {}).items()}
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0)
+        histogram.min = data.get("min")
+        histogram.max = data.get("max")
+        return histogram
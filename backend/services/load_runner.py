@@ -0,0 +1,231 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from crud import crud_test_case, crud_test_report
+from schemas import test_report as report_schema
+from services import execution_plan, http_pool, jsonpath_cache
+from services.latency_histogram import LatencyHistogram
+from services.run_events import event_bus
+from services.test_runner import TestRunner
+
+# 报告中保留的不同错误信息条数
+MAX_ERROR_KINDS = 10
+# 落后于计划超过该时长（秒）的发送时刻直接跳过，避免追赶时瞬间突发
+MAX_PACER_LAG = 1.0
+
+
+class RatePacer:
+    """
+    按目标 RPS 均匀分配发送时刻（开放模型），所有虚拟用户共享
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self.next_at = time.perf_counter()
+        self.missed = 0
+
+    async def wait(self):
+        now = time.perf_counter()
+        if now - self.next_at > MAX_PACER_LAG:
+            # 并发不足导致严重落后：放弃错过的时刻，从当前时间重新计时
+            self.missed += int((now - self.next_at) / self.interval)
+            self.next_at = now
+        slot = self.next_at
+        self.next_at += self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class LoadStats:
+    """压测过程中的累计统计：整体与各用例的延迟直方图、结果计数、错误分布"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.case_histograms: Dict[int, LatencyHistogram] = {}
+        self.case_counts: Dict[int, Counter] = {}
+        self.counts: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def record(self, test_case, status: str, seconds: float, error: Optional[str] = None):
+        self.histogram.record(seconds)
+        self.case_histograms.setdefault(test_case.id, LatencyHistogram()).record(seconds)
+        self.counts[status] += 1
+        self.case_counts.setdefault(test_case.id, Counter())[status] += 1
+        if error:
+            self.errors[error[:200]] += 1
+
+    @property
+    def requests(self) -> int:
+        return self.histogram.count
+
+
+class LoadTestRunner(TestRunner):
+    """
+    压测模式：以固定并发或目标 RPS 在指定时长内反复执行用例（或套件展开后的用例序列）
+
+    每个虚拟用户持有独立的变量与 Cookie，按顺序循环执行整个用例序列，
+    变量替换、提取与断言与功能执行完全一致；不逐请求写 TestRecord，
+    只把延迟分布、吞吐量与错误统计汇总写入报告的 load_summary
+    """
+
+    def __init__(self, db, cancel_event=None):
+        super().__init__(db, cancel_event=cancel_event, verbose=False)
+
+    def collect_cases(self, test_case_ids: Optional[List[int]] = None, suite_id: Optional[int] = None) -> List[Any]:
+        """按用例ID列表或套件（含模块、子套件）展开出压测的用例序列"""
+        if suite_id is not None:
+            plan = execution_plan.get_plan(self.db, suite_id)
+            if plan is None:
+                raise ValueError(f"Test suite with id {suite_id} not found.")
+            return plan.cases()
+
+        cases = []
+        for case_id in test_case_ids or []:
+            db_case = crud_test_case.get_test_case(self.db, test_case_id=case_id)
+            if not db_case:
+                raise ValueError(f"Test case with id {case_id} not found.")
+            cases.append(db_case)
+        return cases
+
+    def run_load(self, report_id: int, test_case_ids: Optional[List[int]] = None, suite_id: Optional[int] = None,
+                 duration: float = 30.0, concurrency: int = 10, target_rps: Optional[float] = None) -> Dict[str, Any]:
+        """
+        执行压测并把汇总写入报告，返回 load_summary
+        target_rps 为空时以 concurrency 个虚拟用户全速执行；否则按目标 RPS 发送，concurrency 为最大在途请求数
+        """
+        self._start_report(report_id)
+        cases = self.collect_cases(test_case_ids, suite_id)
+        if not cases:
+            raise ValueError("No test cases to run.")
+        jsonpath_cache.warm_up(cases)
+
+        mode = "rps" if target_rps else "concurrency"
+        print(f"🔥 开始压测: {len(cases)} 个用例, 模式 {mode}, 并发 {concurrency}, "
+              f"目标 RPS {target_rps or '-'}, 时长 {duration}s")
+        started_at = time.perf_counter()
+        stats, missed = http_pool.run(self._run_load_async(report_id, cases, duration, concurrency, target_rps))
+        elapsed = time.perf_counter() - started_at
+
+        summary = self._build_summary(stats, cases, mode, duration, concurrency, target_rps, elapsed, missed)
+        self._finalize_load_report(report_id, stats, summary, elapsed)
+        print(f"🏁 压测结束: {stats.requests} 个请求, 吞吐 {summary['throughput']} req/s, "
+              f"p99 {summary['latency']['p99']} ms")
+        return summary
+
+    async def _run_load_async(self, report_id: int, cases: List[Any], duration: float,
+                              concurrency: int, target_rps: Optional[float]):
+        stats = LoadStats()
+        deadline = time.perf_counter() + duration
+        pacer = RatePacer(target_rps) if target_rps else None
+
+        def should_stop() -> bool:
+            return self.cancel_event.is_set() or time.perf_counter() >= deadline
+
+        async def virtual_user():
+            # 每个虚拟用户使用独立的 TestRunner 保存变量，独立的客户端保存 Cookie
+            user = TestRunner(self.db, verbose=False)
+            # 压测不保存响应体，超过内存上限的部分直接丢弃
+            user.spill_large_bodies = False
+            async with http_pool.create_client() as client:
+                while not should_stop():
+                    for test_case in cases:
+                        if pacer is not None:
+                            await pacer.wait()
+                        if should_stop():
+                            return
+                        request_started = time.perf_counter()
+                        try:
+                            result = await user.run_test_case_async(test_case, client)
+                            status, error = result.status, result.error_message
+                        except Exception as e:
+                            status, error = "error", str(e)
+                        stats.record(test_case, status, time.perf_counter() - request_started, error)
+
+        async def reporter():
+            # 每秒推送一次进度，供报告页实时展示
+            last_count = 0
+            while not should_stop():
+                await asyncio.sleep(1.0)
+                count = stats.requests
+                event_bus.publish(report_id, "load_progress",
+                                  requests=count,
+                                  current_rps=count - last_count,
+                                  success=stats.counts["success"],
+                                  fail=stats.counts["fail"],
+                                  error=stats.counts["error"],
+                                  p50=round(stats.histogram.percentile(50) / 1000.0, 3),
+                                  p99=round(stats.histogram.percentile(99) / 1000.0, 3))
+                last_count = count
+
+        await http_pool.prewarm(self._prewarm_urls(cases))
+        progress = asyncio.ensure_future(reporter())
+        try:
+            await asyncio.gather(*(virtual_user() for _ in range(max(1, concurrency))))
+        finally:
+            progress.cancel()
+        return stats, (pacer.missed if pacer else 0)
+
+    def _build_summary(self, stats: LoadStats, cases: List[Any], mode: str, duration: float, concurrency: int,
+                       target_rps: Optional[float], elapsed: float, missed: int) -> Dict[str, Any]:
+        case_summaries = []
+        seen = set()
+        for test_case in cases:
+            if test_case.id in seen or test_case.id not in stats.case_histograms:
+                continue
+            seen.add(test_case.id)
+            counts = stats.case_counts[test_case.id]
+            case_summaries.append({
+                "id": test_case.id,
+                "name": test_case.name,
+                "requests": sum(counts.values()),
+                "success": counts["success"],
+                "fail": counts["fail"],
+                "error": counts["error"],
+                "latency": stats.case_histograms[test_case.id].summary(),
+            })
+        return {
+            "mode": mode,
+            "duration": duration,
+            "concurrency": concurrency,
+            "target_rps": target_rps,
+            "elapsed": round(elapsed, 3),
+            "requests": stats.requests,
+            "success": stats.counts["success"],
+            "fail": stats.counts["fail"],
+            "error": stats.counts["error"],
+            "throughput": round(stats.requests / elapsed, 2) if elapsed > 0 else 0,
+            "missed_slots": missed,
+            "latency": stats.histogram.summary(),
+            "histogram": stats.histogram.to_dict(),
+            "cases": case_summaries,
+            "errors": [{"message": message, "count": count} for message, count in stats.errors.most_common(MAX_ERROR_KINDS)],
+        }
+
+    def _finalize_load_report(self, report_id: int, stats: LoadStats, summary: Dict[str, Any], elapsed: float):
+        if self.lease_lost.is_set():
+            print(f"⚠️ 报告 #{report_id} 已由其他进程接管，跳过汇总")
+            return
+        if self.cancel_event.is_set():
+            status = "cancelled"
+        else:
+            status = "success" if stats.counts["fail"] == 0 and stats.counts["error"] == 0 else "failed"
+        crud_test_report.update_test_report(self.db, report_id, report_schema.TestReportUpdate(
+            end_time=datetime.now(),
+            duration=round(elapsed, 3),
+            total_cases=stats.requests,
+            pass_count=stats.counts["success"],
+            fail_count=stats.counts["fail"],
+            error_count=stats.counts["error"],
+            status=status,
+            load_summary=summary
+        ))
+        event_bus.publish(report_id, "suite_finished",
+                          status=status,
+                          total=stats.requests,
+                          pass_count=stats.counts["success"],
+                          fail_count=stats.counts["fail"],
+                          error_count=stats.counts["error"],
+                          throughput=summary["throughput"])
@@ -0,0 +1,91 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from core.config import PROCESS_POOL_WORKERS
+from core.database import SessionLocal
+from services.case_result import CaseResult
+from services.run_events import event_bus
+
+
+def build_shards(plan) -> List[Dict[str, Any]]:
+    """
+    按执行计划的顶层条目切分执行分片：每个 test_suite / test_module 条目单独成片，
+    相邻的 test_case 条目合并为一片，分片顺序与 sort_order 一致
+    """
+    shards: List[Dict[str, Any]] = []
+    pending_cases: List[int] = []
+    for item_id, item_type in plan.top_items:
+        if item_type == "test_case":
+            pending_cases.append(item_id)
+            continue
+        if pending_cases:
+            shards.append({"kind": "test_case", "item_ids": pending_cases})
+            pending_cases = []
+        shards.append({"kind": item_type, "item_ids": [item_id]})
+    if pending_cases:
+        shards.append({"kind": "test_case", "item_ids": pending_cases})
+    return shards
+
+
+def _run_shard(suite_id: int, item_ids: List[int], report_id: int, concurrency: Optional[int]) -> List[CaseResult]:
+    """
+    工作进程入口：使用独立的数据库会话和 HTTP 客户端执行一个分片，
+    执行记录由本进程直接写入报告，只把精简后的结果返回给主进程
+    """
+    # 延迟导入，子进程（spawn）只在真正执行时加载执行引擎
+    from services.test_runner import TestRunner
+
+    db = SessionLocal()
+    runner = TestRunner(db=db, concurrency=concurrency)
+    try:
+        # 记录已由本进程写入，只把释放了大字段的结果传回主进程
+        return [result.release() for result in runner.run_suite_items(suite_id, item_ids, report_id)]
+    finally:
+        runner.close()
+        db.close()
+
+
+def execute_shards(suite_id: int, shards: List[Dict[str, Any]], report_id: int, workers: Optional[int] = None,
+                   concurrency: Optional[int] = None, cancel_event=None) -> List[CaseResult]:
+    """
+    在进程池中执行全部分片，按分片顺序合并各进程返回的精简结果
+    各分片之间不共享变量，适用于顶层条目彼此独立的套件
+    """
+    workers = max(1, min(workers or PROCESS_POOL_WORKERS, len(shards) or 1))
+    print(f"  ⚙️ 共 {len(shards)} 个分片，使用 {workers} 个进程")
+
+    shard_results: List[Optional[List[CaseResult]]] = [None] * len(shards)
+    # 使用 spawn 启动工作进程，避免 fork 继承后台线程与数据库连接
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(_run_shard, suite_id, shard["item_ids"], report_id, concurrency): index
+            for index, shard in enumerate(shards)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                shard_results[index] = future.result()
+            except Exception as e:
+                shard_results[index] = [CaseResult(
+                    name=f"Error executing shard {index}",
+                    status="error",
+                    response=str(e)
+                )]
+            event_bus.publish(report_id, "shard_finished", index=index, total=len(shards),
+                              kind=shards[index]["kind"], case_count=len(shard_results[index]))
+            if cancel_event is not None and cancel_event.is_set():
+                # 已开始的分片会执行完，尚未开始的分片直接取消
+                for pending in futures:
+                    pending.cancel()
+
+    results: List[CaseResult] = []
+    for index, shard_result in enumerate(shard_results):
+        if shard_result is None:
+            results.append(CaseResult(name=f"Shard {index}", status="cancelled"))
+        else:
+            results.extend(shard_result)
+    return results
@@ -0,0 +1,64 @@
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from core.config import RECORD_BATCH_SIZE, RECORD_FLUSH_INTERVAL
+from crud import crud_test_report
+from schemas import test_report as report_schema
+
+
+class RecordSink:
+    """
+    TestRecord 的写后缓冲：执行记录先进入内存缓冲区，
+    达到 batch_size 条或距上次落库超过 flush_interval 秒时，以一条多行 INSERT 批量写入并提交一次
+
+    on_flush(metas) 在每批记录提交成功后调用，metas 为 add 时传入的附加信息
+    """
+
+    def __init__(self, db: Session, batch_size: int = RECORD_BATCH_SIZE, flush_interval: float = RECORD_FLUSH_INTERVAL,
+                 on_flush: Optional[Callable[[List[Any]], None]] = None):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.flushed_count = 0
+        self._buffer: List[Tuple[report_schema.TestRecordCreate, Any]] = []
+        self._last_flush = time.monotonic()
+
+    def add(self, record: report_schema.TestRecordCreate, meta: Any = None):
+        self._buffer.append((record, meta))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        records = [record for record, _ in batch]
+        try:
+            crud_test_report.bulk_create_test_records(self.db, records)
+            persisted = batch
+        except Exception as e:
+            self.db.rollback()
+            print(f"❌ 批量写入执行记录失败，改为逐条写入: {e}")
+            persisted = self._flush_one_by_one(batch)
+
+        self.flushed_count += len(persisted)
+        if self.on_flush is not None and persisted:
+            self.on_flush([meta for _, meta in persisted])
+
+    def _flush_one_by_one(self, batch):
+        # 批量写入失败时逐条重试，只丢弃真正有问题的记录
+        persisted = []
+        for record, meta in batch:
+            try:
+                crud_test_report.bulk_create_test_records(self.db, [record])
+                persisted.append((record, meta))
+            except Exception as e:
+                self.db.rollback()
+                print(f"❌ 记录测试结果失败: {e}")
+        return persisted
+
+    def __len__(self) -> int:
+        return len(self._buffer)
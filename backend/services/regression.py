@@ -0,0 +1,268 @@
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from core.config import (
+    REGRESSION_ALPHA,
+    REGRESSION_BASELINE_RUNS,
+    REGRESSION_MIN_DELTA_MS,
+    REGRESSION_MIN_SAMPLES,
+    REGRESSION_MIN_SLOWDOWN,
+    REGRESSION_SUMMARY_MAX_CASES,
+)
+from models.test_report import TestRecord, TestReport
+
+# 没有响应的执行（status=error，如连接失败、超时）耗时不代表接口延迟，不参与比较
+_LATENCY_STATUSES = ("success", "fail")
+# 两组样本合计不超过该数量且没有并列值时计算精确 p 值，否则使用带并列修正的正态近似
+_EXACT_MAX_SAMPLES = 50
+# 基线窗口只选正常结束的功能执行
+_FINISHED_STATUSES = ("success", "failed")
+
+VERDICTS = ("regression", "improvement", "unchanged", "insufficient_data", "new")
+
+
+# ------------------------------------------------------------------
+# Mann-Whitney U 检验
+# ------------------------------------------------------------------
+
+def _u_distribution(n1: int, n2: int) -> List[int]:
+    """
+    无并列时 U 统计量的精确分布（各取值的排列数），即高斯二项式系数 [n1+n2 choose n1]_q 的系数：
+    逐项乘以 (1 - q^(n2+i)) 再除以 (1 - q^i)
+    """
+    coeffs = [0] * (n1 * n2 + n1 + 1)
+    coeffs[0] = 1
+    for i in range(1, n1 + 1):
+        shift = n2 + i
+        for k in range(len(coeffs) - 1, shift - 1, -1):
+            coeffs[k] -= coeffs[k - shift]
+        for k in range(i, len(coeffs)):
+            coeffs[k] += coeffs[k - i]
+    return coeffs[:n1 * n2 + 1]
+
+
+def mann_whitney(baseline: Sequence[float], candidate: Sequence[float]) -> Tuple[float, float, float]:
+    """
+    比较两组样本，返回 (U, p_slower, p_faster)
+    U 为候选样本大于基线样本的配对数（并列计 0.5）；p_slower / p_faster 分别是
+    “候选整体更慢 / 更快”的单侧 p 值
+    """
+    n1, n2 = len(candidate), len(baseline)
+    combined = sorted([(value, 0) for value in candidate] + [(value, 1) for value in baseline])
+    rank_sum = 0.0
+    tie_term = 0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        # 并列值取平均秩
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+
+    if tie_term == 0 and n1 + n2 <= _EXACT_MAX_SAMPLES:
+        distribution = _u_distribution(n1, n2)
+        total = math.comb(n1 + n2, n1)
+        u_int = int(u)
+        return u, sum(distribution[u_int:]) / total, sum(distribution[:u_int + 1]) / total
+
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0, 1.0
+    sigma = math.sqrt(variance)
+    # 连续性修正
+    p_slower = 0.5 * math.erfc((u - mean - 0.5) / sigma / math.sqrt(2))
+    p_faster = 0.5 * math.erfc((mean - u - 0.5) / sigma / math.sqrt(2))
+    return u, min(1.0, p_slower), min(1.0, p_faster)
+
+
+# ------------------------------------------------------------------
+# 报告比较
+# ------------------------------------------------------------------
+
+def _percentile(values: List[float], percent: float) -> float:
+    """最近秩法分位数，values 已排序"""
+    index = max(0, math.ceil(len(values) * percent / 100.0) - 1)
+    return values[index]
+
+
+def _describe(values: List[float]) -> Dict[str, Any]:
+    """耗时分布摘要（毫秒），values 已排序、单位为秒"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values) * 1000, 3),
+        "p50": round(_percentile(values, 50) * 1000, 3),
+        "p90": round(_percentile(values, 90) * 1000, 3),
+        "max": round(values[-1] * 1000, 3),
+    }
+
+
+def _min_p_value(n1: int, n2: int) -> float:
+    """无并列时单侧 U 检验能得到的最小 p 值：候选样本全部排在一端的概率"""
+    return 1 / math.comb(n1 + n2, n1)
+
+
+def _tail_test(baseline: List[float], candidate: float) -> Tuple[float, float]:
+    """
+    单个候选值在基线分布中的位置，返回 (p_slower, p_faster)：
+    基线中不快于 / 不慢于候选值的比例（候选值本身计入，因此不会为 0）
+    """
+    n = len(baseline) + 1
+    return (sum(1 for value in baseline if value >= candidate) + 1) / n, \
+        (sum(1 for value in baseline if value <= candidate) + 1) / n
+
+
+def baseline_window(db: Session, report: TestReport, runs: int = REGRESSION_BASELINE_RUNS) -> List[int]:
+    """同一套件在 report 之前最近 runs 次正常结束且未归档的功能执行（按 ix_test_reports_suite_start_time 读取）"""
+    if report.suite_id is None or runs <= 0:
+        return []
+    query = select(TestReport.id).where(
+        TestReport.suite_id == report.suite_id,
+        TestReport.id != report.id,
+        TestReport.status.in_(_FINISHED_STATUSES),
+        TestReport.archive_path.is_(None),
+        or_(TestReport.run_type.is_(None), TestReport.run_type == "functional"),
+    )
+    if report.start_time is not None:
+        query = query.where(TestReport.start_time < report.start_time)
+    return list(db.execute(query.order_by(TestReport.start_time.desc(), TestReport.id.desc()).limit(runs)).scalars())
+
+
+def _load_samples(db: Session, report_ids: List[int]) -> Tuple[Dict[int, List[float]], Dict[int, Dict[str, int]], Dict[int, str]]:
+    """一次查询读出报告中每个用例的耗时样本、状态计数与名称"""
+    durations: Dict[int, List[float]] = defaultdict(list)
+    statuses: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    names: Dict[int, str] = {}
+    if not report_ids:
+        return durations, statuses, names
+    for case_id, case_name, status, duration in db.execute(
+        select(TestRecord.test_case_id, TestRecord.case_name, TestRecord.status, TestRecord.duration)
+        .where(TestRecord.report_id.in_(report_ids), TestRecord.test_case_id.isnot(None))
+    ):
+        statuses[case_id][status] += 1
+        names.setdefault(case_id, case_name)
+        if status in _LATENCY_STATUSES and duration is not None:
+            durations[case_id].append(duration)
+    return durations, statuses, names
+
+
+def compare_reports(db: Session, report_id: int, baseline_report_id: Optional[int] = None,
+                    baseline_runs: Optional[int] = None, alpha: float = REGRESSION_ALPHA,
+                    min_slowdown: float = REGRESSION_MIN_SLOWDOWN,
+                    min_delta_ms: float = REGRESSION_MIN_DELTA_MS) -> Dict[str, Any]:
+    """
+    按 test_case_id 匹配候选报告与基线的执行记录，逐个用例比较耗时分布
+    基线为 baseline_report_id 指定的报告，未指定时取同一套件之前最近 baseline_runs 次执行
+    判定为回归需同时满足：单侧 U 检验 p < alpha、中位数变慢至少 min_slowdown 且至少 min_delta_ms 毫秒；
+    改善的判定与之对称。候选样本太少、U 检验无论如何都达不到 alpha 时（如普通执行每个用例只有一个样本，
+    对 10 次基线的最小 p 值为 1/11），改为比较候选中位数是否超出基线 p99 至少 min_delta_ms（改善则低于基线 p1），
+    method 字段标明使用的方法。每一侧只有一次按 report_id 索引的查询，计算量与报告中的记录数成正比
+    """
+    report = db.get(TestReport, report_id)
+    if report is None:
+        raise ValueError(f"Test report {report_id} not found.")
+    if report.archive_path is not None:
+        raise ValueError(f"Test report {report_id} is archived, restore it before comparing.")
+    if baseline_report_id is not None:
+        baseline = db.get(TestReport, baseline_report_id)
+        if baseline is None:
+            raise ValueError(f"Baseline report {baseline_report_id} not found.")
+        if baseline.archive_path is not None:
+            raise ValueError(f"Baseline report {baseline_report_id} is archived, restore it before comparing.")
+        baseline_ids = [baseline_report_id]
+    else:
+        baseline_ids = baseline_window(db, report, REGRESSION_BASELINE_RUNS if baseline_runs is None else baseline_runs)
+
+    candidate_durations, candidate_statuses, names = _load_samples(db, [report_id])
+    baseline_durations, baseline_statuses, _ = _load_samples(db, baseline_ids)
+
+    cases = []
+    counts = {verdict: 0 for verdict in VERDICTS}
+    for case_id in candidate_statuses:
+        current = sorted(candidate_durations.get(case_id, []))
+        previous = sorted(baseline_durations.get(case_id, []))
+        base_status = baseline_statuses.get(case_id, {})
+        cand_status = candidate_statuses[case_id]
+        entry: Dict[str, Any] = {
+            "test_case_id": case_id,
+            "case_name": names.get(case_id),
+            "baseline": _describe(previous),
+            "candidate": _describe(current),
+            "p50_change": None,
+            "p_value": None,
+            "method": None,
+            # 基线中全部通过、本次出现失败或错误
+            "newly_failing": bool(base_status) and set(base_status) <= {"success"}
+                             and any(status != "success" for status in cand_status),
+        }
+        if not base_status:
+            verdict = "new"
+        elif len(previous) < REGRESSION_MIN_SAMPLES or not current:
+            verdict = "insufficient_data"
+        else:
+            base_p50, cand_p50 = _percentile(previous, 50), _percentile(current, 50)
+            delta_ms = (cand_p50 - base_p50) * 1000
+            change = (cand_p50 - base_p50) / base_p50 if base_p50 > 0 else None
+            entry["p50_change"] = round(change, 4) if change is not None else None
+            if _min_p_value(len(current), len(previous)) >= alpha:
+                entry["method"] = "percentile"
+                p_slower, p_faster = _tail_test(previous, cand_p50)
+                min_delta = min_delta_ms / 1000
+                slower = cand_p50 >= _percentile(previous, 99) + min_delta
+                faster = cand_p50 <= _percentile(previous, 1) - min_delta
+            else:
+                entry["method"] = "mann_whitney"
+                _, p_slower, p_faster = mann_whitney(previous, current)
+                slower = p_slower < alpha and delta_ms >= min_delta_ms
+                faster = p_faster < alpha and -delta_ms >= min_delta_ms
+            if slower and (change is None or change >= min_slowdown):
+                verdict, entry["p_value"] = "regression", round(p_slower, 6)
+            elif faster and (change is None or -change >= min_slowdown):
+                verdict, entry["p_value"] = "improvement", round(p_faster, 6)
+            else:
+                verdict, entry["p_value"] = "unchanged", round(min(p_slower, p_faster), 6)
+        entry["verdict"] = verdict
+        counts[verdict] += 1
+        cases.append(entry)
+
+    # 回归在前，按中位数变化从大到小
+    order = {verdict: index for index, verdict in enumerate(VERDICTS)}
+    cases.sort(key=lambda entry: (order[entry["verdict"]], -(entry["p50_change"] or 0)))
+    return {
+        "report_id": report_id,
+        "baseline_report_ids": baseline_ids,
+        "thresholds": {"alpha": alpha, "min_slowdown": min_slowdown, "min_delta_ms": min_delta_ms,
+                       "min_samples": REGRESSION_MIN_SAMPLES},
+        "counts": counts,
+        "newly_failing": sum(1 for entry in cases if entry["newly_failing"]),
+        "cases": cases,
+    }
+
+
+def summarize(comparison: Dict[str, Any]) -> Dict[str, Any]:
+    """存入报告 regression_summary 的精简结果：计数与最多 REGRESSION_SUMMARY_MAX_CASES 个回归用例"""
+    regressions = [entry for entry in comparison["cases"] if entry["verdict"] == "regression"]
+    return {
+        "baseline_report_ids": comparison["baseline_report_ids"],
+        "thresholds": comparison["thresholds"],
+        "counts": comparison["counts"],
+        "newly_failing": comparison["newly_failing"],
+        "regressions": [
+            {"test_case_id": entry["test_case_id"], "case_name": entry["case_name"],
+             "baseline_p50": entry["baseline"]["p50"], "candidate_p50": entry["candidate"]["p50"],
+             "p50_change": entry["p50_change"], "p_value": entry["p_value"]}
+            for entry in regressions[:REGRESSION_SUMMARY_MAX_CASES]
+        ],
+    }
@@ -0,0 +1,84 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# httpcore trace 事件（去掉 connection. / http11. / http2. 前缀）到网络阶段名的映射
+NETWORK_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "download",
+}
+
+# 输出顺序：网络侧阶段在前，执行引擎侧阶段在后
+PHASE_ORDER = ("queue", "connect", "tls", "send", "ttfb", "download",
+               "render", "parse", "extraction", "assertions", "persist")
+
+
+class RequestTimer:
+    """
+    记录单次用例执行的分阶段耗时（瀑布图）
+
+    网络阶段来自 httpcore 的 trace 扩展：连接池等待、TCP 连接（含 DNS 解析）、TLS 握手、
+    发送请求、首字节等待（TTFB）、响应体下载；执行引擎侧阶段（变量渲染、JSON 解析、
+    变量提取、断言、落库准备）通过 phase() 计时，用于区分“目标服务慢”和“执行引擎慢”
+    """
+
+    __slots__ = ("started_at", "sent_at", "first_event_at", "phases", "_open")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.sent_at: Optional[float] = None
+        self.first_event_at: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self._open: Dict[str, float] = {}
+
+    def request_sent(self):
+        """请求交给 HTTP 客户端的时刻，到第一个网络事件之间的时间计为连接池等待"""
+        self.sent_at = time.perf_counter()
+
+    def _add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def on_event(self, event_name: str):
+        now = time.perf_counter()
+        if self.first_event_at is None:
+            self.first_event_at = now
+        _, _, event = event_name.partition(".")
+        name, _, stage = event.rpartition(".")
+        phase = NETWORK_PHASES.get(name)
+        if phase is None:
+            return
+        if stage == "started":
+            self._open[name] = now
+        elif stage in ("complete", "failed"):
+            started = self._open.pop(name, None)
+            if started is not None:
+                self._add(phase, now - started)
+
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        """异步客户端使用的 trace 回调"""
+        self.on_event(event_name)
+
+    def trace_sync(self, event_name: str, info: Dict[str, Any]):
+        """同步客户端使用的 trace 回调"""
+        self.on_event(event_name)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - started)
+
+    def to_dict(self) -> Dict[str, float]:
+        """各阶段耗时（毫秒），total 为从开始计时到调用时的总耗时"""
+        phases = dict(self.phases)
+        if self.sent_at is not None and self.first_event_at is not None:
+            phases["queue"] = max(0.0, self.first_event_at - self.sent_at)
+        timings = {name: round(phases[name] * 1000, 3) for name in PHASE_ORDER if name in phases}
+        timings["total"] = round((time.perf_counter() - self.started_at) * 1000, 3)
+        return timings
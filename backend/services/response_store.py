@@ -0,0 +1,191 @@
+import codecs
+import gzip
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from core.config import RECORD_BODY_INLINE_LIMIT, RESPONSE_MAX_IN_MEMORY_BYTES, RESPONSE_SPILL_DIR
+
+# 截断后附加在内联响应体末尾的标记
+TRUNCATION_MARKER = "\n...[truncated, {size} bytes total]"
+# 读取落盘文件时每次返回的字节数
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class CapturedBody:
+    """
+    读取后的响应体：complete 为 False 时 text 只是前 RESPONSE_MAX_IN_MEMORY_BYTES 字节，
+    完整内容（若已落盘）位于 spill_path
+    """
+    text: str
+    size: int
+    complete: bool = True
+    spill_path: Optional[str] = None
+
+
+class _BodyCollector:
+    """按块累积响应体，超过内存上限后把后续内容流式写入 gzip 文件"""
+
+    def __init__(self, encoding: Optional[str], spill: bool):
+        self.encoding = encoding or "utf-8"
+        try:
+            codecs.lookup(self.encoding)
+        except LookupError:
+            self.encoding = "utf-8"
+        self.spill = spill
+        self.limit = RESPONSE_MAX_IN_MEMORY_BYTES
+        self.size = 0
+        self.chunks: List[bytes] = []
+        self.buffered = 0
+        self.overflowed = False
+        self.spill_path: Optional[str] = None
+        self._file = None
+        # 落盘文件统一转为 UTF-8，读取时无需再关心原始编码
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+
+    def _write(self, chunk: bytes, final: bool = False):
+        self._file.write(self._decoder.decode(chunk, final).encode("utf-8"))
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        if self._file is not None:
+            self._write(chunk)
+            return
+        if self.overflowed:
+            return
+        self.chunks.append(chunk)
+        self.buffered += len(chunk)
+        if self.buffered > self.limit:
+            self.overflowed = True
+            if self.spill:
+                self.spill_path, self._file = _open_spill_file()
+                for buffered_chunk in self.chunks:
+                    self._write(buffered_chunk)
+            # 内存中只保留前 limit 字节
+            head = b"".join(self.chunks)[:self.limit]
+            self.chunks = [head]
+            self.buffered = len(head)
+
+    def finish(self) -> CapturedBody:
+        if self._file is not None:
+            self._write(b"", final=True)
+            self._file.close()
+            self._file = None
+        text = b"".join(self.chunks).decode(self.encoding, errors="replace")
+        return CapturedBody(text=text, size=self.size, complete=not self.overflowed, spill_path=self.spill_path)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            delete_spilled([self.spill_path])
+
+
+async def capture_async(response, spill: bool = True) -> CapturedBody:
+    """从 client.stream() 返回的响应中按块读取响应体，内存占用不超过上限"""
+    collector = _BodyCollector(response.encoding, spill)
+    try:
+        async for chunk in response.aiter_bytes():
+            collector.feed(chunk)
+    except BaseException:
+        collector.abort()
+        raise
+    return collector.finish()
+
+
+def capture(response, spill: bool = True) -> CapturedBody:
+    """capture_async 的同步版本"""
+    collector = _BodyCollector(response.encoding, spill)
+    try:
+        for chunk in response.iter_bytes():
+            collector.feed(chunk)
+    except BaseException:
+        collector.abort()
+        raise
+    return collector.finish()
+
+
+def _open_spill_file():
+    # 按日期分目录，数据库中保存相对于 RESPONSE_SPILL_DIR 的路径
+    relative_path = os.path.join(datetime.now().strftime("%Y%m%d"), f"{uuid.uuid4().hex}.gz")
+    absolute_path = os.path.join(RESPONSE_SPILL_DIR, relative_path)
+    os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+    return relative_path, gzip.open(absolute_path, "wb", compresslevel=6)
+
+
+def _truncate(text: str, size: int) -> str:
+    return text[:RECORD_BODY_INLINE_LIMIT] + TRUNCATION_MARKER.format(size=size)
+
+
+def prepare_for_record(body: Optional[CapturedBody]) -> Tuple[str, Optional[str], Optional[int]]:
+    """
+    生成写入 TestRecord 的响应体：返回 (内联文本, 落盘路径, 原始字节数)
+    超过 RECORD_BODY_INLINE_LIMIT 的响应体内联部分被截断，完整内容压缩落盘
+    """
+    if body is None:
+        return "", None, None
+    if body.spill_path is not None:
+        return _truncate(body.text, body.size), body.spill_path, body.size
+    if len(body.text) > RECORD_BODY_INLINE_LIMIT:
+        relative_path, spill_file = _open_spill_file()
+        with spill_file:
+            spill_file.write(body.text.encode("utf-8"))
+        return _truncate(body.text, body.size), relative_path, body.size
+    return body.text, None, body.size
+
+
+def _resolve(relative_path: str) -> str:
+    base = os.path.realpath(RESPONSE_SPILL_DIR)
+    absolute_path = os.path.realpath(os.path.join(base, relative_path))
+    if os.path.commonpath([base, absolute_path]) != base:
+        raise ValueError(f"Invalid spill path: {relative_path}")
+    return absolute_path
+
+
+def iter_spilled(relative_path: str) -> Iterator[bytes]:
+    """按块读取落盘的完整响应体（解压后，UTF-8 编码）"""
+    with gzip.open(_resolve(relative_path), "rb") as spill_file:
+        while True:
+            chunk = spill_file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def spilled_file(relative_path: str) -> str:
+    """落盘文件的绝对路径（gzip 压缩），用于原样复制到归档中"""
+    return _resolve(relative_path)
+
+
+def restore_spilled(relative_path: str, source) -> str:
+    """把归档中的落盘文件（gzip 原样内容，source 为可读的文件对象）写回 relative_path，返回绝对路径"""
+    absolute_path = _resolve(relative_path)
+    os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+    with open(absolute_path, "wb") as target:
+        shutil.copyfileobj(source, target, READ_CHUNK_SIZE)
+    return absolute_path
+
+
+def spilled_exists(relative_path: str) -> bool:
+    try:
+        return os.path.exists(_resolve(relative_path))
+    except ValueError:
+        return False
+
+
+def delete_spilled(relative_paths: List[Optional[str]]) -> int:
+    """删除落盘文件，文件不存在时忽略"""
+    deleted = 0
+    for relative_path in relative_paths:
+        if not relative_path:
+            continue
+        try:
+            os.remove(_resolve(relative_path))
+            deleted += 1
+        except (OSError, ValueError):
+            pass
+    return deleted
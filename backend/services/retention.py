@@ -0,0 +1,449 @@
+import gzip
+import os
+import tarfile
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from core.config import (
+    ARCHIVE_DIR,
+    IMPORT_CHUNK_SIZE,
+    RECORD_PARTITION_REPORTS,
+    RETENTION_INTERVAL,
+    RETENTION_KEEP_DAYS,
+    RETENTION_KEEP_RUNS,
+    RETENTION_MAX_REPORTS,
+)
+from core.database import SessionLocal
+from crud.ordering import BULK_UPDATE_CHUNK
+from models.test_report import TestRecord, TestReport
+from services import blob_store, data_transfer, response_store, trend_rollup
+
+# 仍在执行或排队中的报告不归档
+_ACTIVE_REPORT_STATUSES = ("queued", "running")
+# 归档摘要中最多保留的失败用例数
+_SUMMARY_MAX_FAILURES = 100
+
+PARTITION_STRATEGIES = ("report", "month")
+
+
+# ------------------------------------------------------------------
+# 保留策略
+# ------------------------------------------------------------------
+
+def eligible_report_ids(db: Session, limit: int, keep_days: int = RETENTION_KEEP_DAYS,
+                        keep_runs: int = RETENTION_KEEP_RUNS) -> List[int]:
+    """
+    需要归档的报告：早于 keep_days 天，且不在所属套件最近 keep_runs 次执行之内
+    上次中断、已写出归档文件但未完成删除的报告排在最前面
+    """
+    interrupted = list(db.execute(
+        select(TestReport.id)
+        .where(TestReport.archive_path.isnot(None), TestReport.archived_at.is_(None))
+        .order_by(TestReport.id)
+        .limit(limit)
+    ).scalars())
+    if len(interrupted) >= limit:
+        return interrupted
+
+    ranked = select(
+        TestReport.id, TestReport.start_time, TestReport.status, TestReport.archive_path,
+        func.row_number().over(
+            partition_by=TestReport.suite_id,
+            order_by=(TestReport.start_time.desc(), TestReport.id.desc())
+        ).label("run_rank")
+    ).where(TestReport.archived_at.is_(None)).subquery()
+    cutoff = datetime.now() - timedelta(days=keep_days)
+    expired = db.execute(
+        select(ranked.c.id)
+        .where(
+            ranked.c.archive_path.is_(None),
+            ranked.c.start_time < cutoff,
+            ranked.c.run_rank > keep_runs,
+            ranked.c.status.notin_(_ACTIVE_REPORT_STATUSES),
+        )
+        .order_by(ranked.c.start_time, ranked.c.id)
+        .limit(limit - len(interrupted))
+    ).scalars()
+    return interrupted + list(expired)
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return round(sorted_values[index], 4)
+
+
+def _summarize(statuses: Counter, durations: List[float], failures: List[Dict[str, Any]], size: int) -> Dict[str, Any]:
+    durations.sort()
+    return {
+        "records": sum(statuses.values()),
+        "status_counts": dict(statuses),
+        "duration": {
+            "avg": round(sum(durations) / len(durations), 4) if durations else None,
+            "p50": _percentile(durations, 0.5),
+            "p95": _percentile(durations, 0.95),
+            "p99": _percentile(durations, 0.99),
+            "max": durations[-1] if durations else None,
+        },
+        "failures": failures,
+        "archive_bytes": size,
+    }
+
+
+def _archive_file(report_id: int) -> str:
+    return f"report_{report_id}.ndjson.gz"
+
+
+def _bodies_file(archive_path: str) -> str:
+    """与归档文件配套的落盘响应体归档（tar，成员为原样的 gzip 文件，成员名为 response_body_path）"""
+    return os.path.join(ARCHIVE_DIR, archive_path[:-len(".ndjson.gz")] + ".bodies.tar")
+
+
+def _write_bodies(path: str, spill_paths: List[str]) -> int:
+    """把落盘的完整响应体原样打包进 path（先写临时文件，fsync 后改名），返回打包的文件数；已不存在的文件跳过"""
+    temp_path = path + ".tmp"
+    packed = 0
+    with tarfile.open(temp_path, "w") as tar:
+        for relative_path in spill_paths:
+            try:
+                tar.add(response_store.spilled_file(relative_path), arcname=relative_path, recursive=False)
+                packed += 1
+            except (OSError, ValueError):
+                continue
+    with open(temp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return packed
+
+
+def archive_report(db: Session, report_id: int) -> Optional[Dict[str, Any]]:
+    """
+    把报告的执行记录写入 gzip NDJSON 归档文件并从 test_records 删除，报告上保留摘要
+    1. 用 yield_per 流式读出记录写入临时文件，fsync 后改名；落盘的完整响应体（RESPONSE_SPILL_DIR 下的 gzip 文件）
+       原样打包进同名的 .bodies.tar，之后记下 archive_path 并提交
+    2. 按 ID 分批删除记录及其落盘文件，每批一个事务
+    3. 写入 archived_at 与摘要
+    第 1 步完成后中断的报告，下次直接从第 2 步继续，不会用不完整的记录覆盖归档文件
+    报告不存在或仍在执行时返回 None；尚未计入趋势统计的报告在删除记录前先合并
+    """
+    report = db.get(TestReport, report_id)
+    if report is None or report.archived_at is not None or report.status in _ACTIVE_REPORT_STATUSES:
+        return None
+    if report.archive_path is None and report.rolled_up_at is None:
+        trend_rollup.rollup_report(db, report_id)
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, report.archive_path or _archive_file(report_id))
+    statuses: Counter = Counter()
+    durations: List[float] = []
+    failures: List[Dict[str, Any]] = []
+    record_ids: List[int] = []
+    spill_paths: List[Optional[str]] = []
+
+    if report.archive_path is None:
+        temp_path = path + ".tmp"
+        # 流式读取占用当前连接，还原内容哈希使用单独的会话
+        blob_db = SessionLocal()
+        try:
+            with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+                result = db.execute(
+                    select(*TestRecord.__table__.columns)
+                    .where(TestRecord.report_id == report_id)
+                    .order_by(TestRecord.id)
+                    .execution_options(yield_per=BULK_UPDATE_CHUNK)
+                )
+                for partition in result.partitions():
+                    rows = blob_store.resolve_rows(blob_db, [dict(row._mapping) for row in partition])
+                    for row in rows:
+                        # 归档文件自包含请求/响应内容，不依赖 content_blobs
+                        f.write(data_transfer.to_line("record", row))
+                        record_ids.append(row["id"])
+                        spill_paths.append(row["response_body_path"])
+                        statuses[row["status"]] += 1
+                        if row["duration"] is not None:
+                            durations.append(row["duration"])
+                        if row["status"] in ("fail", "error") and len(failures) < _SUMMARY_MAX_FAILURES:
+                            failures.append({"id": row["id"], "test_case_id": row["test_case_id"],
+                                             "case_name": row["case_name"], "status": row["status"],
+                                             "status_code": row["status_code"],
+                                             "error_message": (row["error_message"] or "")[:200] or None})
+        finally:
+            blob_db.close()
+        with open(temp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        if any(spill_paths):
+            _write_bodies(_bodies_file(os.path.basename(path)), [p for p in spill_paths if p])
+        report.archive_path = os.path.basename(path)
+        report.archive_summary = _summarize(statuses, durations, failures, os.path.getsize(path))
+        db.commit()
+    else:
+        rows = db.execute(
+            select(TestRecord.id, TestRecord.response_body_path)
+            .where(TestRecord.report_id == report_id).order_by(TestRecord.id)
+        ).all()
+        record_ids = [record_id for record_id, _ in rows]
+        spill_paths = [spill_path for _, spill_path in rows]
+
+    for start in range(0, len(record_ids), BULK_UPDATE_CHUNK):
+        chunk = record_ids[start:start + BULK_UPDATE_CHUNK]
+        # 释放引用与删除记录在同一事务中，中断后重试不会重复释放
+        blob_store.release_records(db, chunk)
+        db.execute(delete(TestRecord).where(TestRecord.id.in_(chunk)))
+        db.commit()
+        # 落盘文件已打包进归档，记录删除后再删除，中断时不会出现记录指向已删除文件的情况
+        response_store.delete_spilled(spill_paths[start:start + BULK_UPDATE_CHUNK])
+
+    report.archived_at = datetime.now()
+    db.commit()
+    return report.archive_summary
+
+
+def restore_report(db: Session, report_id: int) -> Optional[int]:
+    """
+    把归档的执行记录按原ID写回 test_records（分批插入），落盘响应体解包回 RESPONSE_SPILL_DIR 的原路径，
+    清除归档标记并删除归档文件
+    报告不存在返回 None；报告未归档时抛出 ValueError
+    """
+    report = db.get(TestReport, report_id)
+    if report is None:
+        return None
+    if report.archived_at is None:
+        raise ValueError(f"Test report {report_id} is not archived.")
+    path = os.path.join(ARCHIVE_DIR, report.archive_path)
+    if not os.path.exists(path):
+        raise ValueError(f"Archive file of test report {report_id} no longer exists.")
+    bodies_path = _bodies_file(report.archive_path)
+    if os.path.exists(bodies_path):
+        # 先写回落盘文件：恢复失败时只多出未被引用的文件，重试会覆盖
+        with tarfile.open(bodies_path, "r") as tar:
+            for member in tar:
+                if member.isfile():
+                    response_store.restore_spilled(member.name, tar.extractfile(member))
+
+    restored = 0
+    rows: List[Dict[str, Any]] = []
+    for line in data_transfer.read_lines(path):
+        rows.append(data_transfer.from_line("record", line))
+        if len(rows) >= IMPORT_CHUNK_SIZE:
+            db.execute(insert(TestRecord), blob_store.intern_rows(db, rows))
+            restored += len(rows)
+            rows = []
+    if rows:
+        db.execute(insert(TestRecord), blob_store.intern_rows(db, rows))
+        restored += len(rows)
+    report.archived_at = None
+    report.archive_path = None
+    report.archive_summary = None
+    # 恢复在一个事务中完成，失败时不会留下只恢复了一部分的报告
+    db.commit()
+    os.remove(path)
+    if os.path.exists(bodies_path):
+        os.remove(bodies_path)
+    return restored
+
+
+def run_retention(db: Session, max_reports: int = RETENTION_MAX_REPORTS,
+                  cancel_event: Optional[threading.Event] = None,
+                  on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    执行一轮保留策略：先把最多 max_reports 个尚未计入趋势统计的报告合并进每日统计（升级前的历史报告逐轮补齐），
+    再最多归档 max_reports 个报告（每个报告单独提交），之后清理无引用的内容并维护 test_records 的分区（若已分区）。剩余的报告留给下一轮
+    """
+    stats: Dict[str, Any] = {"rolled_up_reports": 0, "archived_reports": 0, "archived_records": 0,
+                             "collected_blobs": 0, "dropped_partitions": 0, "cancelled": False}
+    stats["rolled_up_reports"] = trend_rollup.rollup_pending(db, max_reports)
+    for report_id in eligible_report_ids(db, max_reports):
+        if cancel_event is not None and cancel_event.is_set():
+            stats["cancelled"] = True
+            break
+        summary = archive_report(db, report_id)
+        if summary is None:
+            continue
+        stats["archived_reports"] += 1
+        stats["archived_records"] += summary["records"]
+        if on_progress is not None:
+            on_progress(stats)
+    # 归档释放了引用，清理不再被任何记录引用的内容
+    stats["collected_blobs"] = blob_store.collect_garbage(db)
+    if not stats["cancelled"] and records_partitioning(db) is not None:
+        stats["dropped_partitions"] = maintain_partitions(db)
+    return stats
+
+
+# ------------------------------------------------------------------
+# 分区（仅 MySQL）
+# ------------------------------------------------------------------
+
+def records_partitioning(db: Session) -> Optional[str]:
+    """test_records 当前的分区方式：report / month，未分区或非 MySQL 时返回 None"""
+    if db.get_bind().dialect.name != "mysql":
+        return None
+    row = db.execute(text(
+        "SELECT PARTITION_EXPRESSION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'test_records' AND PARTITION_NAME IS NOT NULL LIMIT 1"
+    )).first()
+    if row is None:
+        return None
+    return "report" if "report_id" in (row[0] or "") else "month"
+
+
+def _partitions(db: Session) -> List[Any]:
+    return db.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'test_records' ORDER BY PARTITION_ORDINAL_POSITION"
+    )).all()
+
+
+def _month_start(value: date, offset: int = 0) -> date:
+    month = value.month - 1 + offset
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def _report_bounds(db: Session, spare: int) -> List[int]:
+    max_report_id = db.execute(select(func.max(TestReport.id))).scalar() or 0
+    count = max_report_id // RECORD_PARTITION_REPORTS + 1 + spare
+    return [(index + 1) * RECORD_PARTITION_REPORTS for index in range(count)]
+
+
+def _month_bounds(db: Session, spare: int) -> List[date]:
+    first = db.execute(select(func.min(TestRecord.start_time))).scalar() or datetime.now()
+    bounds, current = [], _month_start(first, 1)
+    last = _month_start(datetime.now(), 1 + spare)
+    while current <= last:
+        bounds.append(current)
+        current = _month_start(current, 1)
+    return bounds
+
+
+def _partition_clause(strategy: str, bounds: List[Any]) -> str:
+    if strategy == "report":
+        parts = [f"PARTITION p{bound} VALUES LESS THAN ({bound})" for bound in bounds]
+    else:
+        parts = [f"PARTITION p{bound:%Y%m} VALUES LESS THAN (TO_DAYS('{bound:%Y-%m-%d}'))" for bound in bounds]
+    return ", ".join(parts + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+
+
+def partition_records_table(db: Session, strategy: str) -> int:
+    """
+    一次性把 test_records 改为 RANGE 分区表，返回分区数
+    - report：按 report_id 每 RECORD_PARTITION_REPORTS 个报告一个分区
+    - month：按 start_time 每月一个分区
+    MySQL 要求分区键包含在每个唯一键中且分区表不支持外键，因此会删除 test_records 上的外键，
+    主键改为 (id, 分区列)。该操作会重建整张表，应在低峰期执行
+    """
+    if strategy not in PARTITION_STRATEGIES:
+        raise ValueError(f"strategy must be one of {', '.join(PARTITION_STRATEGIES)}.")
+    if db.get_bind().dialect.name != "mysql":
+        raise ValueError("Table partitioning is only supported on MySQL.")
+    current = records_partitioning(db)
+    if current is not None:
+        raise ValueError(f"test_records is already partitioned by {current}.")
+
+    foreign_keys = db.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'test_records' AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+    )).scalars().all()
+    for name in foreign_keys:
+        db.execute(text(f"ALTER TABLE test_records DROP FOREIGN KEY `{name}`"))
+
+    if strategy == "report":
+        bounds = _report_bounds(db, spare=1)
+        db.execute(text("ALTER TABLE test_records DROP PRIMARY KEY, ADD PRIMARY KEY (id, report_id)"))
+        expression = "RANGE (report_id)"
+    else:
+        bounds = _month_bounds(db, spare=1)
+        db.execute(text("UPDATE test_records SET start_time = NOW() WHERE start_time IS NULL"))
+        db.execute(text(
+            "ALTER TABLE test_records MODIFY start_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id, start_time)"
+        ))
+        expression = "RANGE (TO_DAYS(start_time))"
+    db.execute(text(f"ALTER TABLE test_records PARTITION BY {expression} ({_partition_clause(strategy, bounds)})"))
+    db.commit()
+    return len(bounds) + 1
+
+
+def maintain_partitions(db: Session) -> int:
+    """
+    分区维护，返回删除的分区数
+    - 在 pmax 之前补齐下一个分区，新数据总是落在有界分区中
+    - 从最早的分区开始删除已经为空（记录均已归档）的分区，遇到第一个非空分区即停止：
+      RANGE 分区中最前面的分区接收所有更小的值，只删前缀时恢复归档仍能写入
+    """
+    strategy = records_partitioning(db)
+    if strategy is None:
+        return 0
+    partitions = [row for row in _partitions(db) if row.PARTITION_NAME != "pmax"]
+    last_bound = int(partitions[-1].PARTITION_DESCRIPTION) if partitions else -1
+    bounds = _report_bounds(db, spare=1) if strategy == "report" else _month_bounds(db, spare=1)
+    missing = [bound for bound in bounds if _bound_value(strategy, bound) > last_bound]
+    if missing:
+        db.execute(text(
+            f"ALTER TABLE test_records REORGANIZE PARTITION pmax INTO ({_partition_clause(strategy, missing)})"
+        ))
+
+    dropped = 0
+    for row in partitions[:-1]:
+        if db.execute(text(f"SELECT 1 FROM test_records PARTITION (`{row.PARTITION_NAME}`) LIMIT 1")).first():
+            break
+        db.execute(text(f"ALTER TABLE test_records DROP PARTITION `{row.PARTITION_NAME}`"))
+        dropped += 1
+    db.commit()
+    return dropped
+
+
+def _bound_value(strategy: str, bound: Any) -> int:
+    # 与 information_schema 中 PARTITION_DESCRIPTION 可比较的值：报告ID，或 TO_DAYS 的天数
+    if strategy == "report":
+        return bound
+    return bound.toordinal() + 365
+
+
+# ------------------------------------------------------------------
+# 定时调度
+# ------------------------------------------------------------------
+
+class RetentionScheduler:
+    """
+    每隔 RETENTION_INTERVAL 秒向任务队列提交一次保留任务（已有排队中或执行中的保留任务时跳过），
+    实际的归档在任务队列的工作线程中执行，进度可通过 /jobs 查看
+    """
+
+    def __init__(self, interval: float = RETENTION_INTERVAL):
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, queue):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, args=(queue,), name="retention-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _loop(self, queue):
+        while not self._stop_event.wait(self.interval):
+            db = SessionLocal()
+            try:
+                queue.submit_retention(db)
+            except Exception as e:
+                print(f"❌ 提交保留任务失败: {e}")
+            finally:
+                db.close()
+
+
+# 进程级单例，由 main.py 在应用启动/关闭时管理
+retention_scheduler = RetentionScheduler()
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from core.config import RUN_EVENT_BUFFER_SIZE, RUN_EVENT_MAX_STREAMS, RUN_EVENT_POLL_INTERVAL
+
+# 表示一次执行已经结束的事件类型
+FINISHED_EVENT = "suite_finished"
+
+
+class RunEventStream:
+    """
+    单次执行（以报告ID区分）的事件环形缓冲区
+
+    事件带有单调递增的序号，订阅者用最后收到的序号增量拉取；
+    缓冲区满时丢弃最旧的事件，迟到的订阅者从仍在缓冲区中的最早事件开始追赶
+    """
+
+    def __init__(self, report_id: int, capacity: int = RUN_EVENT_BUFFER_SIZE):
+        self.report_id = report_id
+        self.finished = False
+        self.updated_at = time.time()
+        self._events: deque = deque(maxlen=capacity)
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._events.append({
+                "seq": seq,
+                "type": event_type,
+                "report_id": self.report_id,
+                "timestamp": time.time(),
+                "data": data,
+            })
+            self.updated_at = time.time()
+            if event_type == FINISHED_EVENT:
+                self.finished = True
+            return seq
+
+    def events_since(self, last_seq: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        返回序号大于 last_seq 的事件，以及因缓冲区溢出而无法补发的事件数量
+        """
+        with self._lock:
+            events = [event for event in self._events if event["seq"] > last_seq]
+            dropped = 0
+            if events and events[0]["seq"] > last_seq + 1:
+                dropped = events[0]["seq"] - last_seq - 1
+            return events, dropped
+
+
+class RunEventBus:
+    """
+    进程内的执行事件总线：执行线程发布事件，SSE / WebSocket 订阅者读取
+    只保留最近 RUN_EVENT_MAX_STREAMS 次执行的缓冲区，优先淘汰已结束的执行
+    """
+
+    def __init__(self, max_streams: int = RUN_EVENT_MAX_STREAMS):
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[int, RunEventStream]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_stream(self, report_id: int) -> Optional[RunEventStream]:
+        with self._lock:
+            return self._streams.get(report_id)
+
+    def open_stream(self, report_id: int) -> RunEventStream:
+        """为一次执行创建新的缓冲区（重新执行同一报告时覆盖旧的缓冲区）"""
+        stream = RunEventStream(report_id)
+        with self._lock:
+            self._streams.pop(report_id, None)
+            self._streams[report_id] = stream
+            self._evict()
+        return stream
+
+    def publish(self, report_id: Optional[int], event_type: str, **data) -> Optional[int]:
+        if report_id is None:
+            return None
+        stream = self.get_stream(report_id)
+        if stream is None:
+            stream = self.open_stream(report_id)
+        return stream.publish(event_type, data)
+
+    def _evict(self):
+        while len(self._streams) > self.max_streams:
+            finished_id = next((rid for rid, s in self._streams.items() if s.finished), None)
+            if finished_id is None:
+                # 全部都在执行中时淘汰最早创建的
+                self._streams.popitem(last=False)
+            else:
+                del self._streams[finished_id]
+
+
+# 进程级单例
+event_bus = RunEventBus()
+
+
+async def subscribe(report_id: int, last_seq: int = 0,
+                    status_loader: Optional[Callable[[int], Optional[str]]] = None,
+                    heartbeat_interval: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    订阅一次执行的事件，先补发缓冲区中 last_seq 之后的事件，再持续推送新事件
+    长时间没有新事件时 yield None，调用方据此发送心跳
+
+    缓冲区不存在时（尚在排队、或执行早已结束被淘汰）才通过 status_loader 查询报告状态：
+    排队中则继续等待，已结束则推送一个 suite_finished 事件后退出
+    """
+    idle = 0.0
+    status_checked_at = 0.0
+    while True:
+        stream = event_bus.get_stream(report_id)
+        if stream is None:
+            now = time.time()
+            if status_loader is not None and now - status_checked_at >= 2.0:
+                status_checked_at = now
+                status = await asyncio.to_thread(status_loader, report_id)
+                if status not in ("queued", "running"):
+                    yield {"seq": last_seq + 1, "type": FINISHED_EVENT, "report_id": report_id,
+                           "timestamp": now, "data": {"status": status}}
+                    return
+        else:
+            events, dropped = stream.events_since(last_seq)
+            if dropped:
+                yield {"seq": events[0]["seq"] - 1, "type": "events_dropped", "report_id": report_id,
+                       "timestamp": time.time(), "data": {"count": dropped}}
+            for event in events:
+                last_seq = event["seq"]
+                yield event
+                if event["type"] == FINISHED_EVENT:
+                    return
+            if events:
+                idle = 0.0
+                continue
+            if stream.finished:
+                # 订阅者已经收到过结束事件之后的序号，没有更多内容
+                return
+
+        await asyncio.sleep(RUN_EVENT_POLL_INTERVAL)
+        idle += RUN_EVENT_POLL_INTERVAL
+        if idle >= heartbeat_interval:
+            idle = 0.0
+            yield None
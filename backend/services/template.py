@@ -0,0 +1,216 @@
+import copy
+import re
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Tuple
+
+from core.config import TEMPLATE_CACHE_SIZE
+from services.cache import LRUCache
+
+# {{name}} 引用变量，{{$name}} 调用内置生成函数
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\$?\w+)\}\}")
+
+# 内置生成函数：每次渲染都会重新求值
+GENERATORS: Dict[str, Callable[[], Any]] = {
+    "$timestamp": lambda: int(time.time()),
+    "$timestamp_ms": lambda: int(time.time() * 1000),
+    "$uuid": lambda: str(uuid.uuid4()),
+    "$date": lambda: datetime.now().strftime("%Y-%m-%d"),
+    "$datetime": lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+}
+
+
+def _copy(value: Any) -> Any:
+    # 渲染计划被缓存并在多次执行间共享，字典/列表交给调用方前复制，调用方修改渲染结果不影响缓存
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+class Template(ABC):
+    """编译后的模板节点基类"""
+    # 模板引用的变量名（不含内置函数），供依赖分析使用
+    variables: FrozenSet[str] = frozenset()
+    is_static = False
+
+    @abstractmethod
+    def render(self, variables: Dict[str, Any]) -> Any:
+        """用变量渲染出新的值"""
+
+
+class StaticTemplate(Template):
+    """不含任何占位符的值，编译时复制一份（与 ORM 对象上的 JSON 值脱离），渲染时返回副本"""
+    is_static = True
+
+    def __init__(self, value: Any):
+        self.value = _copy(value)
+
+    def render(self, variables: Dict[str, Any]) -> Any:
+        return _copy(self.value)
+
+
+class WholeValueTemplate(Template):
+    """整个字符串就是一个占位符，如 "{{token}}"，渲染结果保留变量的原始类型"""
+
+    def __init__(self, name: str, raw: str):
+        self.name = name
+        self.raw = raw
+        self.generator = GENERATORS.get(name)
+        if self.generator is None and not name.startswith("$"):
+            self.variables = frozenset([name])
+
+    def render(self, variables: Dict[str, Any]) -> Any:
+        if self.generator is not None:
+            return self.generator()
+        # 变量不存在时保留原始占位符
+        return variables.get(self.name, self.raw)
+
+
+class InterpolationTemplate(Template):
+    """字符串中混合了文本与占位符，如 "Bearer {{token}}"，渲染结果为字符串"""
+
+    def __init__(self, parts: List[Tuple[bool, str]]):
+        # parts: [(is_placeholder, text_or_name)]
+        self.parts = parts
+        self.variables = frozenset(
+            name for is_placeholder, name in parts
+            if is_placeholder and not name.startswith("$")
+        )
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        rendered = []
+        for is_placeholder, value in self.parts:
+            if not is_placeholder:
+                rendered.append(value)
+            elif value in GENERATORS:
+                rendered.append(str(GENERATORS[value]()))
+            elif value in variables:
+                rendered.append(str(variables[value]))
+            else:
+                rendered.append("{{" + value + "}}")
+        return "".join(rendered)
+
+
+class DictTemplate(Template):
+    """包含动态值的字典，只重新渲染动态的键"""
+
+    def __init__(self, value: Dict[Any, Any], dynamic: Dict[Any, Template]):
+        # 动态的键渲染时由子节点生成，只需保存静态部分
+        self.value = {key: _copy(item) for key, item in value.items() if key not in dynamic}
+        self.keys = list(value)
+        self.dynamic = dynamic
+        self.variables = frozenset().union(*(node.variables for node in dynamic.values()))
+
+    def render(self, variables: Dict[str, Any]) -> Dict[Any, Any]:
+        return {
+            key: self.dynamic[key].render(variables) if key in self.dynamic else _copy(self.value[key])
+            for key in self.keys
+        }
+
+
+class ListTemplate(Template):
+    """包含动态元素的列表，只重新渲染动态的位置"""
+
+    def __init__(self, value: List[Any], dynamic: Dict[int, Template]):
+        self.value = [None if index in dynamic else _copy(item) for index, item in enumerate(value)]
+        self.dynamic = dynamic
+        self.variables = frozenset().union(*(node.variables for node in dynamic.values()))
+
+    def render(self, variables: Dict[str, Any]) -> List[Any]:
+        return [
+            self.dynamic[index].render(variables) if index in self.dynamic else _copy(item)
+            for index, item in enumerate(self.value)
+        ]
+
+
+def _compile_string(data: str) -> Template:
+    if "{{" not in data:
+        return StaticTemplate(data)
+
+    full_match = PLACEHOLDER_PATTERN.fullmatch(data)
+    if full_match:
+        return WholeValueTemplate(full_match.group(1), data)
+
+    parts: List[Tuple[bool, str]] = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(data):
+        if match.start() > position:
+            parts.append((False, data[position:match.start()]))
+        parts.append((True, match.group(1)))
+        position = match.end()
+    if not parts:
+        return StaticTemplate(data)
+    if position < len(data):
+        parts.append((False, data[position:]))
+    return InterpolationTemplate(parts)
+
+
+def compile_template(data: Any) -> Template:
+    """
+    将 headers / body / url 等结构编译为渲染计划
+    静态子树整体折叠为 StaticTemplate，渲染时不再遍历
+    """
+    if isinstance(data, dict):
+        dynamic = {}
+        for key, value in data.items():
+            node = compile_template(value)
+            if not node.is_static:
+                dynamic[key] = node
+        return DictTemplate(data, dynamic) if dynamic else StaticTemplate(data)
+    elif isinstance(data, list):
+        dynamic = {}
+        for index, value in enumerate(data):
+            node = compile_template(value)
+            if not node.is_static:
+                dynamic[index] = node
+        return ListTemplate(data, dynamic) if dynamic else StaticTemplate(data)
+    elif isinstance(data, str):
+        return _compile_string(data)
+    return StaticTemplate(data)
+
+
+def render(data: Any, variables: Dict[str, Any]) -> Any:
+    """一次性渲染（不缓存），用于非用例来源的数据"""
+    return compile_template(data).render(variables)
+
+
+class CaseTemplates(NamedTuple):
+    url: Template
+    headers: Template
+    body: Template
+
+    @property
+    def variables(self) -> FrozenSet[str]:
+        return self.url.variables | self.headers.variables | self.body.variables
+
+
+# 以 (用例ID, 版本) 为键缓存编译结果，用例被修改后 updated_at 变化即自动失效
+_cache = LRUCache(max_size=TEMPLATE_CACHE_SIZE)
+
+
+def _compile_case(test_case: Any) -> CaseTemplates:
+    return CaseTemplates(
+        url=compile_template(test_case.url),
+        headers=compile_template(test_case.headers),
+        body=compile_template(test_case.body),
+    )
+
+
+def get_case_templates(test_case: Any) -> CaseTemplates:
+    """
+    获取用例的渲染计划，同一版本的用例只编译一次
+    """
+    case_id = getattr(test_case, "id", None)
+    if case_id is None:
+        return _compile_case(test_case)
+    version = getattr(test_case, "updated_at", None)
+    return _cache.get_or_create((case_id, version), lambda: _compile_case(test_case))
+
+
+def invalidate_case(test_case_id: int):
+    """用例被修改或删除时调用，丢弃该用例所有版本的渲染计划"""
+    _cache.invalidate_matching(lambda key: key[0] == test_case_id)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
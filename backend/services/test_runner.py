@@ -1,55 +1,103 @@
-import requests
 import httpx
 import json
 import time
-import re
+import asyncio
+import hashlib
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
-from jsonpath_ng import parse
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 from sqlalchemy.orm import Session
-from crud import crud_test_case, crud_test_suite, crud_test_report
+from core.config import REGRESSION_CHECK_ENABLED, RUNNER_CONCURRENCY
+from crud import crud_test_case, crud_test_report
 from schemas import test_case as test_case_schema, test_report as report_schema
+from services.dependency_graph import build_dependency_graph
+from services import execution_plan, http_pool, jsonpath_cache, regression, template, trend_rollup
+from services.run_events import event_bus
+from services.record_sink import RecordSink
+from services import response_store
+from services.case_result import CaseResult
+from services.response_store import CapturedBody
+from services.request_timing import RequestTimer
+from services import parallel_runner
+
+
+class PlanEntry(NamedTuple):
+    """
+    执行计划中的一个条目：要么是待执行的用例，要么是已确定的结果（如用例缺失）
+    """
+    test_case: Any = None
+    item_id: Optional[int] = None
+    result: Optional[CaseResult] = None
+    # 不为空时用例使用这组变量独立执行（不读写 self.variables，也不参与依赖排序），用于重跑失败用例
+    variables: Optional[Dict[str, Any]] = None
+
 
 class TestRunner:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, concurrency: Optional[int] = None, cancel_event: Optional[threading.Event] = None,
+                 verbose: bool = True):
         self.db = db
         self.variables: Dict[str, Any] = {}
-        # 初始化一个 Client 实例用于保持会话（Cookies）
-        self.client = httpx.Client(verify=False)
+        # 套件执行时的最大并发请求数，无依赖关系的用例会并发执行
+        self.concurrency = concurrency or RUNNER_CONCURRENCY
+        # 取消信号：被置位后尚未开始的用例不再执行
+        self.cancel_event = cancel_event or threading.Event()
+        # 租约丢失信号：任务已被其他进程接管，停止后不再写入断点和报告结果（由任务队列置位，同时置位取消信号）
+        self.lease_lost = threading.Event()
+        # 执行记录批量落库的缓冲区
+        self.record_sink = RecordSink(db, on_flush=self._on_records_flushed)
+        # 是否打印逐请求的调试信息（请求头、响应体、断言明细）
+        self.verbose = verbose
+        # 超过内存上限的响应体是否写入磁盘；不保存执行记录的场景（如压测）可关闭
+        self.spill_large_bodies = True
+        # 同步 Client 仅供单独调用 run_test_case 时使用，首次访问时创建，由 close() 释放
+        self._client: Optional[httpx.Client] = None
+        # 为 True 时下一次带断点的执行先读取报告中的断点，从最后完成的用例继续（由任务队列在重新执行中断的任务时设置）
+        self.resume = False
+        # 当前执行的断点状态，只在带断点的执行期间存在
+        self._checkpoint: Optional[Dict[str, Any]] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        """同步执行使用的 Client 实例，在同一个 TestRunner 内保持会话（Cookies）"""
+        if self._client is None:
+            self._client = httpx.Client(verify=False)
+        return self._client
+
+    def close(self):
+        """释放同步 Client；并发执行使用的连接池由 http_pool 按线程共享，不在这里关闭"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _log(self, message: str):
+        """逐请求的调试输出，压测等高频执行时通过 verbose=False 关闭"""
+        if self.verbose:
+            print(message)
 
     def _replace_variables(self, data: Any) -> Any:
-        if isinstance(data, dict):
-            return {k: self._replace_variables(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._replace_variables(i) for i in data]
-        elif isinstance(data, str):
-            # 检查是否仅包含一个变量，例如 "{{token}}"
-            full_match = re.fullmatch(r"\{\{(\w+)\}\}", data)
-            if full_match:
-                var_name = full_match.group(1)
-                if var_name in self.variables:
-                    return self.variables[var_name]
-            
-            # 对于其他情况，进行字符串替换，不再尝试智能添加斜杠
-            return re.sub(r"\{\{(\w+?)\}\}", lambda m: str(self.variables.get(m.group(1), m.group(0))), data)
+        return template.render(data, self.variables)
 
-        return data
-
-    def _extract_data(self, response_json: Dict[str, Any], rules: Optional[Dict[str, str]]):
+    def _extract_data(self, response_json: Dict[str, Any], rules: Optional[Dict[str, str]],
+                      variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """按提取规则写入变量，返回本次提取到的变量"""
+        extracted: Dict[str, Any] = {}
         if not rules:
-            return
+            return extracted
+        variables = self.variables if variables is None else variables
         for var_name, json_path in rules.items():
             try:
-                jsonpath_expr = parse(json_path)
-                matches = [match.value for match in jsonpath_expr.find(response_json)]
+                matches = jsonpath_cache.find_values(json_path, response_json)
                 if matches:
-                    self.variables[var_name] = matches[0]
-                    print(f"✔️ 变量提取成功: {var_name} = {matches[0]}")
+                    variables[var_name] = matches[0]
+                    extracted[var_name] = matches[0]
+                    self._log(f"✔️ 变量提取成功: {var_name} = {matches[0]}")
                 else:
-                    print(f"⚠️ 警告: 变量 '{var_name}' 在响应中未找到匹配项 (路径: {json_path})")
+                    self._log(f"⚠️ 警告: 变量 '{var_name}' 在响应中未找到匹配项 (路径: {json_path})")
             except Exception as e:
-                print(f"❌ 错误: 提取变量 '{var_name}' 失败: {e}")
+                self._log(f"❌ 错误: 提取变量 '{var_name}' 失败: {e}")
+        return extracted
 
     def _smart_contains(self, actual: Any, expect: Any) -> bool:
         if isinstance(expect, dict):
@@ -101,8 +149,7 @@ class TestRunner:
                          message = "Response is not a valid JSON object"
                     else:
                         json_path = check[5:]
-                        jsonpath_expr = parse(json_path)
-                        matches = [match.value for match in jsonpath_expr.find(response_json)]
+                        matches = jsonpath_cache.find_values(json_path, response_json)
                         if matches:
                             actual = matches[0]
                         else:
@@ -164,10 +211,10 @@ class TestRunner:
                     message = f"Assertion failed: Actual '{actual}' vs Expected '{expect}' ({comparator})"
 
                 # 打印断言详情用于调试
-                print(f"    [Assert] Check: {check}, Comparator: {comparator}")
-                print(f"      Expect: {expect} (Type: {type(expect).__name__})")
-                print(f"      Actual: {actual} (Type: {type(actual).__name__})")
-                print(f"      Result: {result.upper()}")
+                self._log(f"    [Assert] Check: {check}, Comparator: {comparator}")
+                self._log(f"      Expect: {expect} (Type: {type(expect).__name__})")
+                self._log(f"      Actual: {actual} (Type: {type(actual).__name__})")
+                self._log(f"      Result: {result.upper()}")
 
                 # 记录结果，确保 expect 和 actual 都是字符串格式
                 assertion_results.append({
@@ -189,12 +236,19 @@ class TestRunner:
                 all_passed = False
         
         final_result = "success" if all_passed else "fail"
-        print(f"  - 断言结果: {final_result.upper()}")
+        self._log(f"  - 断言结果: {final_result.upper()}")
         return {"result": final_result, "details": assertion_results}
 
-    def run_test_case(self, test_case: test_case_schema.TestCase) -> Dict[str, Any]:
-        start_time = datetime.now()
-        url = self._replace_variables(test_case.url)
+    def _build_request(self, test_case: test_case_schema.TestCase,
+                       variables: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any], Any, Dict[str, Any]]:
+        """
+        渲染变量并组装请求参数；variables 为空时使用 self.variables
+        返回: (url, headers, body, request_kwargs)
+        """
+        variables = self.variables if variables is None else variables
+        # 渲染计划按用例版本缓存，只有包含占位符的位置会被重新计算
+        templates = template.get_case_templates(test_case)
+        url = templates.url.render(variables)
         
         # 1. 定义默认 Headers (模拟浏览器行为)
         default_headers = {
@@ -206,240 +260,651 @@ class TestRunner:
         }
         
         # 2. 处理用户自定义 Headers
-        custom_headers = self._replace_variables(test_case.headers) or {}
+        custom_headers = templates.headers.render(variables) or {}
         
         # 3. 合并 Headers (用户自定义覆盖默认)
         headers = {**default_headers, **custom_headers}
         
         # DEBUG: 打印最终合并后的 Headers，用于排查 Authorization 丢失等问题
-        print(f"  -> Request Headers: {json.dumps(headers, indent=2, ensure_ascii=False)}")
+        if self.verbose:
+            print(f"  -> Request Headers: {json.dumps(headers, indent=2, ensure_ascii=False)}")
 
-        body = self._replace_variables(test_case.body)
+        body = templates.body.render(variables)
 
-        try:
-            request_kwargs = {
-                "method": test_case.method,
-                "url": url,
-                "headers": headers,
-                "timeout": 10
-            }
-        
-            if body:
-                # 检查 'Content-Type' header 来决定请求体格式
-                content_type = headers.get("Content-Type", "").lower()
-                if "application/json" in content_type:
-                    request_kwargs["json"] = body
-                else:
-                    request_kwargs["data"] = body
+        request_kwargs = {
+            "method": test_case.method,
+            "url": url,
+            "headers": headers,
+            "timeout": 10
+        }
+    
+        if body:
+            # 检查 'Content-Type' header 来决定请求体格式
+            content_type = headers.get("Content-Type", "").lower()
+            if "application/json" in content_type:
+                request_kwargs["json"] = body
+            else:
+                request_kwargs["data"] = body
+
+        return url, headers, body, request_kwargs
+
+    def _build_result(self, test_case: test_case_schema.TestCase, response: httpx.Response, captured: CapturedBody,
+                      url: str, headers: Dict[str, Any], body: Any, start_time: datetime, duration: float,
+                      timer: RequestTimer, variables: Optional[Dict[str, Any]] = None) -> CaseResult:
+        response.raise_for_status()
+        response_json = None
+        if captured.complete:
+            with timer.phase("parse"):
+                try:
+                    response_json = json.loads(captured.text)
+                except ValueError:
+                    pass
+        else:
+            # 超过内存上限的响应体不做 JSON 解析，依赖响应内容的提取与断言会失败
+            self._log(f"⚠️ 响应体过大 ({captured.size} bytes)，跳过 JSON 解析")
+
+        self._log(f"✅ 用例 '{test_case.name}' 请求成功")
+        self._log(f"  - Status Code: {response.status_code}")
         
-            # 使用 self.client.request 替代 httpx.request 以自动处理 Cookies
-            response = self.client.request(**request_kwargs)
-            duration = (datetime.now() - start_time).total_seconds()
-            
-            response.raise_for_status()
-            response_json = None
-            try: 
-                response_json = response.json()
-            except json.JSONDecodeError: 
-                pass
-
-            print(f"✅ 用例 '{test_case.name}' 请求成功")
-            print(f"  - Status Code: {response.status_code}")
-            
-            # --- FIX STARTS HERE ---
-            # 使用 response_json 或 response.text 来打印响应
-            response_to_print = response_json if response_json is not None else response.text
+        # --- FIX STARTS HERE ---
+        # 使用 response_json 或 response.text 来打印响应
+        if self.verbose:
+            response_to_print = response_json if response_json is not None else captured.text
             try:
                 # 尝试格式化打印JSON
                 print(f"  - Response: {json.dumps(response_to_print, indent=2, ensure_ascii=False)}")
             except TypeError:
                 # 如果不是JSON，直接打印文本
                 print(f"  - Response: {response_to_print}")
-            # --- FIX ENDS HERE ---
+        # --- FIX ENDS HERE ---
 
-            self._extract_data(response_json, test_case.extract_rules)
+        with timer.phase("extraction"):
+            extracted = self._extract_data(response_json, test_case.extract_rules, variables)
 
+        with timer.phase("assertions"):
             assertions_result = self._execute_assertions(response_json, response.status_code, test_case.assertions)
 
-            final_status = assertions_result["result"]
-            
-            return {
-                "id": test_case.id,
-                "name": test_case.name,
-                "status": final_status, 
-                "status_code": response.status_code,
-                "response": response_json or response.text,
-                "assertions": assertions_result,
-                "url": url,
-                "method": test_case.method,
-                "start_time": start_time,
-                "duration": duration,
-                "request_headers": headers,
-                "request_body": body,
-                "response_headers": dict(response.headers),
-                "response_body": response.text
-            }
+        final_status = assertions_result["result"]
+        
+        return CaseResult(
+            id=test_case.id,
+            name=test_case.name,
+            status=final_status,
+            status_code=response.status_code,
+            assertions=assertions_result,
+            url=url,
+            method=test_case.method,
+            start_time=start_time,
+            duration=duration,
+            request_headers=headers,
+            request_body=body,
+            response_headers=dict(response.headers),
+            response_body=captured,
+            timings=timer.to_dict(),
+            extracted=extracted or None
+        )
+
+    def _build_error_result(self, test_case: test_case_schema.TestCase, error: Exception, url: str,
+                            headers: Dict[str, Any], body: Any, start_time: datetime, duration: float,
+                            timer: RequestTimer) -> CaseResult:
+        self._log(f"❌ 用例 '{test_case.name}' 请求失败: {error}")
+        return CaseResult(
+            id=test_case.id,
+            name=test_case.name,
+            status="error",
+            response=str(error),
+            url=url,
+            method=test_case.method,
+            start_time=start_time,
+            duration=duration,
+            request_headers=headers,
+            request_body=body,
+            error_message=str(error),
+            timings=timer.to_dict()
+        )
+
+    def run_test_case(self, test_case: test_case_schema.TestCase) -> CaseResult:
+        start_time = datetime.now()
+        timer = RequestTimer()
+        with timer.phase("render"):
+            url, headers, body, request_kwargs = self._build_request(test_case)
+
+        try:
+            # 使用 self.client 替代 httpx.request 以自动处理 Cookies；按块读取响应体以限制内存占用
+            timer.request_sent()
+            with self.client.stream(**request_kwargs, extensions={"trace": timer.trace_sync}) as response:
+                captured = response_store.capture(response, spill=self.spill_large_bodies)
+            duration = (datetime.now() - start_time).total_seconds()
+            return self._build_result(test_case, response, captured, url, headers, body, start_time, duration, timer)
+
+        except httpx.RequestError as e:
+            duration = (datetime.now() - start_time).total_seconds()
+            return self._build_error_result(test_case, e, url, headers, body, start_time, duration, timer)
+
+    async def run_test_case_async(self, test_case: test_case_schema.TestCase, client: httpx.AsyncClient,
+                                  emit: Optional[Callable[..., Any]] = None,
+                                  variables: Optional[Dict[str, Any]] = None) -> CaseResult:
+        """
+        run_test_case 的异步版本，由并发执行引擎调用
+        emit: 可选的进度事件回调，签名为 emit(event_type, **data)
+        variables: 用这组变量代替 self.variables 渲染请求并接收提取结果（重跑失败用例时使用）
+        """
+        start_time = datetime.now()
+        timer = RequestTimer()
+        with timer.phase("render"):
+            url, headers, body, request_kwargs = self._build_request(test_case, variables)
+
+        try:
+            if emit is not None:
+                emit("request_sent", url=url, method=test_case.method)
+            timer.request_sent()
+            async with client.stream(**request_kwargs, extensions={"trace": timer.trace}) as response:
+                captured = await response_store.capture_async(response, spill=self.spill_large_bodies)
+            duration = (datetime.now() - start_time).total_seconds()
+            return self._build_result(test_case, response, captured, url, headers, body, start_time, duration, timer,
+                                      variables)
 
         except httpx.RequestError as e:
             duration = (datetime.now() - start_time).total_seconds()
-            print(f"❌ 用例 '{test_case.name}' 请求失败: {e}")
-            return {
-                "id": test_case.id,
-                "name": test_case.name,
-                "status": "error",
-                "response": str(e),
-                "url": url,
-                "method": test_case.method,
-                "start_time": start_time,
-                "duration": duration,
-                "request_headers": headers,
-                "request_body": body,
-                "error_message": str(e)
-            }
-
-    def run_test_suite(self, test_case_ids: List[int]) -> List[Dict[str, Any]]:
-        results = []
+            return self._build_error_result(test_case, e, url, headers, body, start_time, duration, timer)
+
+    def _run_entries(self, entries: List[PlanEntry], report_id: Optional[int] = None,
+                     checkpoint: bool = False) -> List[CaseResult]:
+        """
+        并发执行计划中的全部条目，返回与 entries 顺序一致的结果列表
+        report_id 不为空时，结果按 entries 顺序（即 sort_order）依次落库
+        checkpoint 为 True 时每批记录落库后在报告中写入断点，self.resume 为 True 时先从断点恢复
+        """
+        # 在执行线程的常驻事件循环中运行，使连接池在多次执行之间复用
+        return http_pool.run(self._run_entries_async(entries, report_id, checkpoint))
+
+    async def _run_entries_async(self, entries: List[PlanEntry], report_id: Optional[int],
+                                 checkpoint: bool = False) -> List[CaseResult]:
+        cases = [entry.test_case for entry in entries]
+        # 执行前预编译全部 JSONPath，避免在请求之间解析
+        jsonpath_cache.warm_up(cases)
+        deps = build_dependency_graph(cases)
+        for index, entry in enumerate(entries):
+            if entry.variables is not None:
+                deps[index] = set()
+        finished = [asyncio.Event() for _ in entries]
+        results: List[Optional[CaseResult]] = [entry.result for entry in entries]
+        recordable = [False] * len(entries)
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        next_to_persist = 0
+
+        total = len(entries)
+        if checkpoint and report_id is not None:
+            # 断点之前的条目已经执行并落库，直接使用还原的结果
+            next_to_persist = self._begin_checkpoint(entries, report_id, results)
+            for index in range(next_to_persist):
+                finished[index].set()
+
+        def publish(event_type: str, index: int, **data):
+            # 仅对写入报告的执行推送进度事件
+            if report_id is not None:
+                event_bus.publish(report_id, event_type, index=index, total=total, **data)
+
+        def persist_ready():
+            # 只把连续完成的前缀交给写入缓冲区，保证 TestRecord 的顺序与执行计划一致
+            nonlocal next_to_persist
+            while next_to_persist < total and finished[next_to_persist].is_set():
+                if self._checkpoint is not None:
+                    # 先登记再交给写入缓冲区：缓冲区可能在 add 时立即落库并推进断点
+                    self._track_checkpoint(next_to_persist, entries[next_to_persist], results[next_to_persist],
+                                           recordable[next_to_persist])
+                if report_id is not None and recordable[next_to_persist]:
+                    self._record_result(report_id, results[next_to_persist],
+                                        meta={"index": next_to_persist, "total": total})
+                    # 记录已交给写入缓冲区，释放请求/响应等大字段
+                    results[next_to_persist].release()
+                next_to_persist += 1
+
+        async def run_entry(index: int, client: httpx.AsyncClient):
+            entry = entries[index]
+            if entry.test_case is not None:
+                # 先等待所有生产者（及需要先读取旧值的用例）完成，再占用并发名额
+                for dep in deps[index]:
+                    await finished[dep].wait()
+                try:
+                    async with semaphore:
+                        if self.cancel_event.is_set():
+                            results[index] = CaseResult(
+                                id=entry.test_case.id,
+                                name=entry.test_case.name,
+                                status="cancelled",
+                                response="Execution cancelled."
+                            )
+                            publish("case_cancelled", index, test_case_id=entry.test_case.id, name=entry.test_case.name)
+                        else:
+                            publish("case_started", index, test_case_id=entry.test_case.id, name=entry.test_case.name)
+                            emit = lambda event_type, **data: publish(event_type, index, test_case_id=entry.test_case.id, **data)
+                            if entry.variables is not None:
+                                # 提取结果写入副本，不影响快照本身
+                                snapshot = entry.variables
+                                variables = dict(snapshot)
+                            else:
+                                # 依赖的生产者均已完成，此刻的变量即用例渲染请求时看到的值
+                                snapshot = dict(self.variables)
+                                variables = None
+                            results[index] = await self.run_test_case_async(entry.test_case, client, emit=emit,
+                                                                            variables=variables)
+                            results[index].variables = snapshot
+                            recordable[index] = True
+                            result = results[index]
+                            publish("assertions", index,
+                                    test_case_id=result.id,
+                                    name=result.name,
+                                    status=result.status,
+                                    status_code=result.status_code,
+                                    duration=result.duration,
+                                    timings=result.timings,
+                                    details=result.assertion_details,
+                                    error_message=result.error_message)
+                except Exception as e:
+                    results[index] = CaseResult(
+                        name=f"Error executing item {entry.item_id}",
+                        status="error",
+                        response=str(e)
+                    )
+                    publish("assertions", index, name=results[index].name, status="error", error_message=str(e))
+            finished[index].set()
+            persist_ready()
+
+        try:
+            # 连接池按主机共享，客户端（Cookie 容器）每次执行独立创建
+            async with http_pool.create_client() as client:
+                await http_pool.prewarm(self._prewarm_urls(cases))
+                await asyncio.gather(*(run_entry(index, client) for index in range(next_to_persist, total)))
+        finally:
+            # 无论是否异常，都把缓冲区中已完成的记录写入数据库
+            self._flush_records()
+            self._checkpoint = None
+        return results
+
+    def _prewarm_urls(self, test_cases: List[Any]) -> List[str]:
+        """用当前变量渲染各用例的 URL，用于执行前预热；依赖执行中提取变量的 URL 会被跳过"""
+        urls = []
+        for test_case in test_cases:
+            if test_case is None:
+                continue
+            url = template.get_case_templates(test_case).url.render(self.variables)
+            if isinstance(url, str):
+                urls.append(url)
+        return urls
+
+    def run_test_suite(self, test_case_ids: List[int], report_id: Optional[int] = None) -> List[CaseResult]:
+        """
+        按用例ID列表执行；传入 report_id 时结果写入该报告并在结束后汇总
+        """
+        if report_id is not None:
+            self._start_report(report_id)
+        entries = []
         for case_id in test_case_ids:
             db_case = crud_test_case.get_test_case(self.db, test_case_id=case_id)
             if db_case:
-                result = self.run_test_case(db_case)
-                results.append(result)
+                entries.append(PlanEntry(test_case=db_case, item_id=case_id))
             else:
-                results.append({
-                    "id": case_id,
-                    "name": "Unknown",
-                    "status": "error",
-                    "response": f"Test case with id {case_id} not found."
-                })
+                entries.append(PlanEntry(result=CaseResult(
+                    id=case_id,
+                    name="Unknown",
+                    status="error",
+                    response=f"Test case with id {case_id} not found."
+                )))
+        results = self._run_entries(entries, report_id, checkpoint=report_id is not None)
+        if report_id is not None:
+            self._finalize_report(report_id, results)
         print("="*50)
         print("▶️ 测试套件执行完毕")
         return results
 
-    def run_full_suite(self, suite_id: int, parent_report_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    def rerun_failed(self, source_report_id: int, report_id: int) -> List[CaseResult]:
+        """
+        只重跑原报告中失败（fail/error）的执行记录，结果写入 report_id 并汇总
+        每条记录用它当时看到的变量快照独立执行（互不影响，可并发）；没有快照的旧记录以空变量执行
+        """
+        self._start_report(report_id)
+        entries = []
+        for record in crud_test_report.get_failed_test_records(self.db, source_report_id):
+            db_case = crud_test_case.get_test_case(self.db, test_case_id=record["test_case_id"]) \
+                if record["test_case_id"] is not None else None
+            if db_case:
+                entries.append(PlanEntry(test_case=db_case, item_id=record["id"], variables=record["variables"] or {}))
+            else:
+                entries.append(PlanEntry(result=CaseResult(
+                    id=record["test_case_id"],
+                    name=record["case_name"] or "Unknown",
+                    status="error",
+                    response=f"Test case with id {record['test_case_id']} not found."
+                )))
+        print(f"🔁 重跑报告 #{source_report_id} 中的 {len(entries)} 个失败用例")
+        results = self._run_entries(entries, report_id, checkpoint=True)
+        self._finalize_report(report_id, results)
+        return results
+
+    def _plan_entries(self, steps) -> List[PlanEntry]:
+        """
+        将执行计划中的步骤转换为执行条目；缺失的条目与循环引用直接生成 error 结果
+        """
+        entries: List[PlanEntry] = []
+        for step in steps:
+            if step.case is not None:
+                entries.append(PlanEntry(test_case=step.case, item_id=step.item_id))
+            else:
+                entries.append(PlanEntry(result=CaseResult(
+                    id=step.error_id,
+                    name=step.error_name,
+                    status="error",
+                    response=step.error_message
+                )))
+        return entries
+
+    def _unknown_suite(self, suite_id: int) -> CaseResult:
+        return CaseResult(
+            id=suite_id,
+            name="Unknown Suite",
+            status="error",
+            response=f"Test suite with id {suite_id} not found."
+        )
+
+    def run_suite_items(self, suite_id: int, item_ids: List[int], report_id: int) -> List[CaseResult]:
+        """
+        只执行套件中指定的顶层条目，结果写入 report_id 但不做汇总
+        供多进程分片执行时各工作进程调用
+        """
+        plan = execution_plan.get_plan(self.db, suite_id)
+        if plan is None:
+            return [self._unknown_suite(suite_id)]
+        return self._run_entries(self._plan_entries(plan.steps_for(item_ids)), report_id)
+
+    def run_full_suite(self, suite_id: int, parent_report_id: Optional[int] = None,
+                       report_id: Optional[int] = None) -> Tuple[List[CaseResult], Optional[int]]:
         """
         执行完整的测试套件（包含用例、模块、子套件）
+        套件树由 execution_plan 一次性展开（带缓存与循环检测），不再逐层递归查询
+        parent_report_id: 作为子套件执行，结果写入父报告且不做汇总
+        report_id: 使用预先创建的报告（如任务队列入队时创建的报告）
         返回: (results, report_id)
         """
-        suite = crud_test_suite.get_test_suite(self.db, test_suite_id=suite_id)
-        if not suite:
-            return [{
-                "id": suite_id,
-                "name": "Unknown Suite",
-                "status": "error",
-                "response": f"Test suite with id {suite_id} not found."
-            }], None
+        plan = execution_plan.get_plan(self.db, suite_id)
+        if plan is None:
+            return [self._unknown_suite(suite_id)], None
 
         # 创建或使用现有报告
-        report_id = parent_report_id
-        is_root_execution = False
-        if report_id is None:
-            is_root_execution = True
-            report_create = report_schema.TestReportCreate(
-                suite_id=suite.id,
-                suite_name=suite.name,
-                start_time=datetime.now(),
-                status="running"
-            )
-            report = crud_test_report.create_test_report(self.db, report_create)
-            report_id = report.id
-
-        results = []
-        print(f"🚀 开始执行套件: {suite.name}")
+        is_root_execution = parent_report_id is None
+        if parent_report_id is not None:
+            report_id = parent_report_id
+        else:
+            report_id = self._prepare_report(plan.suite_id, plan.suite_name, report_id)
 
-        # 遍历 items，它们已经按照 sort_order 排序（由 SQLAlchemy relationship 保证）
-        if suite.items:
-            for item in suite.items:
-                try:
-                    if item.item_type == "test_case":
-                        if item.test_case:
-                            result = self.run_test_case(item.test_case)
-                            self._record_result(report_id, result)
-                            results.append(result)
-                        else:
-                            results.append({
-                                "id": item.test_case_id,
-                                "name": "Missing Case",
-                                "status": "error",
-                                "response": f"Test case ID {item.test_case_id} not found"
-                            })
-                    
-                    elif item.item_type == "test_module":
-                        if item.module:
-                            print(f"  📂 执行模块: {item.module.name}")
-                            if hasattr(item.module, 'test_cases') and item.module.test_cases:
-                                for case in item.module.test_cases:
-                                    result = self.run_test_case(case)
-                                    self._record_result(report_id, result)
-                                    results.append(result)
-                            else:
-                                pass
-                        else:
-                             results.append({
-                                "id": item.module_id,
-                                "name": "Missing Module",
-                                "status": "error",
-                                "response": f"Module ID {item.module_id} not found"
-                            })
-
-                    elif item.item_type == "test_suite":
-                        if item.child_suite_id:
-                            # 递归执行子套件
-                            sub_results, _ = self.run_full_suite(item.child_suite_id, parent_report_id=report_id)
-                            results.extend(sub_results)
-                
-                except Exception as e:
-                    results.append({
-                        "name": f"Error executing item {item.id}",
-                        "status": "error",
-                        "response": str(e)
-                    })
+        print(f"🚀 开始执行套件: {plan.suite_name}（{len(plan.steps)} 步）")
+        results = self._run_entries(self._plan_entries(plan.steps), report_id, checkpoint=is_root_execution)
         
         if is_root_execution:
             self._finalize_report(report_id, results)
 
         return results, report_id
 
-    def _record_result(self, report_id: int, result: Dict[str, Any]):
+    def run_full_suite_sharded(self, suite_id: int, report_id: Optional[int] = None,
+                               workers: Optional[int] = None) -> Tuple[List[CaseResult], Optional[int]]:
+        """
+        多进程分片执行套件：顶层的 test_suite / test_module 条目（以及相邻的用例条目）各自成片，
+        每个工作进程拥有独立的数据库会话与 HTTP 客户端，结果汇总到同一个报告
+        注意：分片之间不共享提取的变量
+        返回: (精简结果列表, report_id)
+        """
+        plan = execution_plan.get_plan(self.db, suite_id)
+        if plan is None:
+            return [self._unknown_suite(suite_id)], None
+
+        report_id = self._prepare_report(plan.suite_id, plan.suite_name, report_id)
+        print(f"🚀 多进程执行套件: {plan.suite_name}")
+        shards = parallel_runner.build_shards(plan)
+        results = parallel_runner.execute_shards(
+            plan.suite_id, shards, report_id,
+            workers=workers, concurrency=self.concurrency, cancel_event=self.cancel_event
+        )
+        self._finalize_report(report_id, results)
+        return results, report_id
+
+    def _record_result(self, report_id: int, result: CaseResult, meta: Optional[Dict[str, Any]] = None):
+        """
+        将单条结果加入写入缓冲区，由 RecordSink 按批次落库
+        超长响应体在这里截断，完整内容压缩落盘并在记录中保存路径
+        """
         try:
-            # 确保 response_body 是字符串
-            resp_body = result.get("response_body")
-            if not isinstance(resp_body, str):
-                if resp_body is None:
-                    resp_body = ""
-                else:
-                    try:
-                        resp_body = json.dumps(resp_body, ensure_ascii=False)
-                    except:
-                        resp_body = str(resp_body)
+            persist_started = time.perf_counter()
+            resp_body, resp_body_path, resp_body_size = response_store.prepare_for_record(result.response_body)
 
             record_create = report_schema.TestRecordCreate(
                 report_id=report_id,
-                test_case_id=result.get("id"),
-                case_name=result.get("name"),
-                start_time=result.get("start_time"),
-                duration=result.get("duration"),
-                status=result.get("status"),
-                url=result.get("url"),
-                method=result.get("method"),
-                status_code=result.get("status_code"),
-                request_headers=result.get("request_headers"),
-                request_body=result.get("request_body"),
-                response_headers=result.get("response_headers"),
+                test_case_id=result.id,
+                case_name=result.name,
+                start_time=result.start_time,
+                duration=result.duration,
+                status=result.status,
+                url=result.url,
+                method=result.method,
+                status_code=result.status_code,
+                request_headers=result.request_headers,
+                request_body=result.request_body,
+                response_headers=result.response_headers,
                 response_body=resp_body,
-                error_message=result.get("error_message"),
-                assertion_results=result.get("assertions", {}).get("details")
+                response_body_path=resp_body_path,
+                response_body_size=resp_body_size,
+                error_message=result.error_message,
+                assertion_results=(result.assertions or {}).get("details"),
+                variables=result.variables
             )
-            crud_test_report.create_test_record(self.db, record_create)
+            if result.timings is not None:
+                # 落库准备耗时（截断/落盘大响应体、构建记录）；批量 INSERT 的耗时由所有记录分摊，不计入单条记录
+                record_create.timings = dict(result.timings, persist=round((time.perf_counter() - persist_started) * 1000, 3))
+            meta = dict(meta or {}, report_id=report_id, test_case_id=result.id, status=result.status)
+            self.record_sink.add(record_create, meta)
         except Exception as e:
             print(f"❌ 记录测试结果失败: {e}")
 
-    def _finalize_report(self, report_id: int, results: List[Dict[str, Any]]):
+    def _flush_records(self):
+        try:
+            self.record_sink.flush()
+        except Exception as e:
+            print(f"❌ 写入执行记录失败: {e}")
+
+    def _on_records_flushed(self, metas: List[Dict[str, Any]]):
+        if self._checkpoint is not None:
+            self._advance_checkpoint(metas)
+        for meta in metas:
+            meta = dict(meta)
+            event_bus.publish(meta.pop("report_id"), "record_persisted", **meta)
+
+    # ------------------------------------------------------------------
+    # 断点续跑
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _plan_fingerprint(entries: List[PlanEntry]) -> str:
+        """执行计划的指纹：条目与用例ID的顺序，套件在中断期间被修改时断点失效"""
+        plan = [[entry.item_id, entry.test_case.id if entry.test_case is not None else None] for entry in entries]
+        return hashlib.sha1(json.dumps(plan).encode("utf-8")).hexdigest()
+
+    def _begin_checkpoint(self, entries: List[PlanEntry], report_id: int, results: List[Optional[CaseResult]]) -> int:
+        """
+        开始记录断点，返回开始执行的位置；self.resume 为 True 且断点可用时还原断点之前的结果与变量
+        断点: position 之前的条目均已执行，它们的执行记录（除 unrecorded 中的条目外）按顺序落库、共 records 条；
+        variables 为按计划顺序依次执行到 position 时的变量（初始变量加上各用例提取的值）
+        """
+        fingerprint = self._plan_fingerprint(entries)
+        start, records, unrecorded = 0, 0, []
+        if self.resume:
+            self.resume = False
+            restored = self._restore_checkpoint(entries, report_id, fingerprint, results)
+            if restored is not None:
+                start, records, unrecorded, variables = restored
+                self.variables.update(variables)
+                print(f"⏯️ 从断点继续执行：跳过已完成的 {start}/{len(entries)} 步")
+                event_bus.publish(report_id, "run_resumed", index=start, total=len(entries))
+        self._checkpoint = {
+            "report_id": report_id,
+            "fingerprint": fingerprint,
+            "position": start,
+            "variables": dict(self.variables),
+            # 本次执行前已有的记录数，加上写入缓冲区落库的条数即报告中的记录总数
+            "records_base": records - self.record_sink.flushed_count,
+            "unrecorded": unrecorded,
+            # 已交给写入缓冲区、尚未确认落库的条目: (index, 提取的变量, 是否有执行记录)
+            "pending": deque(),
+        }
+        return start
+
+    def _restore_checkpoint(self, entries: List[PlanEntry], report_id: int, fingerprint: str,
+                            results: List[Optional[CaseResult]]):
+        """
+        核对报告中的断点与执行记录：删除断点之后才落库的记录，按顺序用剩余记录还原断点之前的结果
+        返回 (position, records, unrecorded, variables)；断点不可用时删除全部记录并返回 None（从头执行）
+        """
+        db_report = crud_test_report.get_test_report_summary(self.db, report_id)
+        saved = db_report.checkpoint if db_report is not None else None
+        try:
+            if not saved:
+                raise ValueError("报告中没有断点")
+            if saved.get("fingerprint") != fingerprint:
+                raise ValueError("执行计划已变化")
+            position, records = int(saved["position"]), int(saved["records"])
+            unrecorded = [int(index) for index in saved.get("unrecorded") or []]
+            if position > len(entries):
+                raise ValueError("断点位置超出执行计划")
+            crud_test_report.trim_test_records(self.db, report_id, records)
+            rows = iter(crud_test_report.get_recorded_results(self.db, report_id, records))
+            skipped = set(unrecorded)
+            for index in range(position):
+                entry = entries[index]
+                if entry.test_case is None:
+                    # 已确定的结果（如用例缺失）不落库，results 中已经是该结果
+                    continue
+                if index in skipped:
+                    # 执行异常或落库失败的条目没有记录，按错误计入汇总
+                    results[index] = CaseResult(
+                        id=entry.test_case.id,
+                        name=entry.test_case.name,
+                        status="error",
+                        response="No record was persisted before the run was interrupted."
+                    )
+                    continue
+                row = next(rows, None)
+                if row is None or row["test_case_id"] != entry.test_case.id:
+                    raise ValueError(f"第 {index + 1} 步的执行记录与执行计划不一致")
+                results[index] = CaseResult(id=row["test_case_id"], name=row["case_name"],
+                                            status=row["status"], duration=row["duration"])
+            if next(rows, None) is not None:
+                raise ValueError("执行记录多于断点")
+            return position, records, unrecorded, saved.get("variables") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            self.db.rollback()
+            print(f"⚠️ 断点不可用（{e}），从头执行")
+            for index, entry in enumerate(entries):
+                results[index] = entry.result
+            crud_test_report.delete_test_records(self.db, report_id)
+            return None
+
+    def _track_checkpoint(self, index: int, entry: PlanEntry, result: Optional[CaseResult], recordable: bool):
+        """登记按计划顺序完成的条目；使用独立变量快照执行的条目不影响共享变量"""
+        extracted = result.extracted if result is not None and entry.variables is None else None
+        self._checkpoint["pending"].append((index, extracted, recordable))
+
+    def _advance_checkpoint(self, metas: List[Dict[str, Any]]):
+        """
+        一批记录提交后推进断点到该批最后一条记录之后，并写入报告（每批一次 UPDATE）
+        批量写入失败后逐条写入时被丢弃的记录计入 unrecorded
+        """
+        state = self._checkpoint
+        persisted = {meta["index"] for meta in metas if meta.get("report_id") == state["report_id"]}
+        if not persisted or self.lease_lost.is_set():
+            return
+        last = max(persisted)
+        pending = state["pending"]
+        while pending and pending[0][0] <= last:
+            index, extracted, recordable = pending.popleft()
+            if extracted:
+                state["variables"].update(extracted)
+            if recordable and index not in persisted:
+                state["unrecorded"].append(index)
+            state["position"] = index + 1
+        try:
+            crud_test_report.save_report_checkpoint(self.db, state["report_id"], {
+                "fingerprint": state["fingerprint"],
+                "position": state["position"],
+                "variables": state["variables"],
+                "records": state["records_base"] + self.record_sink.flushed_count,
+                "unrecorded": state["unrecorded"],
+            })
+        except Exception as e:
+            self.db.rollback()
+            print(f"❌ 写入执行断点失败: {e}")
+
+    def _prepare_report(self, suite_id: int, suite_name: str, report_id: Optional[int]) -> int:
+        """
+        启动预先创建的报告，或为套件新建一份报告，返回报告ID
+        """
+        if report_id is not None:
+            self._start_report(report_id)
+            return report_id
+        report_create = report_schema.TestReportCreate(
+            suite_id=suite_id,
+            suite_name=suite_name,
+            start_time=datetime.now(),
+            status="running"
+        )
+        report = crud_test_report.create_test_report(self.db, report_create)
+        event_bus.open_stream(report.id)
+        return report.id
+
+    def _start_report(self, report_id: int):
+        event_bus.open_stream(report_id)
+        if self.resume:
+            # 从断点继续时保留最初的开始时间，报告耗时包含中断前的部分
+            update = report_schema.TestReportUpdate(status="running")
+        else:
+            update = report_schema.TestReportUpdate(start_time=datetime.now(), status="running")
+        crud_test_report.update_test_report(self.db, report_id, update)
+
+    def _check_regression(self, report_id: int):
+        """与同一套件最近的执行比较耗时分布，结果写入报告的 regression_summary；没有基线时跳过"""
+        try:
+            comparison = regression.compare_reports(self.db, report_id)
+            if not comparison["baseline_report_ids"]:
+                return
+            summary = regression.summarize(comparison)
+            crud_test_report.update_test_report(self.db, report_id, report_schema.TestReportUpdate(
+                regression_summary=summary
+            ))
+            if summary["counts"]["regression"] or summary["newly_failing"]:
+                print(f"⚠️ 报告 #{report_id} 检测到 {summary['counts']['regression']} 个性能回归用例，"
+                      f"{summary['newly_failing']} 个新失败用例")
+                event_bus.publish(report_id, "regression_detected",
+                                  regressions=summary["counts"]["regression"],
+                                  newly_failing=summary["newly_failing"])
+        except Exception as e:
+            self.db.rollback()
+            print(f"❌ 性能回归检测失败: {e}")
+
+    def _finalize_report(self, report_id: int, results: List[CaseResult]):
+        if self.lease_lost.is_set():
+            # 报告已由接管任务的进程从断点继续执行，这里不再写入
+            print(f"⚠️ 报告 #{report_id} 已由其他进程接管，跳过汇总")
+            return
+        # 汇总前确保所有执行记录已经落库
+        self._flush_records()
+        # 被取消而未执行的用例不计入统计
+        results = [r for r in results if r.status != "cancelled"]
         total = len(results)
-        pass_count = sum(1 for r in results if r.get("status") == "success")
-        fail_count = sum(1 for r in results if r.get("status") == "fail")
-        error_count = sum(1 for r in results if r.get("status") == "error")
+        pass_count = sum(1 for r in results if r.status == "success")
+        fail_count = sum(1 for r in results if r.status == "fail")
+        error_count = sum(1 for r in results if r.status == "error")
         
-        status = "success" if fail_count == 0 and error_count == 0 else "failed"
+        if self.cancel_event.is_set():
+            status = "cancelled"
+        else:
+            status = "success" if fail_count == 0 and error_count == 0 else "failed"
         
         report_update = report_schema.TestReportUpdate(
             end_time=datetime.now(),
@@ -453,8 +918,25 @@ class TestRunner:
         
         # Calculate duration correctly by fetching report start time or just diffing now
         # Ideally fetch report to get start_time
-        db_report = crud_test_report.get_test_report(self.db, report_id)
+        db_report = crud_test_report.get_test_report_summary(self.db, report_id)
         if db_report and db_report.start_time:
             report_update.duration = (datetime.now() - db_report.start_time).total_seconds()
             
-        crud_test_report.update_test_report(self.db, report_id, report_update)
\ No newline at end of file
+        crud_test_report.update_test_report(self.db, report_id, report_update)
+        crud_test_report.save_report_checkpoint(self.db, report_id, None)
+        if status != "cancelled":
+            # 增量合并进每日趋势统计；失败只影响趋势，不影响报告本身
+            try:
+                trend_rollup.rollup_report(self.db, report_id)
+            except Exception as e:
+                self.db.rollback()
+                print(f"❌ 合并趋势统计失败: {e}")
+        if status != "cancelled" and REGRESSION_CHECK_ENABLED:
+            self._check_regression(report_id)
+        event_bus.publish(report_id, "suite_finished",
+                          status=status,
+                          total_cases=total,
+                          pass_count=pass_count,
+                          fail_count=fail_count,
+                          error_count=error_count,
+                          duration=report_update.duration)
\ No newline at end of file
@@ -0,0 +1,214 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import TREND_DEFAULT_DAYS, TREND_MAX_DAYS
+from crud.ordering import BULK_UPDATE_CHUNK
+from models.test_report import TestRecord, TestReport
+from models.trend_rollup import CaseDailyStat, SuiteDailyStat
+from services.latency_histogram import LatencyHistogram
+
+# 执行记录状态 -> 统计列；其他状态只计入 total
+_STATUS_COLUMNS = {"success": "pass_count", "fail": "fail_count", "error": "error_count"}
+# 只汇总正常结束的功能执行报告；被取消的报告可能重新执行，压测报告另有 load_summary
+_FINISHED_STATUSES = ("success", "failed")
+
+
+class _Bucket:
+    """一组执行记录的计数与延迟直方图，合并进统计行时按列累加"""
+
+    __slots__ = ("total", "pass_count", "fail_count", "error_count", "latency")
+
+    def __init__(self):
+        self.total = 0
+        self.pass_count = 0
+        self.fail_count = 0
+        self.error_count = 0
+        self.latency = LatencyHistogram()
+
+    def add(self, status: Optional[str], duration: Optional[float]):
+        self.total += 1
+        column = _STATUS_COLUMNS.get(status)
+        if column is not None:
+            setattr(self, column, getattr(self, column) + 1)
+        if duration is not None:
+            self.latency.record(duration)
+
+    def apply(self, row: Any):
+        for column in ("total", "pass_count", "fail_count", "error_count"):
+            setattr(row, column, (getattr(row, column) or 0) + getattr(self, column))
+        # JSON 列整体替换，保证变更被检测到
+        row.latency = LatencyHistogram.from_dict(row.latency).merge(self.latency).to_dict()
+
+
+def _rollup(db: Session, report_id: int) -> bool:
+    report = db.query(TestReport).filter(TestReport.id == report_id).with_for_update().first()
+    if report is None or report.rolled_up_at is not None or report.archive_path is not None:
+        return False
+    if report.status not in _FINISHED_STATUSES or (report.run_type or "functional") != "functional":
+        return False
+
+    day = (report.start_time or datetime.now()).date()
+    suite_id = report.suite_id or 0
+    cases: Dict[int, _Bucket] = defaultdict(_Bucket)
+    suite = _Bucket()
+    for case_id, status, duration in db.execute(
+        select(TestRecord.test_case_id, TestRecord.status, TestRecord.duration)
+        .where(TestRecord.report_id == report_id)
+    ):
+        suite.add(status, duration)
+        if case_id is not None:
+            cases[case_id].add(status, duration)
+
+    # 锁定已有的统计行后合并，并发结束的报告不会互相覆盖
+    case_ids = list(cases)
+    existing: Dict[int, CaseDailyStat] = {}
+    for start in range(0, len(case_ids), BULK_UPDATE_CHUNK):
+        for row in db.query(CaseDailyStat).filter(
+            CaseDailyStat.suite_id == suite_id,
+            CaseDailyStat.day == day,
+            CaseDailyStat.test_case_id.in_(case_ids[start:start + BULK_UPDATE_CHUNK])
+        ).with_for_update():
+            existing[row.test_case_id] = row
+    for case_id, bucket in cases.items():
+        row = existing.get(case_id)
+        if row is None:
+            row = CaseDailyStat(test_case_id=case_id, suite_id=suite_id, day=day)
+            db.add(row)
+        bucket.apply(row)
+
+    if report.suite_id is not None:
+        row = db.query(SuiteDailyStat).filter(
+            SuiteDailyStat.suite_id == report.suite_id, SuiteDailyStat.day == day
+        ).with_for_update().first()
+        if row is None:
+            row = SuiteDailyStat(suite_id=report.suite_id, day=day)
+            db.add(row)
+        suite.apply(row)
+        row.runs = (row.runs or 0) + 1
+        row.passed_runs = (row.passed_runs or 0) + (1 if report.status == "success" else 0)
+
+    report.rolled_up_at = datetime.now()
+    db.commit()
+    return True
+
+
+def rollup_report(db: Session, report_id: int) -> bool:
+    """
+    把一个已结束报告的执行结果合并进每日统计并标记 rolled_up_at，统计与标记在同一事务中提交
+    只读取该报告自己的执行记录，耗时与历史记录总量无关；
+    已合并、已归档（或归档中）、被取消、仍在执行以及压测报告直接跳过，返回是否合并
+    """
+    try:
+        return _rollup(db, report_id)
+    except IntegrityError:
+        # 另一个报告同时创建了同一天的统计行，回滚后重试一次即可锁定并合并该行
+        db.rollback()
+        return _rollup(db, report_id)
+
+
+def rollup_pending(db: Session, limit: int) -> int:
+    """合并尚未计入统计的已结束报告（如升级前的历史报告），返回合并的报告数"""
+    report_ids = db.execute(
+        select(TestReport.id)
+        .where(TestReport.rolled_up_at.is_(None),
+               TestReport.archive_path.is_(None),
+               TestReport.status.in_(_FINISHED_STATUSES),
+               or_(TestReport.run_type.is_(None), TestReport.run_type == "functional"))
+        .order_by(TestReport.id)
+        .limit(limit)
+    ).scalars().all()
+    return sum(1 for report_id in report_ids if rollup_report(db, report_id))
+
+
+# ------------------------------------------------------------------
+# 趋势查询
+# ------------------------------------------------------------------
+
+def _window(days: Optional[int]) -> int:
+    days = TREND_DEFAULT_DAYS if days is None else days
+    if days < 1 or days > TREND_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {TREND_MAX_DAYS}")
+    return days
+
+
+def _summary(bucket: _Bucket) -> Dict[str, Any]:
+    return {
+        "total": bucket.total,
+        "pass_count": bucket.pass_count,
+        "fail_count": bucket.fail_count,
+        "error_count": bucket.error_count,
+        "pass_rate": round(bucket.pass_count / bucket.total, 4) if bucket.total else None,
+        "latency": bucket.latency.summary(),
+    }
+
+
+def _absorb(bucket: _Bucket, row: Any):
+    """把一条统计行累加进 bucket（与 _Bucket.apply 方向相反）"""
+    bucket.total += row.total or 0
+    bucket.pass_count += row.pass_count or 0
+    bucket.fail_count += row.fail_count or 0
+    bucket.error_count += row.error_count or 0
+    bucket.latency.merge(LatencyHistogram.from_dict(row.latency))
+
+
+def _merge_rows(rows: List[Any], since: date) -> Dict[str, Any]:
+    """
+    按天合并统计行（同一天可能有多个套件的行）；since 之前的行计入上一个同长度窗口 previous，用于环比
+    """
+    days: Dict[date, _Bucket] = defaultdict(_Bucket)
+    runs: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+    overall, previous = _Bucket(), _Bucket()
+    for row in rows:
+        if row.day < since:
+            _absorb(previous, row)
+            continue
+        _absorb(days[row.day], row)
+        _absorb(overall, row)
+        if isinstance(row, SuiteDailyStat):
+            runs[row.day][0] += row.runs or 0
+            runs[row.day][1] += row.passed_runs or 0
+
+    points = []
+    for day in sorted(days):
+        point = dict(_summary(days[day]), day=day)
+        if day in runs:
+            point.update(runs=runs[day][0], passed_runs=runs[day][1])
+        points.append(point)
+    return {"points": points, "overall": _summary(overall), "previous": _summary(previous)}
+
+
+def case_trend(db: Session, test_case_id: int, days: Optional[int] = None,
+               suite_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    用例最近 days 天每天的通过率与延迟分位数，以及整个窗口和上一个同长度窗口的汇总
+    suite_id 为空时合并该用例在所有套件中的执行；只读取 case_daily_stats，最多 2 * days * 套件数 行
+    """
+    days = _window(days)
+    since = date.today() - timedelta(days=days - 1)
+    query = db.query(CaseDailyStat).filter(
+        CaseDailyStat.test_case_id == test_case_id,
+        CaseDailyStat.day >= since - timedelta(days=days)
+    )
+    if suite_id is not None:
+        query = query.filter(CaseDailyStat.suite_id == suite_id)
+    result = _merge_rows(query.all(), since)
+    result.update(test_case_id=test_case_id, suite_id=suite_id, days=days)
+    return result
+
+
+def suite_trend(db: Session, suite_id: int, days: Optional[int] = None) -> Dict[str, Any]:
+    """套件最近 days 天每天的执行次数、通过率与延迟分位数；只读取 suite_daily_stats"""
+    days = _window(days)
+    since = date.today() - timedelta(days=days - 1)
+    rows = db.query(SuiteDailyStat).filter(
+        SuiteDailyStat.suite_id == suite_id,
+        SuiteDailyStat.day >= since - timedelta(days=days)
+    ).all()
+    result = _merge_rows(rows, since)
+    result.update(suite_id=suite_id, days=days)
+    return result
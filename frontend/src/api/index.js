@@ -13,6 +13,11 @@ const apiClient = axios.create({
 export const apiGetTestCases = () => {
   return apiClient.get('/testcases/list');
 };
+// 用例列表游标分页
+// params: { limit, cursor, module_id, include_submodules, method, name_prefix, with_total }
+export const apiGetTestCasePage = (params = {}) => {
+  return apiClient.get('/testcases/page', { params });
+};
 // 获取单个测试用例详情
 export const apiGetTestCaseDetail = (testCaseId) => {
   return apiClient.get(`/testcases/${testCaseId}`);
@@ -22,6 +27,19 @@ export const apiGetTestCaseDetail = (testCaseId) => {
 export const apiReorderTestCases = (testCaseIds) => {
   return apiClient.post(`/testcases/reorder`, { test_case_ids: testCaseIds });
 };
+// 把单个用例移动到两个相邻用例之间（只更新被移动的用例）
+export const apiMoveTestCase = (testCaseId, prevId = null, nextId = null) => {
+  return apiClient.post(`/testcases/${testCaseId}/move`, { prev_id: prevId, next_id: nextId });
+};
+
+// 导入 OpenAPI / HAR / Postman 文件为用例，请求体直接发送文件内容，返回后台导入任务
+// params: { format, module_id, base_url }
+export const apiImportTestCases = (file, params = {}) => {
+  return apiClient.post('/testcases/import', file, {
+    params: { ...params, file_name: file.name },
+    headers: { 'Content-Type': 'application/octet-stream' },
+  });
+};
 
 // 删除测试用例
 export const apiDeleteTestCase = (id) => {
@@ -90,6 +108,11 @@ export const apiUpdateTestSuite = (testSuiteId, testSuiteData) => {
   return apiClient.put(`/suites/${testSuiteId}`, testSuiteData);
 };
 
+// 把套件条目移动到同一套件的两个相邻条目之间
+export const apiMoveTestSuiteItem = (testSuiteId, itemId, prevId = null, nextId = null) => {
+  return apiClient.post(`/suites/${testSuiteId}/items/${itemId}/move`, { prev_id: prevId, next_id: nextId });
+};
+
 // 删除测试套件
 export const apiDeleteTestSuite = (testSuiteId) => {
   return apiClient.delete(`/suites/${testSuiteId}`);
@@ -104,12 +127,94 @@ export const apiExecuteTestSuite = (testSuiteId) => {
 // Test Reports API
 // -----------------------------------------------------------------------------
 
-// 获取测试报告列表
-export const apiGetTestReports = (skip = 0, limit = 100) => {
-  return apiClient.get('/reports/list', { params: { skip, limit } });
+// 获取测试报告列表（只含汇总字段，游标分页）
+// params: { limit, cursor, suite_id, status, start_from, start_to }，翻页时传入上一页返回的 next_cursor
+export const apiGetTestReports = (params = {}) => {
+  return apiClient.get('/reports/list', { params });
 };
 
 // 获取单个测试报告详情
 export const apiGetTestReportDetail = (reportId) => {
   return apiClient.get(`/reports/${reportId}`);
-};
\ No newline at end of file
+};
+// 恢复已归档报告的执行记录
+export const apiRestoreTestReport = (reportId) => {
+  return apiClient.post(`/reports/${reportId}/restore`);
+};
+// 只重跑报告中失败的用例（使用原执行时的变量快照），结果写入新的子报告
+export const apiRerunFailedRecords = (reportId) => {
+  return apiClient.post(`/reports/${reportId}/rerun-failed`);
+};
+// 获取报告的重跑子报告列表
+export const apiGetRerunReports = (reportId) => {
+  return apiClient.get(`/reports/${reportId}/reruns`);
+};
+// 按用例比较报告与基线的耗时分布，params: { baseline_report_id, baseline_runs, alpha, min_slowdown, min_delta_ms }
+export const apiCompareTestReport = (reportId, params = {}) => {
+  return apiClient.get(`/reports/${reportId}/compare`, { params });
+};
+// 获取用例最近 days 天的执行趋势（通过率、延迟分位数），params: { days, suite_id }
+export const apiGetTestCaseTrend = (caseId, params = {}) => {
+  return apiClient.get(`/trends/testcases/${caseId}`, { params });
+};
+// 获取套件最近 days 天的执行趋势，params: { days }
+export const apiGetTestSuiteTrend = (suiteId, params = {}) => {
+  return apiClient.get(`/trends/suites/${suiteId}`, { params });
+};
+// 分页获取报告的执行记录（精简字段）
+// params: { limit, cursor, status, case_name, status_code, min_duration, max_duration }
+export const apiGetTestReportRecords = (reportId, params = {}) => {
+  return apiClient.get(`/reports/${reportId}/records`, { params });
+};
+
+// 获取单条执行记录的完整信息（请求/响应详情、断言结果、分阶段耗时）
+export const apiGetTestRecordDetail = (recordId) => {
+  return apiClient.get(`/reports/records/${recordId}`);
+};
+
+// 执行记录的完整响应体地址（被截断的大响应体从服务端落盘文件读取）
+export const apiGetTestRecordBodyUrl = (recordId) => {
+  return `${apiClient.defaults.baseURL}/reports/records/${recordId}/body`;
+};
+
+// -----------------------------------------------------------------------------
+// Jobs API
+// -----------------------------------------------------------------------------
+
+// 以 NDJSON 导出数据，kind: testcases / suites / reports / all
+// params: { compress, suite_id, start_from, start_to }
+export const apiExportData = (kind, params = {}) => {
+  return apiClient.get(`/export/${kind}`, { params, responseType: 'blob' });
+};
+// 导入 NDJSON 备份（可为 gzip），返回后台导入任务
+export const apiImportNdjson = (file, sameDatabase = false) => {
+  return apiClient.post('/import/ndjson', file, {
+    params: sameDatabase ? { same_database: true } : undefined,
+    headers: { 'Content-Type': 'application/octet-stream' },
+  });
+};
+
+// 获取任务列表（默认排队中和执行中的任务）
+export const apiGetJobs = (status) => {
+  return apiClient.get('/jobs/', { params: { status } });
+};
+
+// 获取单个任务状态
+export const apiGetJob = (jobId) => {
+  return apiClient.get(`/jobs/${jobId}`);
+};
+
+// 取消任务
+export const apiCancelJob = (jobId) => {
+  return apiClient.post(`/jobs/${jobId}/cancel`);
+};
+
+// 提交压测任务：{ test_case_ids | suite_id, duration, concurrency, target_rps }
+export const apiCreateLoadTest = (data) => {
+  return apiClient.post('/load-tests/', data);
+};
+
+// 报告执行进度事件流（Server-Sent Events）地址
+export const apiGetTestReportEventsUrl = (reportId) => {
+  return `${apiClient.defaults.baseURL}/reports/${reportId}/events`;
+};